@@ -3,6 +3,7 @@ from matplotlib import pyplot as plt
 from scipy.stats.mstats import pearsonr
 from matplotlib.ticker import MultipleLocator
 from matplotlib.colors import LinearSegmentedColormap
+from Source_FTIR_HNMR.cls_SpectrumCache import SpectrumCache
 from Source_FTIR_HNMR.rootDir import (path_FTIRCanolaOil, path_FTIRPalmOil, path_FTIR2C1PMix, path_FTIR1C2PMix,
                                       path_OutFTIR_CorrelProc)
 
@@ -21,11 +22,12 @@ colors_FTIRSamples = ['#f34f1c', '#5284bd', '#dba207','#80ba06']
 percentCanola_FTIRSamples = [0.00, 0.5046/(0.5046+1.0088), 1.0308/(0.5125+1.0308), 1.00]
 numberOfSamples = len(names_FTIRSamples)
 
-# Read the CSV files for FTIR data and convert to dataframes
+# Read the CSV files for FTIR data through the binary spectrum cache and convert to dataframes
 DF_FTIRColumns = ["Wavenumber", "Percent Transmittance"]
 DF_FTIRSamples = []
+spectrumCache = SpectrumCache()
 for pathSample in path_FTIRSamples:
-    DFSample = pd.read_csv(pathSample, usecols=DF_FTIRColumns)
+    DFSample = spectrumCache.loadDataFrame(pathSample, DF_FTIRColumns)
     DF_FTIRSamples.append(DFSample)
 numberOfPoints = DF_FTIRSamples[0].shape[0]
 
@@ -2,21 +2,21 @@ import pandas as pd
 from matplotlib import pyplot as plt
 from matplotlib.colors import LinearSegmentedColormap
 from scipy.stats.mstats import pearsonr
-from Source_FTIR_HNMR.rootDir import (path_NMRCanolaOil, path_NMRPalmOil, path_NMR2C1PMix, path_OutNMR_CorrelAllProc,
-                                      path_OutNMR_CorrelSigProc)
+from Source_FTIR_HNMR.cls_HNMR_Output import HNMR_Output
+from Source_FTIR_HNMR.rootDir import (path_RawText_NMRCanolaOil, path_RawText_NMRPalmOil, path_RawText_NMR2C1PMix,
+                                      path_OutNMR_CorrelAllProc, path_OutNMR_CorrelSigProc)
 
 # This program compares the peak areas of analogous peaks in the 1H-NMR spectra of Canola Oil, Palm Oil, and their
 # ...respective mixtures in 2:1 and 1:2 mass ratios, respectively by plotting bar charts.
 
 # Paths are arranged from most saturated to least saturated oils on average.
-path_NMRSamples = [path_NMRPalmOil, path_NMR2C1PMix, path_NMRCanolaOil]
+path_NMRSamples = [path_RawText_NMRPalmOil, path_RawText_NMR2C1PMix, path_RawText_NMRCanolaOil]
 names_NMRSamples = ['PO', '2C:1P', 'CO']
 colors_NMRSamples = ['#f34f1c', '#ffba01','#7fbc00']
 percentCanola_NMRSamples = [0.00,  1.0308/(0.5125+1.0308), 1.00]
 
-# Create data frames for the oil samples
-DFColumns = ["Peak Number","Range High δ","Range Low δ","%Peak Area"]
-dataFrames_NMRSamples = [pd.read_csv(path, usecols=DFColumns) for path in path_NMRSamples]
+# Create data frames for the oil samples directly from the instrument's raw text exports
+dataFrames_NMRSamples = [HNMR_Output(path, registerSample=False).DFSample for path in path_NMRSamples]
 numberOfSamples = len(path_NMRSamples)
 numberOfPeaks = dataFrames_NMRSamples[0].shape[0]
 
@@ -0,0 +1,41 @@
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+from Source_FTIR_HNMR.rootDir import ROOT_DIR
+
+# This program measures the cold-start cost of importing Source_FTIR_HNMR, as seen by a short-lived batch worker. Every
+# ... measurement runs in a fresh interpreter. The "eager" case also imports the plotting and statistics modules that
+# ... the package defers until first use, so the difference between the two cases is the saving of the lazy imports.
+# ... Run from the repository root:  python -m Source_Benchmarks.Benchmark_Imports --repeat 10
+
+importCases = {"package (lazy)": "import Source_FTIR_HNMR",
+               "package + plotting and statistics (eager)":
+                   "import Source_FTIR_HNMR, matplotlib.pyplot, matplotlib.ticker, scipy.special"}
+heavyModules = ("matplotlib", "matplotlib.pyplot", "scipy", "scipy.special", "pandas", "numpy")
+
+def timeImport(statement):
+    # Wall time of the import measured inside the child interpreter, plus which of the heavy modules it loaded
+    script = (f"import sys, time, json\nstart = time.perf_counter()\n{statement}\n"
+              f"print(json.dumps([time.perf_counter() - start, [m for m in {heavyModules!r} if m in sys.modules]]))")
+    completed = subprocess.run([sys.executable, "-c", script], cwd=ROOT_DIR, capture_output=True, text=True,
+                               check=True)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the import time of Source_FTIR_HNMR in fresh interpreters.")
+    parser.add_argument("--repeat", type=int, default=10)
+    arguments = parser.parse_args(argv)
+
+    medianTimes = {}
+    for caseName, statement in importCases.items():
+        timeImport(statement)  # warm the OS file cache and the __pycache__ directories first
+        measurements = [timeImport(statement) for _ in range(arguments.repeat)]
+        medianTimes[caseName] = statistics.median(seconds for seconds, loadedModules in measurements)
+        print(f"{caseName:<45} {medianTimes[caseName] * 1e3:>8.1f} ms  loads: {', '.join(measurements[0][1])}")
+    lazyTime, eagerTime = medianTimes.values()
+    print(f"\nDeferred imports save {(eagerTime - lazyTime) * 1e3:.1f} ms ({1 - lazyTime / eagerTime:.0%}) per process")
+
+if __name__ == "__main__":
+    main()
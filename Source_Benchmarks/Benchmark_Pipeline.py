@@ -0,0 +1,207 @@
+import argparse
+import json
+import platform
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from Source_Benchmarks.cls_SyntheticSpectra import SyntheticSpectra
+from Source_FTIR_HNMR.cls_FTIR_CorrelationAnalysis import FTIR_CorrelationAnalysis
+from Source_FTIR_HNMR.cls_FTIR_MixtureUnmixing import FTIR_MixtureUnmixing
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_FTIR_PeakBatch import FTIR_PeakBatch
+from Source_FTIR_HNMR.cls_HNMR_CorrelationAnalysis import HNMR_CorrelationAnalysis
+from Source_FTIR_HNMR.cls_HNMR_FattyAcidEstimator import HNMR_FattyAcidEstimator
+from Source_FTIR_HNMR.cls_HNMR_Output import HNMR_Output
+from Source_FTIR_HNMR.cls_HNMR_SpectrumIndex import HNMR_SpectrumIndex
+from Source_FTIR_HNMR.cls_SpectrumCache import SpectrumCache
+from Source_FTIR_HNMR.rootDir import ROOT_DIR, path_ProgOutput_Benchmarks, path_FTIRCanolaOil, path_FTIRPalmOil
+
+# This program times and memory-profiles each stage of the FTIR and 1H-NMR pipelines on seeded synthetic samples at
+# ... several scales, then writes a JSON report that can be compared against the report of another commit.
+# ... Run from the repository root:  python -m Source_Benchmarks.Benchmark_Pipeline --scales 4 100 1000
+
+def measure(stageName, numberOfSamples, stageFunction, repeat=3, setup=None):
+    # Best wall and CPU time over the repetitions, then one extra traced run for the peak Python/NumPy allocation
+    bestWall, bestCPU = float("inf"), float("inf")
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        startWall, startCPU = time.perf_counter(), time.process_time()
+        stageFunction()
+        bestWall = min(bestWall, time.perf_counter() - startWall)
+        bestCPU = min(bestCPU, time.process_time() - startCPU)
+    if setup is not None:
+        setup()
+    tracemalloc.start()
+    stageFunction()
+    peakBytes = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    result = {"stage": stageName, "samples": numberOfSamples, "wallSeconds": bestWall, "cpuSeconds": bestCPU,
+              "peakBytes": peakBytes, "samplesPerSecond": numberOfSamples / bestWall if bestWall > 0 else None}
+    print(f"{stageName:<40} {numberOfSamples:>8} samples  {bestWall * 1e3:>10.2f} ms  "
+          f"{peakBytes / 1024 ** 2:>9.2f} MiB peak")
+    return result
+
+def benchmarkFTIRFiles(synthetic, numberOfSamples, workDir, repeat):
+    paths, fractions = synthetic.writeFTIRFiles(numberOfSamples, workDir / "FTIR")
+    spectrumCache = SpectrumCache(cacheDir=workDir / "Spectrum Cache")
+
+    def parseCSVs():
+        for path in paths:
+            pd.read_csv(path, usecols=FTIR_Output.DF_FTIRColumns)
+
+    def loadCache():
+        for path in paths:
+            spectrumCache.loadDataFrame(path, FTIR_Output.DF_FTIRColumns)
+
+    return [measure("FTIR CSV parse", numberOfSamples, parseCSVs, repeat),
+            measure("FTIR spectrum cache build", numberOfSamples, loadCache, repeat, setup=spectrumCache.clear),
+            measure("FTIR spectrum cache load", numberOfSamples, loadCache, repeat)]
+
+def benchmarkFTIRArrays(synthetic, numberOfSamples, repeat, blockSize=5000):
+    # One block of synthetic spectra is generated up front and reused for every block of the run, so that neither the
+    # ... generation time nor the memory of the whole run is counted in the peak extraction stage
+    templateFractions, templateTransmittances = next(synthetic.FTIRBlocks(min(numberOfSamples, blockSize), blockSize))
+    fractions = synthetic.canolaFractions(numberOfSamples, stream=1)
+    peakTables = []
+
+    def generatePeaks():
+        peakTables.clear()
+        for start in range(0, numberOfSamples, blockSize):
+            transmittances = templateTransmittances[:min(blockSize, numberOfSamples - start)]
+            peakBatch = FTIR_PeakBatch(synthetic.wavenumbers, transmittances, FTIR_Output.peakScanRange_High,
+                                       FTIR_Output.peakScanRange_Low, FTIR_Output.peakVibrations)
+            peakBatch.generatePeaks()
+            peakTables.append((fractions[start:start + blockSize], peakBatch.peakTable))
+
+    results = [measure("FTIR peak extraction", numberOfSamples, generatePeaks, repeat)]
+
+    # Sample objects that only carry metadata and a row of a peak table, as after generatePeaksAll
+    listFTIR_Outputs = []
+    for blockFractions, peakTable in peakTables:
+        for peakTableRow, fraction in enumerate(blockFractions):
+            FTIRObj = FTIR_Output(None, sampleName_Short=f"S{len(listFTIR_Outputs)}", fraction_CanolaOil=fraction,
+                                  registerSample=False)
+            FTIRObj.setPeakTableRow(peakTable, peakTableRow)
+            listFTIR_Outputs.append(FTIRObj)
+
+    def generateCorrelations():
+        correlationAnalysis = FTIR_CorrelationAnalysis(listFTIR_Outputs)
+        correlationAnalysis.generateCorrelations()
+
+    results.append(measure("FTIR correlations", numberOfSamples, generateCorrelations, repeat))
+
+    # The synthetic blends are linear in transmittance, so they are unmixed in transmittance against the pure oils
+    mixtureUnmixing = FTIR_MixtureUnmixing([FTIR_Output(path_FTIRCanolaOil, sampleName_Short="CO", registerSample=False),
+                                            FTIR_Output(path_FTIRPalmOil, sampleName_Short="PO", registerSample=False)],
+                                           signal="transmittance")
+
+    def unmixSpectra():
+        for start in range(0, numberOfSamples, blockSize):
+            mixtureUnmixing.unmix(templateTransmittances[:min(blockSize, numberOfSamples - start)])
+
+    results.append(measure("FTIR mixture unmixing", numberOfSamples, unmixSpectra, repeat))
+    return results
+
+def benchmarkHNMRFiles(synthetic, numberOfSamples, workDir, repeat):
+    paths, fractions = synthetic.writeHNMRFiles(numberOfSamples, workDir / "1H-NMR")
+
+    def parseRawText():
+        for path, integralTable in HNMR_Output.iterIntegralTables(paths):
+            pass
+
+    return [measure("1H-NMR raw text parse", numberOfSamples, parseRawText, repeat)]
+
+def benchmarkHNMRArrays(synthetic, numberOfSamples, repeat, blockSize=500):
+    listHNMR_Outputs = [HNMR_Output(None, sampleName_Short=f"S{sampleIndex}", fraction_CanolaOil=fraction,
+                                    registerSample=False, integralTable=integralTable)
+                        for sampleIndex, (fraction, integralTable) in enumerate(synthetic.HNMRTables(numberOfSamples))]
+
+    def generateCorrelations():
+        correlationAnalysis = HNMR_CorrelationAnalysis(listHNMR_Outputs)
+        correlationAnalysis.groupPeaks()
+        correlationAnalysis.generateCorrelations()
+
+    def estimateFattyAcids():
+        HNMR_FattyAcidEstimator().estimateHNMROutputs(listHNMR_Outputs)
+
+    results = [measure("1H-NMR grouping and correlations", numberOfSamples, generateCorrelations, repeat),
+               measure("1H-NMR fatty-acid estimates", numberOfSamples, estimateFattyAcids, repeat)]
+
+    # As for the FTIR peak extraction, one block of full spectra is generated up front and reused for every block,
+    # ... and the integration reuses the index of that block, so that memory stays at one block whatever the scale
+    templateFractions, chemicalShifts, templateIntensities = synthetic.HNMRSpectra(min(numberOfSamples, blockSize))
+    blockSizes = [min(blockSize, numberOfSamples - start) for start in range(0, numberOfSamples, blockSize)]
+    spectrumIndices = {size: HNMR_SpectrumIndex(chemicalShifts, templateIntensities[:size]) for size in set(blockSizes)}
+
+    def buildSpectrumIndex():
+        for size in blockSizes:
+            HNMR_SpectrumIndex(chemicalShifts, templateIntensities[:size])
+
+    def integrateRegions():
+        for size in blockSizes:
+            spectrumIndices[size].integrate(HNMR_Output.integrationRange_High, HNMR_Output.integrationRange_Low)
+
+    results.append(measure("1H-NMR prefix-sum index", numberOfSamples, buildSpectrumIndex, repeat))
+    results.append(measure("1H-NMR region integration", numberOfSamples, integrateRegions, repeat))
+    return results
+
+def gitCommit():
+    try:
+        return subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT_DIR, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+def compareReports(report, baselineFile):
+    # Ratio of wall times (this report / baseline) for every stage and scale present in both reports
+    with open(baselineFile, 'r', encoding='UTF-8') as file:
+        baseline = json.load(file)
+    baselineTimes = {(result["stage"], result["samples"]): result["wallSeconds"] for result in baseline["results"]}
+    print(f"\nCompared with {baseline['commit'][:10]} (ratio < 1 is faster):")
+    for result in report["results"]:
+        baselineWall = baselineTimes.get((result["stage"], result["samples"]))
+        if baselineWall:
+            print(f"{result['stage']:<40} {result['samples']:>8} samples  {result['wallSeconds'] / baselineWall:>6.2f}x")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the FTIR and 1H-NMR pipeline stages on synthetic data.")
+    parser.add_argument("--scales", type=int, nargs="+", default=[4, 100, 1000, 10000, 100000])
+    parser.add_argument("--max-file-samples", type=int, default=1000,
+                        help="largest scale for the stages that read files from disk")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", type=Path, default=None)
+    parser.add_argument("--compare", type=Path, default=None, help="report of another commit to compare against")
+    arguments = parser.parse_args(argv)
+
+    # Time the computations themselves rather than lookups in the derived-results cache
+    FTIR_Output.resultsCache = None
+    synthetic = SyntheticSpectra(seed=arguments.seed)
+    commit = gitCommit()
+    report = {"commit": commit, "timestamp": datetime.now(timezone.utc).isoformat(), "seed": arguments.seed,
+              "python": platform.python_version(), "numpy": np.__version__, "pandas": pd.__version__,
+              "platform": platform.platform(), "results": []}
+    for numberOfSamples in arguments.scales:
+        report["results"] += benchmarkFTIRArrays(synthetic, numberOfSamples, arguments.repeat)
+        report["results"] += benchmarkHNMRArrays(synthetic, numberOfSamples, arguments.repeat)
+        if numberOfSamples <= arguments.max_file_samples:
+            with tempfile.TemporaryDirectory() as workDir:
+                report["results"] += benchmarkFTIRFiles(synthetic, numberOfSamples, Path(workDir), arguments.repeat)
+                report["results"] += benchmarkHNMRFiles(synthetic, numberOfSamples, Path(workDir), arguments.repeat)
+
+    outputFile = arguments.output or path_ProgOutput_Benchmarks / f"Benchmark_{commit[:10]}.json"
+    outputFile.parent.mkdir(parents=True, exist_ok=True)
+    with open(outputFile, 'w', encoding='UTF-8') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nReport written to {outputFile}")
+    if arguments.compare is not None:
+        compareReports(report, arguments.compare)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import numpy as np
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_HNMR_Output import HNMR_Output
+from Source_FTIR_HNMR.rootDir import (path_FTIRCanolaOil, path_FTIRPalmOil, path_RawText_NMRCanolaOil,
+                                      path_RawText_NMRPalmOil)
+
+# Seeded generator of synthetic FTIR spectra and 1H-NMR integral tables for the benchmarks. Every synthetic sample is a
+# ... blend of the measured pure canola and palm oil outputs at a random canola mass fraction, plus instrument-like
+# ... noise and baseline drift, so that the files and arrays have the same shape as those in Instrument Output Files/.
+
+class SyntheticSpectra:
+    def __init__(self, seed=0, noiseLevel=0.5, baselineDrift=2.0, shiftJitter=0.003):
+        self.seed = seed
+        self.noiseLevel = noiseLevel
+        self.baselineDrift = baselineDrift
+        self.shiftJitter = shiftJitter
+
+        canolaFTIR = FTIR_Output(path_FTIRCanolaOil, registerSample=False).DFSample
+        palmFTIR = FTIR_Output(path_FTIRPalmOil, registerSample=False).DFSample
+        self.wavenumbers = canolaFTIR["Wavenumber"].to_numpy(dtype=float)
+        self.canolaTransmittance = canolaFTIR["Percent Transmittance"].to_numpy(dtype=float)
+        self.palmTransmittance = palmFTIR["Percent Transmittance"].to_numpy(dtype=float)
+
+        canolaHNMR = HNMR_Output(path_RawText_NMRCanolaOil, registerSample=False)
+        palmHNMR = HNMR_Output(path_RawText_NMRPalmOil, registerSample=False)
+        self.rangeHigh = (canolaHNMR.rangeHigh + palmHNMR.rangeHigh) / 2
+        self.rangeLow = (canolaHNMR.rangeLow + palmHNMR.rangeLow) / 2
+        self.canolaAreas = canolaHNMR.peakAreas
+        self.palmAreas = palmHNMR.peakAreas
+
+    def generator(self, stream):
+        # Each stream (FTIR, 1H-NMR, ...) has its own seeded generator so the outputs do not depend on call order
+        return np.random.default_rng([self.seed, stream])
+
+    def canolaFractions(self, numberOfSamples, stream=0):
+        fractions = self.generator(stream).random(numberOfSamples)
+        fractions[:min(numberOfSamples, 2)] = [0.0, 1.0][:min(numberOfSamples, 2)]
+        return fractions
+
+    def FTIRBlocks(self, numberOfSamples, blockSize=5000):
+        # Yield (canola fractions, samples x points transmittance) blocks so that large runs use bounded memory
+        fractions = self.canolaFractions(numberOfSamples, stream=1)
+        randomGenerator = self.generator(2)
+        for start in range(0, numberOfSamples, blockSize):
+            blockFractions = fractions[start:start + blockSize]
+            transmittances = (blockFractions[:, None] * self.canolaTransmittance
+                              + (1 - blockFractions[:, None]) * self.palmTransmittance)
+            transmittances += randomGenerator.normal(0.0, self.noiseLevel, transmittances.shape)
+            transmittances += randomGenerator.normal(0.0, self.baselineDrift, (blockFractions.shape[0], 1))
+            yield blockFractions, transmittances
+
+    def HNMRTables(self, numberOfSamples):
+        # Yield (canola fraction, integral table) pairs in the format returned by HNMR_Output.readIntegralTable
+        fractions = self.canolaFractions(numberOfSamples, stream=3)
+        randomGenerator = self.generator(4)
+        numberOfPeaks = self.rangeHigh.shape[0]
+        for fraction in fractions:
+            boundaries = np.append(self.rangeHigh, self.rangeLow[-1])
+            boundaries[1:-1] += randomGenerator.uniform(-self.shiftJitter, self.shiftJitter, numberOfPeaks - 1)
+            peakAreas = fraction * self.canolaAreas + (1 - fraction) * self.palmAreas
+            peakAreas = peakAreas * randomGenerator.lognormal(0.0, 0.02, numberOfPeaks)
+            yield fraction, {"peakNumbers": np.arange(1, numberOfPeaks + 1, dtype=np.int32),
+                             "rangeHigh": boundaries[:-1].copy(),
+                             "rangeLow": boundaries[1:].copy(),
+                             "peakAreas": peakAreas}
+
+    def HNMRSpectra(self, numberOfSamples, numberOfPoints=16384, lineWidth=0.004):
+        # (chemical shifts from high to low δ, samples x points intensities) of full spectra with one Lorentzian line
+        # ... of the blended area at the centre of each integration region, as the instrument stores them
+        fractions = self.canolaFractions(numberOfSamples, stream=5)
+        randomGenerator = self.generator(6)
+        chemicalShifts = np.linspace(self.rangeHigh[0] + 0.4, self.rangeLow[-1] - 0.4, numberOfPoints)
+        lineCentres = (self.rangeHigh + self.rangeLow) / 2
+        halfWidth = lineWidth / 2
+        intensities = np.zeros((numberOfSamples, numberOfPoints))
+        for lineIndex, lineCentre in enumerate(lineCentres):
+            lineShape = halfWidth / np.pi / ((chemicalShifts - lineCentre) ** 2 + halfWidth ** 2)
+            lineAreas = fractions * self.canolaAreas[lineIndex] + (1 - fractions) * self.palmAreas[lineIndex]
+            intensities += lineAreas[:, None] * lineShape
+        intensities += randomGenerator.normal(0.0, self.noiseLevel * 1e-2, intensities.shape)
+        return fractions, chemicalShifts, intensities
+
+    def writeFTIRFiles(self, numberOfSamples, outputDir):
+        outputDir.mkdir(parents=True, exist_ok=True)
+        paths, fractions = [], []
+        for blockFractions, transmittances in self.FTIRBlocks(numberOfSamples):
+            for fraction, transmittance in zip(blockFractions, transmittances):
+                path = outputDir / f"FTIR_Synthetic_{len(paths):06d}.csv"
+                np.savetxt(path, np.column_stack([self.wavenumbers, transmittance]), fmt="%.6f", delimiter=",",
+                           header="Wavenumber,Percent Transmittance", comments="")
+                paths.append(path)
+                fractions.append(fraction)
+        return paths, fractions
+
+    def writeHNMRFiles(self, numberOfSamples, outputDir):
+        outputDir.mkdir(parents=True, exist_ok=True)
+        paths, fractions = [], []
+        for fraction, integralTable in self.HNMRTables(numberOfSamples):
+            path = outputDir / f"RawText_1H-NMR_Synthetic_{len(paths):06d}.txt"
+            with open(path, 'w', encoding='UTF-8') as file:
+                file.write("Number   Integrated Region     Integral\n")
+                for row in zip(*integralTable.values()):
+                    file.write(f"{row[0]:6d}{row[1]:11.3f}{row[2]:11.3f}{row[3]:17.6g}\n")
+            paths.append(path)
+            fractions.append(fraction)
+        return paths, fractions
@@ -1,4 +1,23 @@
 from Source_FTIR_HNMR.cls_FTIR_Peak import *
+from Source_FTIR_HNMR.cls_PipelineProfiler import *
+from Source_FTIR_HNMR.cls_SampleRegistry import *
+from Source_FTIR_HNMR.cls_CorrelationResampling import *
+from Source_FTIR_HNMR.cls_FTIR_PeakTable import *
+from Source_FTIR_HNMR.cls_FTIR_GridResampler import *
+from Source_FTIR_HNMR.cls_FTIR_PeakBatch import *
+from Source_FTIR_HNMR.cls_FTIR_PeakDiscovery import *
 from Source_FTIR_HNMR.cls_FTIR_Output import *
 from Source_FTIR_HNMR.cls_FTIR_CorrelationAnalysis import *
+from Source_FTIR_HNMR.cls_FTIR_IncrementalCorrelationAnalysis import *
+from Source_FTIR_HNMR.cls_FTIR_CorrelationMap import *
+from Source_FTIR_HNMR.cls_FTIR_MixtureUnmixing import *
+from Source_FTIR_HNMR.cls_FTIR_AnalysisSession import *
+from Source_FTIR_HNMR.cls_FTIR_FigureRenderer import *
+from Source_FTIR_HNMR.cls_HNMR_SpectrumIndex import *
+from Source_FTIR_HNMR.cls_HNMR_Output import *
+from Source_FTIR_HNMR.cls_HNMR_CorrelationAnalysis import *
+from Source_FTIR_HNMR.cls_HNMR_FattyAcidEstimator import *
+from Source_FTIR_HNMR.cls_SampleManifest import *
+from Source_FTIR_HNMR.cls_ResultsStore import *
+from Source_FTIR_HNMR.cls_IngestionService import *
 from Source_FTIR_HNMR.rootDir import *
\ No newline at end of file
@@ -0,0 +1,84 @@
+import argparse
+import asyncio
+import logging
+import signal
+import time
+from pathlib import Path
+from Source_FTIR_HNMR.cls_AnalysisPipeline import AnalysisPipeline
+from Source_FTIR_HNMR.cls_IngestionService import IngestionService
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.rootDir import path_InstrumentOutputs, path_SampleManifest
+
+# Non-interactive runner for the whole analysis of every sample in the sample manifest. Run from the repository root:
+# ... python -m Source_FTIR_HNMR --jobs 8
+# ... With --watch, the instrument folder is watched instead and every new file is analysed as soon as it is written.
+
+async def serve(ingestionService):
+    # Stop polling on Ctrl+C or SIGTERM, letting the files in progress finish
+    stopEvent = asyncio.Event()
+    for signalNumber in (signal.SIGINT, signal.SIGTERM):
+        try:
+            asyncio.get_running_loop().add_signal_handler(signalNumber, stopEvent.set)
+        except (NotImplementedError, RuntimeError):
+            pass  # not available on Windows; Ctrl+C then ends the service through KeyboardInterrupt
+    await ingestionService.run(stopEvent)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m Source_FTIR_HNMR",
+                                     description="Run the FTIR and 1H-NMR analyses of all manifest samples.")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes in total (default: all CPUs)")
+    parser.add_argument("--modality", choices=AnalysisPipeline.modalities, action="append", default=None,
+                        help="run only this branch (may be repeated)")
+    parser.add_argument("--instrument-dir", type=Path, default=path_InstrumentOutputs)
+    parser.add_argument("--manifest", type=Path, default=path_SampleManifest)
+    parser.add_argument("--output-dir", type=Path, default=None,
+                        help="folder for all outputs (default: the Program Output Files folders)")
+    parser.add_argument("--no-figures", action="store_true", help="skip rendering the FTIR spectra")
+    parser.add_argument("--no-csv", action="store_true", help="skip the wide correlation CSV tables")
+    parser.add_argument("--no-results-store", action="store_true",
+                        help="do not append the correlation results to the long-format results store")
+    parser.add_argument("--discover-peaks", action="store_true",
+                        help="find the FTIR absorption bands in the spectra instead of using the fixed peak windows")
+    parser.add_argument("--reference-band", type=float, default=None, metavar="WAVENUMBER",
+                        help="measure relative FTIR peak heights against the window containing this wavenumber "
+                             "(default: 2920 cm⁻¹, the saturated C-H stretch)")
+    parser.add_argument("--common-grid", type=float, nargs=3, default=None, metavar=("LOW", "HIGH", "SPACING"),
+                        help="resample the FTIR spectra onto this wavenumber grid (cm⁻¹), for mixed spectrometers")
+    parser.add_argument("--profile", type=Path, default=None, help="write a Chrome trace of the stages to this file")
+    parser.add_argument("--watch", action="store_true", help="keep running and analyse new files as they appear")
+    parser.add_argument("--poll-interval", type=float, default=1.0, help="seconds between scans in --watch mode")
+    parser.add_argument("--settle-time", type=float, default=2.0,
+                        help="seconds a file must stay unchanged before it is read in --watch mode")
+    arguments = parser.parse_args(argv)
+
+    if arguments.watch:
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(message)s")
+        ingestionService = IngestionService(arguments.instrument_dir, arguments.manifest, arguments.output_dir,
+                                            arguments.poll_interval, arguments.settle_time, arguments.jobs)
+        try:
+            asyncio.run(serve(ingestionService))
+        except KeyboardInterrupt:
+            pass
+        return
+
+    if arguments.profile is not None:
+        pipelineProfiler.enable()
+    pipeline = AnalysisPipeline(jobs=arguments.jobs, modalities=arguments.modality or AnalysisPipeline.modalities,
+                                instrumentDir=arguments.instrument_dir, manifestFile=arguments.manifest,
+                                outputDir=arguments.output_dir, renderFigures=not arguments.no_figures,
+                                discoverPeaks=arguments.discover_peaks, commonGrid=arguments.common_grid,
+                                useResultsStore=not arguments.no_results_store, exportCSV=not arguments.no_csv,
+                                referenceWavenumber=arguments.reference_band)
+    startTime = time.perf_counter()
+    outputFiles = pipeline.run()
+
+    for stageName, seconds in pipeline.stageTimes.items():
+        print(f"{stageName:<25} {seconds * 1e3:>9.1f} ms")
+    print(f"{'total':<25} {(time.perf_counter() - startTime) * 1e3:>9.1f} ms")
+    for modality, files in outputFiles.items():
+        print(f"{modality}: {len(files)} output files" + (f", e.g. {files[0]}" if files else ""))
+    if arguments.profile is not None:
+        pipelineProfiler.exportChromeTrace(arguments.profile)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from Source_FTIR_HNMR.cls_FTIR_AnalysisSession import FTIR_AnalysisSession
+from Source_FTIR_HNMR.cls_FTIR_FigureRenderer import FTIR_FigureRenderer
+from Source_FTIR_HNMR.cls_FTIR_GridResampler import FTIR_GridResampler
+from Source_FTIR_HNMR.cls_HNMR_CorrelationAnalysis import HNMR_CorrelationAnalysis
+from Source_FTIR_HNMR.cls_HNMR_FattyAcidEstimator import HNMR_FattyAcidEstimator
+from Source_FTIR_HNMR.cls_ResultsStore import ResultsStore
+from Source_FTIR_HNMR.cls_SampleManifest import SampleManifest
+from Source_FTIR_HNMR.rootDir import (path_InstrumentOutputs, path_SampleManifest, path_ProgOutput_FTIR,
+                                      path_ProgOutput_HNMR, path_OutFTIR_CorrelOOP, path_OutFTIR_CorrelMapOOP,
+                                      path_OutFTIR_Figures,
+                                      path_OutNMR_CorrelAllOOP, path_OutNMR_CorrelSigOOP, path_OutNMR_FattyAcidsOOP,
+                                      path_ResultsStore)
+
+class AnalysisPipeline:
+    # Runs ingest -> peaks -> correlations -> outputs for every sample listed by the sample manifest, without any
+    # ... interactive figures. The FTIR and 1H-NMR branches do not depend on each other and run in two threads; each
+    # ... branch does its file reading (and figure rendering) in its own process pool, with the jobs split between them.
+    modalities = ("FTIR", "1H-NMR")
+
+    def __init__(self, jobs=None, modalities=modalities, instrumentDir=path_InstrumentOutputs,
+                 manifestFile=path_SampleManifest, outputDir=None, renderFigures=True, discoverPeaks=False,
+                 commonGrid=None, useResultsStore=True, exportCSV=True, referenceWavenumber=None):
+        self.jobs = jobs or os.cpu_count() or 1
+        self.modalities = tuple(modalities)
+        self.manifest = SampleManifest(instrumentDir, manifestFile)
+        self.renderFigures = renderFigures
+        self.discoverPeaks = discoverPeaks
+        # commonGrid = (low, high, spacing) in cm⁻¹ resamples spectra from different spectrometers onto one grid
+        gridResampler = None
+        if commonGrid is not None:
+            gridLow, gridHigh, gridSpacing = commonGrid
+            gridResampler = FTIR_GridResampler(low=gridLow, high=gridHigh, spacing=gridSpacing)
+        self.FTIR_Session = FTIR_AnalysisSession(gridResampler=gridResampler, referenceWavenumber=referenceWavenumber)
+
+        # Outputs are written to the usual program output folders unless another folder is given
+        self.FTIR_OutputDir = Path(outputDir) if outputDir is not None else path_ProgOutput_FTIR
+        self.HNMR_OutputDir = Path(outputDir) if outputDir is not None else path_ProgOutput_HNMR
+        self.FTIR_FiguresDir = (self.FTIR_OutputDir / path_OutFTIR_Figures.name if outputDir is not None
+                                else path_OutFTIR_Figures)
+        # Correlation results are appended to the long-format results store; the wide CSV tables are an optional export
+        self.resultsStore = None
+        if useResultsStore:
+            self.resultsStore = ResultsStore(Path(outputDir) / path_ResultsStore.name if outputDir is not None
+                                             else path_ResultsStore)
+        self.exportCSV = exportCSV
+        self.outputFiles = {}
+        self.stageTimes = {}
+
+    def branchJobs(self):
+        # The FTIR branch reads far more data than the 1H-NMR branch, so it gets the larger half of the workers
+        if len(self.modalities) == 1:
+            return {self.modalities[0]: self.jobs}
+        return {"FTIR": max(1, self.jobs - self.jobs // 2), "1H-NMR": max(1, self.jobs // 2)}
+
+    def timeStage(self, stageName, startTime):
+        self.stageTimes[stageName] = time.perf_counter() - startTime
+        return time.perf_counter()
+
+    def runFTIR(self, jobs):
+        startTime = time.perf_counter()
+        listFTIR_Outputs = self.manifest.ingest("FTIR", jobs, session=self.FTIR_Session)
+        startTime = self.timeStage("FTIR ingest", startTime)
+        self.FTIR_Session.sortFTIRs()
+        if self.discoverPeaks:
+            self.FTIR_Session.discoverPeaksAll()
+        else:
+            self.FTIR_Session.generatePeaksAll()
+        startTime = self.timeStage("FTIR peaks", startTime)
+
+        FTIR_CorrelationObj = self.FTIR_Session.correlationAnalysis()
+        FTIR_CorrelationObj.generateCorrelations()
+        FTIR_CorrelationMapObj = self.FTIR_Session.correlationMap()
+        FTIR_CorrelationMapObj.generateCorrelations()
+        startTime = self.timeStage("FTIR correlations", startTime)
+        self.FTIR_OutputDir.mkdir(parents=True, exist_ok=True)
+        FTIR_CorrelationMapObj.saveCorrelationMap(self.FTIR_OutputDir, path_OutFTIR_CorrelMapOOP.name)
+        outputFiles = [self.FTIR_OutputDir / path_OutFTIR_CorrelMapOOP.name]
+        if self.exportCSV:
+            FTIR_CorrelationObj.saveCorrelations(self.FTIR_OutputDir, path_OutFTIR_CorrelOOP.name)
+            outputFiles.append(self.FTIR_OutputDir / path_OutFTIR_CorrelOOP.name)
+        if self.resultsStore is not None:
+            runNumber = FTIR_CorrelationObj.appendResults(self.resultsStore)
+            outputFiles += [self.resultsStore.segmentPath(runNumber, tableName) for tableName in ResultsStore.tableNames]
+        if self.renderFigures:
+            outputFiles += FTIR_FigureRenderer().renderAll(listFTIR_Outputs, self.FTIR_FiguresDir, jobs)
+        self.timeStage("FTIR outputs", startTime)
+        return outputFiles
+
+    def runHNMR(self, jobs):
+        startTime = time.perf_counter()
+        listHNMR_Outputs = self.manifest.ingest("1H-NMR", jobs)
+        startTime = self.timeStage("1H-NMR ingest", startTime)
+
+        HNMR_CorrelationObj = HNMR_CorrelationAnalysis(listHNMR_Outputs)
+        HNMR_CorrelationObj.groupPeaks()
+        startTime = self.timeStage("1H-NMR peaks", startTime)
+        HNMR_CorrelationObj.generateCorrelations()
+        startTime = self.timeStage("1H-NMR correlations", startTime)
+        HNMR_FattyAcidObj = HNMR_FattyAcidEstimator()
+        HNMR_FattyAcidObj.estimateHNMROutputs(listHNMR_Outputs)
+        startTime = self.timeStage("1H-NMR fatty-acid estimates", startTime)
+
+        # The estimates are one row per sample, so they are written alongside the correlations even without CSV export
+        self.HNMR_OutputDir.mkdir(parents=True, exist_ok=True)
+        HNMR_FattyAcidObj.saveEstimates(self.HNMR_OutputDir, path_OutNMR_FattyAcidsOOP.name)
+        outputFiles = [self.HNMR_OutputDir / path_OutNMR_FattyAcidsOOP.name]
+        if self.exportCSV:
+            self.HNMR_OutputDir.mkdir(parents=True, exist_ok=True)
+            HNMR_CorrelationObj.saveCorrelations(self.HNMR_OutputDir, path_OutNMR_CorrelAllOOP.name,
+                                                 path_OutNMR_CorrelSigOOP.name)
+            outputFiles += [self.HNMR_OutputDir / path_OutNMR_CorrelAllOOP.name,
+                            self.HNMR_OutputDir / path_OutNMR_CorrelSigOOP.name]
+        if self.resultsStore is not None:
+            runNumber = HNMR_CorrelationObj.appendResults(self.resultsStore)
+            outputFiles += [self.resultsStore.segmentPath(runNumber, tableName) for tableName in ResultsStore.tableNames]
+        self.timeStage("1H-NMR outputs", startTime)
+        return outputFiles
+
+    def run(self):
+        branches = {"FTIR": self.runFTIR, "1H-NMR": self.runHNMR}
+        branchJobs = self.branchJobs()
+        with ThreadPoolExecutor(max_workers=len(self.modalities)) as executor:
+            futures = {modality: executor.submit(branches[modality], branchJobs[modality])
+                       for modality in self.modalities}
+            # result() re-raises the first error of a branch after both branches have been given the chance to finish
+            self.outputFiles = {modality: future.result() for modality, future in futures.items()}
+        return self.outputFiles
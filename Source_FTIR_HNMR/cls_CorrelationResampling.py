@@ -0,0 +1,129 @@
+import itertools
+import math
+import os
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+def resampledCorrelations(xResampled, responseResampled):
+    # Pearson coefficients of every resample (rows of xResampled) against every column of the response, where the
+    # ... response is either shared by all resamples (samples x peaks) or resampled too (resamples x samples x peaks)
+    xCentered = xResampled - xResampled.mean(axis=1, keepdims=True)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if responseResampled.ndim == 2:
+            responseCentered = responseResampled - responseResampled.mean(axis=0)
+            crossProducts = xCentered @ responseCentered
+            responseNorms = np.sqrt(np.einsum("ij,ij->j", responseCentered, responseCentered))[None, :]
+        else:
+            responseCentered = responseResampled - responseResampled.mean(axis=1, keepdims=True)
+            crossProducts = np.einsum("bi,bij->bj", xCentered, responseCentered)
+            responseNorms = np.sqrt(np.einsum("bij,bij->bj", responseCentered, responseCentered))
+        xNorms = np.sqrt(np.einsum("bi,bi->b", xCentered, xCentered))[:, None]
+        return np.clip(crossProducts / (xNorms * responseNorms), -1.0, 1.0)
+
+def permutationBlock(xValues, responseMatrix, observedCoeffs, seed, blockIndex, blockSize):
+    # Runs in a worker process: count the random permutations whose |r| reaches the observed |r|, per peak. Each
+    # ... block draws from its own seeded stream, so the result does not depend on the number of workers.
+    randomGenerator = np.random.default_rng([seed, 0, blockIndex])
+    indexMatrix = randomGenerator.permuted(np.tile(np.arange(xValues.shape[0]), (blockSize, 1)), axis=1)
+    permutedCoeffs = resampledCorrelations(xValues[indexMatrix], responseMatrix)
+    return (np.abs(permutedCoeffs) >= np.abs(observedCoeffs) - CorrelationResampling.tieTolerance).sum(axis=0)
+
+def bootstrapBlock(xValues, responseMatrix, seed, blockIndex, blockSize):
+    # Runs in a worker process: correlations of blockSize bootstrap draws (samples drawn with replacement)
+    randomGenerator = np.random.default_rng([seed, 1, blockIndex])
+    indexMatrix = randomGenerator.integers(0, xValues.shape[0], (blockSize, xValues.shape[0]))
+    return resampledCorrelations(xValues[indexMatrix], responseMatrix[indexMatrix])
+
+class CorrelationResampling:
+    # Permutation p-values and bootstrap confidence intervals for the Pearson correlation of one variable against many
+    # ... peaks. Resamples are generated as index matrices in blocks and every peak of a block is correlated at once;
+    # ... blocks are sized so that the arrays of one block stay within memoryBudget (bytes, per worker) and are spread
+    # ... over a process pool when jobs > 1. When all permutations of the samples number no more than
+    # ... numberOfResamples, the permutation test enumerates them exactly instead.
+    tieTolerance = 1e-12
+
+    def __init__(self, numberOfResamples=10000, seed=0, jobs=1, memoryBudget=64 * 1024 ** 2, confidenceLevel=0.95):
+        self.numberOfResamples = numberOfResamples
+        self.seed = seed
+        self.jobs = jobs or os.cpu_count() or 1
+        self.memoryBudget = memoryBudget
+        self.confidenceLevel = confidenceLevel
+
+    def blockSizes(self, bytesPerResample):
+        blockSize = max(1, min(self.numberOfResamples, self.memoryBudget // bytesPerResample))
+        return [min(blockSize, self.numberOfResamples - start)
+                for start in range(0, self.numberOfResamples, blockSize)]
+
+    def runBlocks(self, blockFunction, sharedArguments, bytesPerResample):
+        blockSizes = self.blockSizes(bytesPerResample)
+        blockArguments = [sharedArguments + (self.seed, blockIndex, blockSize)
+                          for blockIndex, blockSize in enumerate(blockSizes)]
+        if self.jobs == 1 or len(blockSizes) == 1:
+            return [blockFunction(*arguments) for arguments in blockArguments]
+        with ProcessPoolExecutor(max_workers=min(self.jobs, len(blockSizes))) as executor:
+            return list(executor.map(blockFunction, *zip(*blockArguments)))
+
+    def permutationPValues(self, xValues, responseMatrix):
+        xValues, responseMatrix = np.asarray(xValues, dtype=float), np.asarray(responseMatrix, dtype=float)
+        observedCoeffs = resampledCorrelations(xValues[None, :], responseMatrix)[0]
+        numberOfSamples = xValues.shape[0]
+        if math.factorial(numberOfSamples) <= self.numberOfResamples:
+            # Exact test: the observed ordering is one of the permutations, so the smallest p-value is 1 / n!
+            indexMatrix = np.array(list(itertools.permutations(range(numberOfSamples))))
+            permutedCoeffs = resampledCorrelations(xValues[indexMatrix], responseMatrix)
+            extremeCounts = (np.abs(permutedCoeffs) >= np.abs(observedCoeffs) - CorrelationResampling.tieTolerance)
+            return np.where(np.isnan(observedCoeffs), np.nan, extremeCounts.sum(axis=0) / indexMatrix.shape[0])
+        # A permutation holds its index row, the permuted x and its centered copy
+        extremeCounts = sum(self.runBlocks(permutationBlock, (xValues, responseMatrix, observedCoeffs),
+                                           8 * numberOfSamples * 3 + 8 * responseMatrix.shape[1]))
+        return np.where(np.isnan(observedCoeffs), np.nan, (extremeCounts + 1) / (self.numberOfResamples + 1))
+
+    def bootstrapIntervals(self, xValues, responseMatrix):
+        # Percentile intervals; draws in which x or a peak is constant have no coefficient and are left out
+        xValues, responseMatrix = np.asarray(xValues, dtype=float), np.asarray(responseMatrix, dtype=float)
+        # A bootstrap draw holds its index row, the drawn x and drawn peaks, and a centered copy of both
+        numberOfSamples, numberOfPeaks = responseMatrix.shape
+        bootstrapCoeffs = np.concatenate(self.runBlocks(bootstrapBlock, (xValues, responseMatrix),
+                                                        8 * numberOfSamples * (3 + 2 * numberOfPeaks)))
+        tailPercent = 50 * (1 - self.confidenceLevel)
+        with warnings.catch_warnings():
+            # A peak without any coefficient (constant, like the reference peak) gets a NaN interval, silently
+            warnings.simplefilter("ignore", RuntimeWarning)
+            intervalLow, intervalHigh = np.nanpercentile(bootstrapCoeffs, [tailPercent, 100 - tailPercent], axis=0)
+        return intervalLow, intervalHigh
+
+    def resample(self, xValues, responseMatrix):
+        # Peaks with missing values (NaN) are resampled over their own samples, grouped by which samples they have
+        xValues = np.asarray(xValues, dtype=float)
+        responseMatrix = np.asarray(responseMatrix, dtype=float)
+        if responseMatrix.ndim == 1:
+            responseMatrix = responseMatrix[:, None]
+        numberOfPeaks = responseMatrix.shape[1]
+        pValues, intervalLow, intervalHigh = (np.full(numberOfPeaks, np.nan) for _ in range(3))
+        presencePatterns = ~np.isnan(responseMatrix)
+        for presencePattern in np.unique(presencePatterns.T, axis=0):
+            peakColumns = np.flatnonzero((presencePatterns.T == presencePattern).all(axis=1))
+            if presencePattern.sum() < 3:
+                continue
+            xPresent = xValues[presencePattern]
+            responsePresent = responseMatrix[np.ix_(presencePattern, peakColumns)]
+            pValues[peakColumns] = self.permutationPValues(xPresent, responsePresent)
+            intervalLow[peakColumns], intervalHigh[peakColumns] = self.bootstrapIntervals(xPresent, responsePresent)
+        return pValues, intervalLow, intervalHigh
+
+    def addColumns(self, DFPeakCorrelation, xValues, responseMatrix):
+        # Insert the resampling columns after the parametric p-value of a correlation table; columns left by an
+        # ... earlier run are overwritten in place
+        pValues, intervalLow, intervalHigh = self.resample(xValues, responseMatrix)
+        insertAt = DFPeakCorrelation.columns.get_loc("p-value") + 1
+        confidencePercent = f"{self.confidenceLevel:.0%}"
+        for columnName, columnValues in (("Permutation p-value", pValues),
+                                         (f"Bootstrap {confidencePercent} CI Low", intervalLow),
+                                         (f"Bootstrap {confidencePercent} CI High", intervalHigh)):
+            if columnName in DFPeakCorrelation.columns:
+                DFPeakCorrelation[columnName] = columnValues
+            else:
+                DFPeakCorrelation.insert(insertAt, columnName, columnValues)
+                insertAt += 1
+        return DFPeakCorrelation
@@ -0,0 +1,72 @@
+from Source_FTIR_HNMR.cls_FTIR_CorrelationAnalysis import FTIR_CorrelationAnalysis
+from Source_FTIR_HNMR.cls_FTIR_CorrelationMap import FTIR_CorrelationMap
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_FTIR_PeakDiscovery import FTIR_PeakDiscovery
+from Source_FTIR_HNMR.cls_SampleRegistry import SampleRegistry
+
+class FTIR_AnalysisSession:
+    # The sample set and peak-window configuration of one FTIR analysis. FTIR_Output keeps this state in class
+    # ... attributes for a single process-wide analysis; a session keeps it per instance under the same names, so that
+    # ... analyses of different samples or windows can run side by side in threads. Samples of a session take their
+    # ... peak windows from it and report their loaded data to its own SampleRegistry. The spectrum and results caches
+    # ... stay shared by all sessions. A session with an FTIR_GridResampler extracts peaks and maps correlations on its
+    # ... common grid, so its samples may come from spectrometers with different wavenumber grids. Relative heights are
+    # ... measured against the peak of the window containing referenceWavenumber.
+    def __init__(self, peakScanRange_High=None, peakScanRange_Low=None, peakVibrations=None,
+                 memoryBudget=256 * 1024 ** 2, gridResampler=None, referenceWavenumber=None):
+        self.listFTIR_Outputs = SampleRegistry(memoryBudget=memoryBudget)
+        self.gridResampler = gridResampler
+        self.referenceWavenumber = (FTIR_Output.referenceWavenumber if referenceWavenumber is None
+                                    else referenceWavenumber)
+        self.numberOfSamples = 0
+        self.setPeakPosition_and_Vibration(
+            FTIR_Output.peakScanRange_High if peakScanRange_High is None else peakScanRange_High,
+            FTIR_Output.peakScanRange_Low if peakScanRange_Low is None else peakScanRange_Low,
+            FTIR_Output.peakVibrations if peakVibrations is None else peakVibrations)
+
+    def newSample(self, CSV_FTIRFile, **sampleKwargs):
+        return FTIR_Output(CSV_FTIRFile, session=self, **sampleKwargs)
+
+    def addSample(self, FTIRObj):
+        FTIRObj.session = self
+        self.listFTIR_Outputs.append(FTIRObj)
+        self.numberOfSamples = len(self.listFTIR_Outputs)
+
+    def removeSample(self, FTIRObj):
+        self.listFTIR_Outputs.remove(FTIRObj)
+        self.numberOfSamples = len(self.listFTIR_Outputs)
+
+    def setMemoryBudget(self, memoryBudget):
+        self.listFTIR_Outputs.setMemoryBudget(memoryBudget)
+
+    def sortFTIRs(self):
+        self.listFTIR_Outputs.sort(key = lambda FTIRObj: FTIRObj.fraction_CanolaOil)
+
+    def setPeakPosition_and_Vibration(self, peakScanRange_High, peakScanRange_Low, peakVibrations,
+                                      referenceWavenumber=None):
+        # Copies are kept, so that later changes to the caller's lists do not reach this session
+        if referenceWavenumber is not None:
+            self.referenceWavenumber = referenceWavenumber
+        self.peakScanRange_High = list(peakScanRange_High)
+        self.peakScanRange_Low = list(peakScanRange_Low)
+        self.peakVibrations = list(peakVibrations)
+        self.numberOfPeaks = len(self.peakVibrations)
+
+    def generatePeaksAll(self):
+        FTIR_Output.generatePeaksBatch(self.listFTIR_Outputs, self.peakScanRange_High, self.peakScanRange_Low,
+                                       self.peakVibrations, self.gridResampler, self.referenceWavenumber)
+
+    def discoverPeaksAll(self, peakDiscovery=None):
+        peakDiscovery = (peakDiscovery if peakDiscovery is not None
+                         else FTIR_PeakDiscovery(referenceWavenumber=self.referenceWavenumber))
+        peakDiscovery.discoverFTIROutputs(self.listFTIR_Outputs)
+        self.setPeakPosition_and_Vibration(peakDiscovery.peakScanRange_High, peakDiscovery.peakScanRange_Low,
+                                           peakDiscovery.peakVibrations, peakDiscovery.referenceWavenumber)
+        self.generatePeaksAll()
+        return peakDiscovery
+
+    def correlationAnalysis(self, lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil):
+        return FTIR_CorrelationAnalysis(self.listFTIR_Outputs, lambdaKey, session=self)
+
+    def correlationMap(self, lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil, chunkSize = 256):
+        return FTIR_CorrelationMap(self.listFTIR_Outputs, lambdaKey, chunkSize, self.gridResampler)
@@ -1,55 +1,122 @@
+import numpy as np
 import pandas as pd
-from scipy.stats.mstats import pearsonr
+from Source_FTIR_HNMR.cls_CorrelationResampling import CorrelationResampling
 from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.pearsonKernel import pearsonMatrix, trendLabels
 from Source_FTIR_HNMR.rootDir import path_OutFTIR_CorrelOOP
 
 class FTIR_CorrelationAnalysis:
-    def __init__(self, listFTIR_Outputs = [], lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil):
+    def __init__(self, listFTIR_Outputs = [], lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil, session = None):
+        # The peak windows are taken from the analysis session (or the FTIR_Output class) when the analysis is created
+        session = session if session is not None else FTIR_Output
         self.listFTIR_Outputs = listFTIR_Outputs.copy()
         self.listFTIR_Outputs.sort(key = lambdaKey)
         self.numberOfSamples = len(self.listFTIR_Outputs)
-        self.numberOfPeaks = FTIR_Output.numberOfPeaks
+        self.numberOfPeaks = session.numberOfPeaks
         self.lambdaKey = lambdaKey
-        self.peakScanRange_High = FTIR_Output.peakScanRange_High
-        self.peakScanRange_Low = FTIR_Output.peakScanRange_Low
-        self.peakVibrations = FTIR_Output.peakVibrations
+        self.peakScanRange_High = list(session.peakScanRange_High)
+        self.peakScanRange_Low = list(session.peakScanRange_Low)
+        self.peakVibrations = list(session.peakVibrations)
 
     def generateCorrelations(self):
         # Construct a dataframe summarizing the wavenumbers, transmittance, and relative heights of peaks per sample
         # ... where each row represents a peak and the peak from 3050 to 2900 cm(-1) has a relative height of 1
-        DFPeakCorrelation_List = []
         names_FTIRSamples = [FTIRObj.sampleName_Short for FTIRObj in self.listFTIR_Outputs]
         percentCanola_FTIRSamples = [FTIRObj.fraction_CanolaOil for FTIRObj in self.listFTIR_Outputs]
-        DFPeakCorrelation_Columns = (
-                    (["Peak Number", "Peak Range (cm⁻¹)", "Type of Vibration", "Average Peak Wavenumber (cm⁻¹)"]
-                     + [f"Relative Height in {x} ({y:.1%} CO)" for x, y in zip(names_FTIRSamples,
-                                                                               percentCanola_FTIRSamples)])
-                    + ["Pearson Coefficient", "p-value", "Significant? (p < 5%)", "Trend"])
-        for peakIndex in range(self.numberOfPeaks):
-            peakNumber = peakIndex + 1
-            peakRange = f'{self.peakScanRange_Low[peakIndex]}-{self.peakScanRange_High[peakIndex]}'
-            typeVibration = self.peakVibrations[peakIndex]
-            peakWavenumbers = []
-            relativeHeights = []
-            for sampleIndex in range(self.numberOfSamples):
-                peakWavenumbers.append(self.listFTIR_Outputs[sampleIndex].listFTIRPeaks[peakIndex].wavenumber)
-                relativeHeights.append(self.listFTIR_Outputs[sampleIndex].listFTIRPeaks[peakIndex].relativeHeight)
-            averageWavenumber = sum(peakWavenumbers) / self.numberOfSamples
-            pearsonResults = pearsonr(percentCanola_FTIRSamples, relativeHeights)
-            pearsonCoeff, pValue = pearsonResults
-            boolSignificance = pValue < 0.05
-            if not boolSignificance:
-                signTrend = "Trend not significant"
-            else:
-                if pearsonCoeff > 0:
-                    signTrend = "Positive trend (+)"
-                else:
-                    signTrend = "Negative trend (-)"
-            DFRow = ([peakNumber, peakRange, typeVibration, averageWavenumber] + relativeHeights
-                     + [pearsonCoeff, pValue, boolSignificance, signTrend])
-            DFPeakCorrelation_List.append(DFRow)
-        DFPeakCorrelation = pd.DataFrame(DFPeakCorrelation_List, columns=DFPeakCorrelation_Columns)
-        self.DFPeakCorrelation = DFPeakCorrelation
+        with pipelineProfiler.stage("FTIR peak matrices", items=self.numberOfSamples):
+            peakWavenumbers, relativeHeights = self.collectPeakMatrices()
+
+        # A run on the same peaks, samples and windows reuses the correlation table of the earlier run
+        resultsCache = FTIR_Output.resultsCache
+        if resultsCache is not None:
+            correlationKey = resultsCache.entryKey("correlations", peakWavenumbers, relativeHeights, names_FTIRSamples,
+                                                   percentCanola_FTIRSamples, self.peakScanRange_High,
+                                                   self.peakScanRange_Low, self.peakVibrations)
+            self.DFPeakCorrelation = resultsCache.getDataFrame("correlations", correlationKey)
+            if self.DFPeakCorrelation is not None:
+                return
+
+        # Correlate every peak against the mass fraction of canola oil in a single pass (samples x peaks)
+        with pipelineProfiler.stage("FTIR Pearson correlations", items=self.numberOfPeaks):
+            pearsonCoeffs, pValues = pearsonMatrix(percentCanola_FTIRSamples, relativeHeights)
+            boolSignificance, signTrend = trendLabels(pearsonCoeffs, pValues)
+
+        with pipelineProfiler.stage("FTIR correlation DataFrame", items=self.numberOfPeaks):
+            DFPeakCorrelation_Dict = {
+                "Peak Number": np.arange(1, self.numberOfPeaks + 1),
+                "Peak Range (cm⁻¹)": [f'{low}-{high}' for low, high in zip(self.peakScanRange_Low,
+                                                                          self.peakScanRange_High)],
+                "Type of Vibration": list(self.peakVibrations),
+                "Average Peak Wavenumber (cm⁻¹)": peakWavenumbers.sum(axis=0) / self.numberOfSamples}
+            for sampleIndex, (x, y) in enumerate(zip(names_FTIRSamples, percentCanola_FTIRSamples)):
+                DFPeakCorrelation_Dict[f"Relative Height in {x} ({y:.1%} CO)"] = relativeHeights[sampleIndex]
+            DFPeakCorrelation_Dict.update({"Pearson Coefficient": pearsonCoeffs,
+                                           "p-value": pValues,
+                                           "Significant? (p < 5%)": boolSignificance,
+                                           "Trend": signTrend})
+            self.DFPeakCorrelation = pd.DataFrame(DFPeakCorrelation_Dict)
+        if resultsCache is not None:
+            resultsCache.putDataFrame("correlations", correlationKey, self.DFPeakCorrelation)
+
+    def generateResampledSignificance(self, numberOfResamples=10000, seed=0, jobs=1, confidenceLevel=0.95):
+        # Add permutation p-values and bootstrap confidence intervals of the coefficients to the correlation table
+        if not hasattr(self, "DFPeakCorrelation"):
+            self.generateCorrelations()
+        with pipelineProfiler.stage("FTIR resampled significance", items=numberOfResamples):
+            peakWavenumbers, relativeHeights = self.collectPeakMatrices()
+            correlationResampling = CorrelationResampling(numberOfResamples, seed, jobs, confidenceLevel=confidenceLevel)
+            correlationResampling.addColumns(self.DFPeakCorrelation,
+                                             [FTIRObj.fraction_CanolaOil for FTIRObj in self.listFTIR_Outputs],
+                                             relativeHeights)
+
+    def collectPeakMatrices(self):
+        # Gather the peak wavenumbers and relative heights of all samples as (samples x peaks) arrays; samples whose
+        # ... peaks all live in one FTIR_PeakTable are gathered with a single row selection
+        peakTables = {id(FTIRObj.peakTable) for FTIRObj in self.listFTIR_Outputs}
+        if len(peakTables) == 1 and self.listFTIR_Outputs and self.listFTIR_Outputs[0].peakTable is not None:
+            peakTable = self.listFTIR_Outputs[0].peakTable
+            peakTableRows = [FTIRObj.peakTableRow for FTIRObj in self.listFTIR_Outputs]
+            return peakTable.peakWavenumbers[peakTableRows], peakTable.peakRelativeHeights[peakTableRows]
+        peakWavenumbers = np.empty((self.numberOfSamples, self.numberOfPeaks))
+        relativeHeights = np.empty((self.numberOfSamples, self.numberOfPeaks))
+        for sampleIndex, FTIRObj in enumerate(self.listFTIR_Outputs):
+            relativeHeights[sampleIndex], peakWavenumbers[sampleIndex] = FTIRObj.peakArrays()
+        return peakWavenumbers, relativeHeights
+
+    def longTables(self):
+        # The correlation table in long format, for the ResultsStore: (sample, peak) observations and peak statistics
+        peakWavenumbers, relativeHeights = self.collectPeakMatrices()
+        sampleIndices = np.repeat(np.arange(self.numberOfSamples), self.numberOfPeaks)
+        peakIndices = np.tile(np.arange(self.numberOfPeaks), self.numberOfSamples)
+        peakLow, peakHigh = np.asarray(self.peakScanRange_Low, dtype=float), np.asarray(self.peakScanRange_High,
+                                                                                      dtype=float)
+        peakVibrations = np.asarray(self.peakVibrations, dtype=str)
+        DFObservations = pd.DataFrame({
+            "Sample Name (Short)": np.asarray([FTIRObj.sampleName_Short for FTIRObj in self.listFTIR_Outputs],
+                                              dtype=str)[sampleIndices],
+            "Canola Mass Fraction": np.asarray([FTIRObj.fraction_CanolaOil for FTIRObj in self.listFTIR_Outputs],
+                                               dtype=float)[sampleIndices],
+            "Peak Number": peakIndices + 1,
+            "Range Low": peakLow[peakIndices],
+            "Range High": peakHigh[peakIndices],
+            "Type of Vibration": peakVibrations[peakIndices],
+            "Peak Position": peakWavenumbers.ravel(),
+            "Value": relativeHeights.ravel()})
+        DFPeakStatistics = pd.DataFrame({"Peak Number": np.arange(1, self.numberOfPeaks + 1),
+                                         "Range Low": peakLow,
+                                         "Range High": peakHigh,
+                                         "Type of Vibration": peakVibrations})
+        # The statistics are the columns from the Pearson coefficient on, including any resampling columns
+        statisticsStart = self.DFPeakCorrelation.columns.get_loc("Pearson Coefficient")
+        for columnName in self.DFPeakCorrelation.columns[statisticsStart:]:
+            DFPeakStatistics[columnName] = self.DFPeakCorrelation[columnName].to_numpy()
+        return DFObservations, DFPeakStatistics
+
+    def appendResults(self, resultsStore, label=""):
+        with pipelineProfiler.stage("FTIR results store append", items=self.numberOfSamples * self.numberOfPeaks):
+            return resultsStore.append("FTIR", *self.longTables(), label=label)
 
     def saveCorrelations(self, FTIR_OutputDir, CSVFileName=path_OutFTIR_CorrelOOP):
-        self.DFPeakCorrelation.to_csv(FTIR_OutputDir / CSVFileName, index=False)
+        with pipelineProfiler.stage("FTIR correlation CSV", items=self.DFPeakCorrelation.shape[0]):
+            self.DFPeakCorrelation.to_csv(FTIR_OutputDir / CSVFileName, index=False)
@@ -0,0 +1,97 @@
+import numpy as np
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.pearsonKernel import pearsonPValues
+from Source_FTIR_HNMR.rootDir import path_OutFTIR_CorrelMapOOP
+
+class FTIR_CorrelationMap:
+    # Correlates the transmittance at every wavenumber of the spectrum with the mass fraction of canola oil. Samples
+    # ... are read chunkSize at a time and each chunk is reduced to means, sums of squared deviations and co-moments
+    # ... per wavenumber, which are merged into the running totals (Chan et al.), so memory stays at about
+    # ... chunkSize x points values however many samples there are. With an FTIR_GridResampler, the map is computed on
+    # ... its common grid and the spectra may come from different grids. As in FTIR_CorrelationAnalysis, lambdaKey only
+    # ... orders the samples; the correlated variable is always the canola fraction.
+    def __init__(self, listFTIR_Outputs = [], lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil, chunkSize = 256,
+                 gridResampler = None):
+        self.listFTIR_Outputs = list(listFTIR_Outputs)
+        self.listFTIR_Outputs.sort(key = lambdaKey)
+        self.numberOfSamples = len(self.listFTIR_Outputs)
+        self.lambdaKey = lambdaKey
+        self.chunkSize = chunkSize
+        self.gridResampler = gridResampler
+
+    def resetStatistics(self, numberOfPoints):
+        self.countSamples = 0
+        self.meanFraction = 0.0
+        self.M2Fraction = 0.0
+        self.meanTransmittances = np.zeros(numberOfPoints)
+        self.M2Transmittances = np.zeros(numberOfPoints)
+        self.coMoments = np.zeros(numberOfPoints)
+
+    def mergeChunk(self, fractions, transmittances):
+        # Statistics of the chunk on its own, then combined with the totals of the previous chunks
+        chunkCount = fractions.shape[0]
+        chunkMeanFraction = fractions.mean()
+        chunkMeanTransmittances = transmittances.mean(axis=0)
+        fractionsCentered = fractions - chunkMeanFraction
+        transmittancesCentered = transmittances - chunkMeanTransmittances
+        chunkM2Fraction = fractionsCentered @ fractionsCentered
+        chunkM2Transmittances = np.einsum("ij,ij->j", transmittancesCentered, transmittancesCentered)
+        chunkCoMoments = fractionsCentered @ transmittancesCentered
+
+        totalCount = self.countSamples + chunkCount
+        deltaFraction = chunkMeanFraction - self.meanFraction
+        deltaTransmittances = chunkMeanTransmittances - self.meanTransmittances
+        weight = self.countSamples * chunkCount / totalCount
+        self.M2Fraction += chunkM2Fraction + deltaFraction ** 2 * weight
+        self.M2Transmittances += chunkM2Transmittances + deltaTransmittances ** 2 * weight
+        self.coMoments += chunkCoMoments + deltaFraction * deltaTransmittances * weight
+        self.meanFraction += deltaFraction * chunkCount / totalCount
+        self.meanTransmittances += deltaTransmittances * chunkCount / totalCount
+        self.countSamples = totalCount
+
+    def readChunk(self, chunkFTIR_Outputs, transmittances):
+        # Fill the first rows of transmittances with the spectra of the chunk
+        if self.gridResampler is not None:
+            transmittances[:len(chunkFTIR_Outputs)] = self.gridResampler.stackFTIROutputs(chunkFTIR_Outputs)
+            return
+        for chunkIndex, FTIRObj in enumerate(chunkFTIR_Outputs):
+            DFSample = FTIRObj.DFSample
+            sampleWavenumbers = DFSample["Wavenumber"].to_numpy(dtype=float)
+            if not np.array_equal(sampleWavenumbers, self.wavenumbers):
+                raise ValueError(f"{FTIRObj.CSV_FTIRFile} does not share the wavenumber grid of the other spectra.")
+            transmittances[chunkIndex] = DFSample["Percent Transmittance"].to_numpy(dtype=float)
+
+    def generateCorrelations(self):
+        with pipelineProfiler.stage("FTIR correlation map", items=self.numberOfSamples):
+            if self.numberOfSamples == 0:
+                raise ValueError("The correlation map needs at least one FTIR sample.")
+            if self.gridResampler is not None:
+                self.wavenumbers = self.gridResampler.commonGrid.copy()
+            else:
+                self.wavenumbers = self.listFTIR_Outputs[0].DFSample["Wavenumber"].to_numpy(dtype=float).copy()
+            numberOfPoints = self.wavenumbers.shape[0]
+            self.resetStatistics(numberOfPoints)
+            transmittances = np.empty((min(self.chunkSize, self.numberOfSamples), numberOfPoints))
+            for start in range(0, self.numberOfSamples, self.chunkSize):
+                chunkFTIR_Outputs = self.listFTIR_Outputs[start:start + self.chunkSize]
+                self.readChunk(chunkFTIR_Outputs, transmittances)
+                fractions = np.array([FTIRObj.fraction_CanolaOil for FTIRObj in chunkFTIR_Outputs], dtype=float)
+                self.mergeChunk(fractions, transmittances[:len(chunkFTIR_Outputs)])
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                self.pearsonCoeffs = np.clip(self.coMoments / np.sqrt(self.M2Fraction * self.M2Transmittances),
+                                             -1.0, 1.0)
+            self.pValues = pearsonPValues(self.pearsonCoeffs, self.countSamples)
+
+    def saveCorrelationMap(self, FTIR_OutputDir, NPZFileName=path_OutFTIR_CorrelMapOOP):
+        # Compressed .npz; r and p are stored in single precision, which is ample for a map and halves the file
+        np.savez_compressed(FTIR_OutputDir / NPZFileName,
+                            wavenumbers=self.wavenumbers,
+                            pearsonCoeffs=self.pearsonCoeffs.astype(np.float32),
+                            pValues=self.pValues.astype(np.float32),
+                            numberOfSamples=np.int64(self.countSamples))
+
+    @staticmethod
+    def loadCorrelationMap(NPZFile):
+        with np.load(NPZFile, allow_pickle=False) as correlationMap:
+            return {name: correlationMap[name] for name in correlationMap.files}
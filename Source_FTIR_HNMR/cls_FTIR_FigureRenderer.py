@@ -0,0 +1,72 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from Source_FTIR_HNMR.spectrumDecimation import decimate
+from Source_FTIR_HNMR.rootDir import path_OutFTIR_Figures
+
+def renderChunk(listFTIR_Outputs, outputDir, rendererOptions):
+    # Runs in a worker process: one figure template is built and reused for every sample of the chunk
+    renderer = FTIR_FigureRenderer(**rendererOptions)
+    return [renderer.renderSample(FTIRObj, outputDir / renderer.fileName(FTIRObj)) for FTIRObj in listFTIR_Outputs]
+
+class FTIR_FigureRenderer:
+    # Draws FTIR spectra to PNG/SVG files without a display. The figure is created on the Agg canvas directly, so it
+    # ... does not depend on the pyplot backend, and a single figure, axis and line are reused for every sample.
+    def __init__(self, figsize=(10, 4.8), dpi=100, spacing=0.15, linewidth=0.8, decimation="minmax",
+                 numberOfPoints=2000, fileFormat="png"):
+        # matplotlib is only imported once a renderer is created, keeping it out of the package import
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+        from matplotlib.ticker import MultipleLocator
+        self.figsize = figsize
+        self.dpi = dpi
+        self.spacing = spacing
+        self.linewidth = linewidth
+        self.decimation = decimation
+        self.numberOfPoints = numberOfPoints
+        self.fileFormat = fileFormat
+
+        self.figure = Figure(figsize=figsize, dpi=dpi)
+        FigureCanvasAgg(self.figure)
+        self.axis = self.figure.add_subplot()
+        self.line, = self.axis.plot([], [], linewidth=linewidth)
+        self.axis.set(xlabel="Wavenumber [cm⁻¹]", ylabel="Transmittance (%)")
+        self.axis.xaxis.set_minor_locator(MultipleLocator(100))
+        self.axis.yaxis.set_minor_locator(MultipleLocator(2))
+
+    def options(self):
+        return {"figsize": self.figsize, "dpi": self.dpi, "spacing": self.spacing, "linewidth": self.linewidth,
+                "decimation": self.decimation, "numberOfPoints": self.numberOfPoints, "fileFormat": self.fileFormat}
+
+    def fileName(self, FTIRObj):
+        return f"{Path(FTIRObj.CSV_FTIRFile).stem}.{self.fileFormat}"
+
+    def renderSample(self, FTIRObj, outputFile):
+        wavenumberCol = FTIRObj.DFSample["Wavenumber"].to_numpy()
+        transmittanceCol = FTIRObj.DFSample["Percent Transmittance"].to_numpy()
+        self.line.set_data(*decimate(wavenumberCol, transmittanceCol, self.decimation, self.numberOfPoints))
+        self.line.set_color(FTIRObj.plotColor)
+        self.axis.set_title(FTIRObj.sampleName_Full + " in " + FTIRObj.sampleMedium + "\n Infrared Spectrum")
+
+        # Set the limits for the y-axis, then the x-axis in reverse direction, from the full (undecimated) spectrum
+        ymax, ymin = transmittanceCol.max(), transmittanceCol.min()
+        yrange = ymax - ymin
+        self.axis.set_ylim(ymin - self.spacing * yrange, ymax + self.spacing * yrange)
+        self.axis.set_xlim(wavenumberCol.max(), wavenumberCol.min())
+        self.figure.savefig(outputFile, format=self.fileFormat)
+        return outputFile
+
+    def renderAll(self, listFTIR_Outputs, outputDir=path_OutFTIR_Figures, jobs=None):
+        # Split the samples into one contiguous chunk per worker; each worker reuses its own figure template
+        outputDir = Path(outputDir)
+        outputDir.mkdir(parents=True, exist_ok=True)
+        listFTIR_Outputs = list(listFTIR_Outputs)
+        jobs = min(jobs or os.cpu_count() or 1, max(len(listFTIR_Outputs), 1))
+        if jobs == 1:
+            return [self.renderSample(FTIRObj, outputDir / self.fileName(FTIRObj)) for FTIRObj in listFTIR_Outputs]
+        chunkSize = -(-len(listFTIR_Outputs) // jobs)
+        chunks = [listFTIR_Outputs[start:start + chunkSize] for start in range(0, len(listFTIR_Outputs), chunkSize)]
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            renderedChunks = executor.map(renderChunk, chunks, [outputDir] * len(chunks),
+                                          [self.options()] * len(chunks))
+            return [outputFile for renderedChunk in renderedChunks for outputFile in renderedChunk]
@@ -0,0 +1,76 @@
+import threading
+import numpy as np
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+
+class FTIR_GridResampler:
+    # Maps FTIR spectra recorded on different wavenumber grids (instruments with other resolutions or offsets) onto
+    # ... one common grid by linear interpolation, so that they can be stacked for the batch stages. The interpolation
+    # ... weights of a source grid (the two neighbouring source points of every common point and the weight of the
+    # ... upper one) are computed once and kept, so that all the spectra of one grid are resampled together with two
+    # ... gathers and a multiply. The common grid must lie within every source grid; nothing is extrapolated. A source
+    # ... grid must have at least two distinct wavenumbers and no repeated or missing ones, which would leave the
+    # ... interpolation weights undefined.
+    def __init__(self, commonGrid=None, low=400.0, high=4000.0, spacing=1.0, maxCachedGrids=64):
+        if commonGrid is None:
+            commonGrid = low + spacing * np.arange(int(round((high - low) / spacing)) + 1)
+        self.commonGrid = np.asarray(commonGrid, dtype=float)
+        if self.commonGrid.ndim != 1 or self.commonGrid.shape[0] == 0:
+            raise ValueError("The common grid must be a non-empty one-dimensional array of wavenumbers.")
+        self.maxCachedGrids = maxCachedGrids
+        self.gridWeights_Dict = {}
+        self.lock = threading.Lock()
+
+    def gridWeights(self, sourceGrid):
+        # (lower source index, upper source index, weight of the upper point) for every common point; grids are
+        # ... keyed by their raw bytes, as in FTIR_Output.generatePeaksBatch
+        sourceGrid = np.asarray(sourceGrid, dtype=float)
+        gridKey = sourceGrid.tobytes()
+        with self.lock:
+            gridWeights = self.gridWeights_Dict.get(gridKey)
+        if gridWeights is not None:
+            return gridWeights
+
+        sourceOrder = np.argsort(sourceGrid, kind="stable")
+        sortedGrid = sourceGrid[sourceOrder]
+        if sortedGrid.shape[0] < 2 or not (np.diff(sortedGrid) > 0).all():
+            raise ValueError("A source grid must have at least two wavenumbers, none of them repeated or missing "
+                             "(NaN), to interpolate between.")
+        if self.commonGrid.min() < sortedGrid[0] or self.commonGrid.max() > sortedGrid[-1]:
+            raise ValueError(f"The common grid ({self.commonGrid.min()}-{self.commonGrid.max()} cm⁻¹) reaches past a "
+                             f"source grid ({sortedGrid[0]}-{sortedGrid[-1]} cm⁻¹).")
+        upperPositions = np.clip(np.searchsorted(sortedGrid, self.commonGrid, side="right"), 1, sortedGrid.shape[0] - 1)
+        lowerWavenumbers, upperWavenumbers = sortedGrid[upperPositions - 1], sortedGrid[upperPositions]
+        upperWeights = (self.commonGrid - lowerWavenumbers) / (upperWavenumbers - lowerWavenumbers)
+        gridWeights = (sourceOrder[upperPositions - 1], sourceOrder[upperPositions], upperWeights)
+
+        with self.lock:
+            if len(self.gridWeights_Dict) >= self.maxCachedGrids:
+                del self.gridWeights_Dict[next(iter(self.gridWeights_Dict))]
+            self.gridWeights_Dict[gridKey] = gridWeights
+        return gridWeights
+
+    def resample(self, sourceGrid, transmittances):
+        # (spectra x common points) transmittances of (spectra x source points) spectra that share sourceGrid
+        transmittances = np.atleast_2d(np.asarray(transmittances, dtype=float))
+        lowerIndices, upperIndices, upperWeights = self.gridWeights(sourceGrid)
+        resampled = transmittances[:, upperIndices]
+        resampled -= transmittances[:, lowerIndices]
+        resampled *= upperWeights
+        resampled += transmittances[:, lowerIndices]
+        return resampled
+
+    def stackFTIROutputs(self, listFTIR_Outputs):
+        # Transmittances of the samples on the common grid, one row per sample in the order given
+        with pipelineProfiler.stage("FTIR grid resampling", items=len(listFTIR_Outputs)):
+            gridGroups = {}
+            for sampleIndex, FTIRObj in enumerate(listFTIR_Outputs):
+                DFSample = FTIRObj.DFSample
+                sourceGrid = DFSample["Wavenumber"].to_numpy(dtype=float)
+                transmittance = DFSample["Percent Transmittance"].to_numpy(dtype=float)
+                gridGroup = gridGroups.setdefault(sourceGrid.tobytes(), (sourceGrid, [], []))
+                gridGroup[1].append(sampleIndex)
+                gridGroup[2].append(transmittance)
+            transmittances = np.empty((len(listFTIR_Outputs), self.commonGrid.shape[0]))
+            for sourceGrid, sampleIndices, groupTransmittances in gridGroups.values():
+                transmittances[sampleIndices] = self.resample(sourceGrid, np.stack(groupTransmittances))
+            return transmittances
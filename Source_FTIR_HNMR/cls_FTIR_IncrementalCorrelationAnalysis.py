@@ -0,0 +1,104 @@
+import bisect
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_FTIR_CorrelationAnalysis import FTIR_CorrelationAnalysis
+from Source_FTIR_HNMR.pearsonKernel import pearsonPValues, trendLabels
+
+class FTIR_IncrementalCorrelationAnalysis(FTIR_CorrelationAnalysis):
+    # Keeps running means, sums of squared deviations and co-moments (Welford's method) of the canola fraction
+    # ... and the relative height of every peak, so that a sample can be added or removed in O(peaks) and the
+    # ... correlations read back without revisiting the other samples. The values each sample was added with are kept
+    # ... alongside the sample list, so that removing it undoes exactly what adding it did, even if its peaks or
+    # ... fraction have changed since.
+    def __init__(self, listFTIR_Outputs = [], lambdaKey = lambda FTIRObj: FTIRObj.fraction_CanolaOil, session = None):
+        super().__init__(listFTIR_Outputs, lambdaKey, session)
+        self.sortKeys = [lambdaKey(FTIRObj) for FTIRObj in self.listFTIR_Outputs]
+        self.sampleValues = [self.sampleVectors(FTIRObj) for FTIRObj in self.listFTIR_Outputs]
+        self.resetStatistics()
+        for sampleValues in self.sampleValues:
+            self.updateStatistics(sampleValues, +1)
+
+    def resetStatistics(self):
+        self.countSamples = 0
+        self.meanFraction = 0.0
+        self.M2Fraction = 0.0
+        self.meanHeights = np.zeros(self.numberOfPeaks)
+        self.M2Heights = np.zeros(self.numberOfPeaks)
+        self.coMoments = np.zeros(self.numberOfPeaks)
+        self.sumWavenumbers = np.zeros(self.numberOfPeaks)
+
+    def peakVectors(self, FTIRObj):
+        relativeHeights, peakWavenumbers = FTIRObj.peakArrays()
+        if relativeHeights.shape[0] != self.numberOfPeaks:
+            FTIRObj.generatePeaks()
+            relativeHeights, peakWavenumbers = FTIRObj.peakArrays()
+        return np.array(relativeHeights, dtype=float), np.array(peakWavenumbers, dtype=float)
+
+    def sampleVectors(self, FTIRObj):
+        # The canola fraction, relative heights and peak wavenumbers a sample contributes to the statistics
+        return (float(FTIRObj.fraction_CanolaOil),) + self.peakVectors(FTIRObj)
+
+    def updateStatistics(self, sampleValues, direction):
+        x, y, peakWavenumbers = sampleValues
+        if direction > 0:
+            self.countSamples += 1
+            deltaX = x - self.meanFraction
+            deltaY = y - self.meanHeights
+            self.meanFraction += deltaX / self.countSamples
+            self.meanHeights += deltaY / self.countSamples
+            self.M2Fraction += deltaX * (x - self.meanFraction)
+            self.M2Heights += deltaY * (y - self.meanHeights)
+            self.coMoments += deltaX * (y - self.meanHeights)
+            self.sumWavenumbers += peakWavenumbers
+        elif self.countSamples <= 1:
+            self.resetStatistics()
+        else:
+            # Reverse of the update above: recover the means without the sample, then remove its contribution
+            previousMeanY = self.meanHeights
+            meanFraction = (self.countSamples * self.meanFraction - x) / (self.countSamples - 1)
+            meanHeights = (self.countSamples * self.meanHeights - y) / (self.countSamples - 1)
+            deltaX = x - meanFraction
+            self.M2Fraction -= deltaX * (x - self.meanFraction)
+            self.M2Heights -= (y - meanHeights) * (y - previousMeanY)
+            self.coMoments -= deltaX * (y - previousMeanY)
+            self.meanFraction, self.meanHeights = meanFraction, meanHeights
+            self.sumWavenumbers -= peakWavenumbers
+            self.countSamples -= 1
+
+    def addSample(self, FTIRObj):
+        # The sample list stays sorted by lambdaKey, as in FTIR_CorrelationAnalysis
+        sortKey = self.lambdaKey(FTIRObj)
+        insertIndex = bisect.bisect_right(self.sortKeys, sortKey)
+        self.sortKeys.insert(insertIndex, sortKey)
+        self.listFTIR_Outputs.insert(insertIndex, FTIRObj)
+        self.sampleValues.insert(insertIndex, self.sampleVectors(FTIRObj))
+        self.numberOfSamples = len(self.listFTIR_Outputs)
+        self.updateStatistics(self.sampleValues[insertIndex], +1)
+
+    def removeSample(self, FTIRObj):
+        removeIndex = self.listFTIR_Outputs.index(FTIRObj)
+        del self.listFTIR_Outputs[removeIndex]
+        del self.sortKeys[removeIndex]
+        self.numberOfSamples = len(self.listFTIR_Outputs)
+        self.updateStatistics(self.sampleValues.pop(removeIndex), -1)
+
+    def currentCorrelations(self):
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pearsonCoeffs = np.clip(self.coMoments / np.sqrt(self.M2Fraction * self.M2Heights), -1.0, 1.0)
+        return pearsonCoeffs, pearsonPValues(pearsonCoeffs, self.countSamples)
+
+    def generateSummary(self):
+        # Same peak-level columns as generateCorrelations, without the per-sample relative heights
+        pearsonCoeffs, pValues = self.currentCorrelations()
+        boolSignificance, signTrend = trendLabels(pearsonCoeffs, pValues)
+        self.DFPeakSummary = pd.DataFrame({
+            "Peak Number": np.arange(1, self.numberOfPeaks + 1),
+            "Peak Range (cm⁻¹)": [f'{low}-{high}' for low, high in zip(self.peakScanRange_Low,
+                                                                      self.peakScanRange_High)],
+            "Type of Vibration": list(self.peakVibrations),
+            "Average Peak Wavenumber (cm⁻¹)": self.sumWavenumbers / max(self.countSamples, 1),
+            "Pearson Coefficient": pearsonCoeffs,
+            "p-value": pValues,
+            "Significant? (p < 5%)": boolSignificance,
+            "Trend": signTrend})
+        return self.DFPeakSummary
@@ -0,0 +1,126 @@
+import itertools
+import time
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+
+class FTIR_MixtureUnmixing:
+    # Estimates the composition of blended oils from their FTIR spectra as a non-negative combination of reference
+    # ... spectra (endmembers), e.g. pure canola and pure palm oil. Spectra are mixed in absorbance, where Beer-Lambert
+    # ... makes blends linear (or directly in transmittance), and with baseline=True every spectrum is centred first so
+    # ... that a constant baseline offset does not bias the fit. The fit can be limited to wavenumberRanges, a list of
+    # ... (low, high) windows in cm⁻¹, to leave out bands that vary with film thickness rather than composition.
+    # ... With few endmembers the exact NNLS solution of every spectrum is found at once: the least-squares solution is
+    # ... computed on each subset of endmembers for all spectra from one matrix product, and each spectrum keeps the
+    # ... feasible (all non-negative) solution with the smallest residual. With an FTIR_GridResampler, the fit is done
+    # ... on its common grid and spectra from any grid can be unmixed.
+    maxSubsetEndmembers = 10
+
+    def __init__(self, referenceFTIR_Outputs, signal="absorbance", baseline=True, wavenumberRanges=None,
+                 chunkSize=4096, gridResampler=None):
+        if signal not in ("absorbance", "transmittance"):
+            raise ValueError(f"Unknown signal: {signal}")
+        self.signal = signal
+        self.baseline = baseline
+        self.chunkSize = chunkSize
+        self.gridResampler = gridResampler
+        self.referenceNames = [FTIRObj.sampleName_Short for FTIRObj in referenceFTIR_Outputs]
+        self.numberOfEndmembers = len(self.referenceNames)
+        if self.numberOfEndmembers == 0:
+            raise ValueError("At least one reference spectrum is needed.")
+
+        if gridResampler is not None:
+            self.wavenumbers = gridResampler.commonGrid.copy()
+        else:
+            self.wavenumbers = referenceFTIR_Outputs[0].DFSample["Wavenumber"].to_numpy(dtype=float).copy()
+        if wavenumberRanges is None:
+            self.fitPoints = np.ones(self.wavenumbers.shape[0], dtype=bool)
+        else:
+            self.fitPoints = np.zeros(self.wavenumbers.shape[0], dtype=bool)
+            for low, high in wavenumberRanges:
+                self.fitPoints |= (self.wavenumbers >= low) & (self.wavenumbers <= high)
+            if not self.fitPoints.any():
+                raise ValueError("No data points lie within the given wavenumber ranges.")
+        referenceTransmittances = self.stackTransmittances(referenceFTIR_Outputs)
+        self.endmembers = self.prepareSignals(referenceTransmittances).T  # points x endmembers
+        self.gramMatrix = self.endmembers.T @ self.endmembers
+        self.subsetSolvers = []
+        if self.numberOfEndmembers <= FTIR_MixtureUnmixing.maxSubsetEndmembers:
+            for subsetSize in range(1, self.numberOfEndmembers + 1):
+                for subset in itertools.combinations(range(self.numberOfEndmembers), subsetSize):
+                    subset = np.array(subset)
+                    self.subsetSolvers.append((subset, np.linalg.pinv(self.gramMatrix[np.ix_(subset, subset)])))
+
+    def stackTransmittances(self, listFTIR_Outputs):
+        if self.gridResampler is not None:
+            return self.gridResampler.stackFTIROutputs(listFTIR_Outputs)
+        transmittances = np.empty((len(listFTIR_Outputs), self.wavenumbers.shape[0]))
+        for sampleIndex, FTIRObj in enumerate(listFTIR_Outputs):
+            DFSample = FTIRObj.DFSample
+            if not np.array_equal(DFSample["Wavenumber"].to_numpy(dtype=float), self.wavenumbers):
+                raise ValueError(f"{FTIRObj.CSV_FTIRFile} does not share the wavenumber grid of the reference spectra.")
+            transmittances[sampleIndex] = DFSample["Percent Transmittance"].to_numpy(dtype=float)
+        return transmittances
+
+    def prepareSignals(self, transmittances):
+        # Selecting the fitted points copies the input, so the signals are then computed in place
+        signals = np.atleast_2d(np.asarray(transmittances, dtype=float))[:, self.fitPoints]
+        if self.signal == "absorbance":
+            # Transmittance at or below zero (noise at saturated bands) is clipped before taking the logarithm
+            np.clip(signals, 1e-3, None, out=signals)
+            signals /= 100.0
+            np.log10(signals, out=signals)
+            np.negative(signals, out=signals)
+        if self.baseline:
+            signals -= signals.mean(axis=1, keepdims=True)
+        return signals
+
+    def unmix(self, transmittances):
+        # Returns the (samples x endmembers) non-negative coefficients and the RMS residual of every spectrum
+        signals = self.prepareSignals(transmittances)
+        projections = signals @ self.endmembers
+        squaredNorms = np.einsum("ij,ij->i", signals, signals)
+        if not self.subsetSolvers:
+            from scipy.optimize import nnls
+            coefficients = np.empty((signals.shape[0], self.numberOfEndmembers))
+            residuals = np.empty(signals.shape[0])
+            for sampleIndex, signal in enumerate(signals):
+                coefficients[sampleIndex], residuals[sampleIndex] = nnls(self.endmembers, signal)
+            return coefficients, residuals / np.sqrt(signals.shape[1])
+
+        # The empty subset (all coefficients zero) is always feasible, with the whole signal as the residual
+        coefficients = np.zeros((signals.shape[0], self.numberOfEndmembers))
+        squaredResiduals = squaredNorms.copy()
+        for subset, inverseGram in self.subsetSolvers:
+            subsetProjections = projections[:, subset]
+            subsetCoefficients = subsetProjections @ inverseGram
+            # At the least-squares solution on a subset, |y - Ec|^2 = |y|^2 - c.(E^T y)
+            subsetResiduals = squaredNorms - np.einsum("ij,ij->i", subsetCoefficients, subsetProjections)
+            isBetter = (subsetCoefficients >= 0).all(axis=1) & (subsetResiduals < squaredResiduals)
+            squaredResiduals[isBetter] = subsetResiduals[isBetter]
+            coefficients[isBetter] = 0.0
+            coefficients[np.ix_(isBetter, subset)] = subsetCoefficients[isBetter]
+        return coefficients, np.sqrt(np.maximum(squaredResiduals, 0.0) / signals.shape[1])
+
+    def unmixFTIROutputs(self, listFTIR_Outputs):
+        # Unmix the samples chunkSize at a time; fractions are the coefficients normalized to sum to one
+        with pipelineProfiler.stage("FTIR mixture unmixing", items=len(listFTIR_Outputs)):
+            startTime = time.perf_counter()
+            coefficients = np.empty((len(listFTIR_Outputs), self.numberOfEndmembers))
+            residuals = np.empty(len(listFTIR_Outputs))
+            for start in range(0, len(listFTIR_Outputs), self.chunkSize):
+                chunkFTIR_Outputs = listFTIR_Outputs[start:start + self.chunkSize]
+                coefficients[start:start + len(chunkFTIR_Outputs)], residuals[start:start + len(chunkFTIR_Outputs)] = \
+                    self.unmix(self.stackTransmittances(chunkFTIR_Outputs))
+            self.elapsedSeconds = time.perf_counter() - startTime
+            self.samplesPerSecond = len(listFTIR_Outputs) / self.elapsedSeconds if self.elapsedSeconds > 0 else None
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                fractions = coefficients / coefficients.sum(axis=1, keepdims=True)
+            DFMixture_Dict = {"Sample Name (Short)": [FTIRObj.sampleName_Short for FTIRObj in listFTIR_Outputs]}
+            for referenceIndex, referenceName in enumerate(self.referenceNames):
+                DFMixture_Dict[f"Fraction of {referenceName}"] = fractions[:, referenceIndex]
+            DFMixture_Dict["Scale"] = coefficients.sum(axis=1)
+            DFMixture_Dict[f"RMS Residual ({self.signal})"] = residuals
+            self.DFMixtureFractions = pd.DataFrame(DFMixture_Dict)
+            return self.DFMixtureFractions
@@ -1,10 +1,16 @@
+import numpy as np
 import pandas as pd
-from matplotlib import pyplot as plt
-from matplotlib.ticker import MultipleLocator
 from Source_FTIR_HNMR.cls_FTIR_Peak import *
+from Source_FTIR_HNMR.cls_FTIR_PeakBatch import FTIR_PeakBatch
+from Source_FTIR_HNMR.cls_FTIR_PeakDiscovery import FTIR_PeakDiscovery
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.cls_ResultsCache import ResultsCache
+from Source_FTIR_HNMR.cls_SampleRegistry import SampleRegistry
+from Source_FTIR_HNMR.cls_SpectrumCache import SpectrumCache
+from Source_FTIR_HNMR.spectrumDecimation import decimate
 
 class FTIR_Output:
-    listFTIR_Outputs = []
+    listFTIR_Outputs = SampleRegistry()
     peakScanRange_High = [800, 1250, 1500, 1800, 2880, 3050]
     peakScanRange_Low = [650, 1100, 1400, 1700, 2800, 2900]
     peakVibrations = ["C-H Rocking", "Ester C-O Stretch", "Alkane C-H Bend", "Carbonyl C=O Stretch",
@@ -12,9 +18,14 @@ class FTIR_Output:
                       "Alkene C-H Stretch"]
     numberOfPeaks = len(peakVibrations)
     numberOfSamples = len(listFTIR_Outputs)
+    DF_FTIRColumns = ["Wavenumber", "Percent Transmittance"]
+    spectrumCache = SpectrumCache()
+    resultsCache = ResultsCache()
+    gridResampler = None  # an FTIR_GridResampler puts the spectra of all grids on one common grid for the batch stages
+    referenceWavenumber = 2920.0  # relative heights are measured against the peak of the window containing it
 
     def __init__(self, CSV_FTIRFile, sampleName_Full="", sampleName_Short="", sampleMedium="", plotColor="#5284bd",
-                 fraction_CanolaOil=1.00):
+                 fraction_CanolaOil=1.00, registerSample=True, session=None):
         self.CSV_FTIRFile = CSV_FTIRFile
         self.sampleName_Full = sampleName_Full
         self.sampleName_Short = sampleName_Short
@@ -22,15 +33,106 @@ class FTIR_Output:
         self.plotColor = plotColor
         self.fraction_CanolaOil = fraction_CanolaOil
 
+        # The FTIR data is read lazily, on first access of DFSample
+        self._DFSample = None
+        self._spectrumDigest = None
+        self.listFTIRPeaks = []
+
+        # The session owns the sample list and peak windows used by this sample. Without an FTIR_AnalysisSession, it
+        # ... is the FTIR_Output class itself, whose class attributes hold the process-wide analysis.
+        self.session = session if session is not None else FTIR_Output
+
         # Add new FTIR output to the list of all FTIR outputs
-        FTIR_Output.listFTIR_Outputs.append(self)
-        FTIR_Output.numberOfSamples = len(FTIR_Output.listFTIR_Outputs)
+        if registerSample:
+            self.session.addSample(self)
 
-        # Read the CSV files for FTIR data and convert to dataframes
-        DF_FTIRColumns = ["Wavenumber", "Percent Transmittance"]
-        self.DFSample = pd.read_csv(CSV_FTIRFile, usecols=DF_FTIRColumns)
-        self.numberOfPoints = self.DFSample.shape[0]
-        self.listFTIRPeaks = []
+    def __getstate__(self):
+        # Spectra backed by the spectrum cache are reopened from it after unpickling instead of being copied
+        state = self.__dict__.copy()
+        if FTIR_Output.spectrumCache is not None:
+            state["_DFSample"] = None
+        # Sessions hold locks and live in one process, so a copy sent to a worker process belongs to no session
+        state["session"] = FTIR_Output
+        return state
+
+    def preload(self):
+        self.DFSample
+        return self
+
+    @property
+    def DFSample(self):
+        # Read the CSV files for FTIR data through the binary spectrum cache and convert to dataframes
+        DFSample = self._DFSample
+        if DFSample is None:
+            with pipelineProfiler.stage("FTIR spectrum load", items=1):
+                if FTIR_Output.spectrumCache is None:
+                    DFSample = pd.read_csv(self.CSV_FTIRFile, usecols=FTIR_Output.DF_FTIRColumns)
+                else:
+                    DFSample = FTIR_Output.spectrumCache.loadDataFrame(self.CSV_FTIRFile, FTIR_Output.DF_FTIRColumns)
+            self._DFSample = DFSample
+
+        # Report the access to the sample registry, which may unload the least recently used spectra
+        sampleRegistry = self.session.listFTIR_Outputs
+        if isinstance(sampleRegistry, SampleRegistry):
+            sampleRegistry.touch(self, int(DFSample.memory_usage(index=False).sum()))
+        return DFSample
+
+    def spectrumDigest(self):
+        # Content digest of the spectrum, taken from the spectrum cache when possible so the data need not be hashed
+        if self._spectrumDigest is None:
+            if FTIR_Output.spectrumCache is not None:
+                try:
+                    self._spectrumDigest = FTIR_Output.spectrumCache.digest(self.CSV_FTIRFile,
+                                                                           FTIR_Output.DF_FTIRColumns)
+                except OSError:
+                    pass
+            if self._spectrumDigest is None:
+                self._spectrumDigest = SpectrumCache.contentDigest([self.DFSample[column].to_numpy(dtype=float)
+                                                                    for column in FTIR_Output.DF_FTIRColumns])
+        return self._spectrumDigest
+
+    def unloadData(self):
+        self._DFSample = None
+
+    @property
+    def numberOfPoints(self):
+        return self.DFSample.shape[0]
+
+    @property
+    def listFTIRPeaks(self):
+        # Peaks are kept as one row of a shared FTIR_PeakTable and handed out as lightweight FTIR_Peak views
+        if self.peakTable is None:
+            return self._listFTIRPeaks
+        return self.peakTable.getFTIRPeaks(self.peakTableRow)
+
+    @listFTIRPeaks.setter
+    def listFTIRPeaks(self, listFTIRPeaks):
+        self._listFTIRPeaks = list(listFTIRPeaks)
+        self.peakTable = None
+        self.peakTableRow = None
+
+    def setPeakTableRow(self, peakTable, peakTableRow):
+        self._listFTIRPeaks = []
+        self.peakTable = peakTable
+        self.peakTableRow = peakTableRow
+
+    def peakArrays(self):
+        # Relative heights and wavenumbers of the peaks of this sample as arrays
+        if self.peakTable is None:
+            return (np.array([FTIRPeak.relativeHeight for FTIRPeak in self._listFTIRPeaks], dtype=float),
+                    np.array([FTIRPeak.wavenumber for FTIRPeak in self._listFTIRPeaks], dtype=float))
+        return (self.peakTable.peakRelativeHeights[self.peakTableRow],
+                self.peakTable.peakWavenumbers[self.peakTableRow])
+
+    @classmethod
+    def addSample(cls, FTIRObj):
+        FTIRObj.session = cls
+        cls.listFTIR_Outputs.append(FTIRObj)
+        cls.numberOfSamples = len(cls.listFTIR_Outputs)
+
+    @classmethod
+    def setMemoryBudget(cls, memoryBudget):
+        cls.listFTIR_Outputs.setMemoryBudget(memoryBudget)
 
     @classmethod
     def sortFTIRs(cls):
@@ -41,17 +143,23 @@ class FTIR_Output:
                                       peakScanRange_Low=(650, 1100, 1400, 1700, 2800, 2900),
                                       peakVibrations=("C-H Rocking", "Ester C-O Stretch", "Alkane C-H Bend",
                                                       "Carbonyl C=O Stretch", "Alkane C-H Stretch",
-                                                      "Alkene C-H Stretch")):
+                                                      "Alkene C-H Stretch"),
+                                      referenceWavenumber=2920.0):
         cls.peakScanRange_High = peakScanRange_High
         cls.peakScanRange_Low = peakScanRange_Low
         cls.peakVibrations = peakVibrations
         cls.numberOfPeaks = len(peakVibrations)
+        cls.referenceWavenumber = referenceWavenumber
 
-    def plot(self, spacing = 0.15, linewidth = 0.8):
+    def plot(self, spacing = 0.15, linewidth = 0.8, decimation = None, numberOfPoints = 2000, outputFile = None):
+        # matplotlib is imported on first use, so that jobs which never plot do not pay for it at import time
+        from matplotlib import pyplot as plt
+        from matplotlib.ticker import MultipleLocator
         figure, axis = plt.subplots(figsize=(10, 4.8))
         wavenumberCol = self.DFSample["Wavenumber"]
         transmittanceCol = self.DFSample["Percent Transmittance"]
-        axis.plot(wavenumberCol, transmittanceCol, color=self.plotColor, linewidth=linewidth)
+        axis.plot(*decimate(wavenumberCol, transmittanceCol, decimation, numberOfPoints), color=self.plotColor,
+                  linewidth=linewidth)
         axis.set(xlabel="Wavenumber [cm⁻¹]", ylabel="Transmittance (%)")
         axis.set_title(self.sampleName_Full + " in " + self.sampleMedium + "\n Infrared Spectrum")
 
@@ -67,16 +175,29 @@ class FTIR_Output:
         # Properly position the x and y axes
         axis.xaxis.set_minor_locator(MultipleLocator(100))
         axis.yaxis.set_minor_locator(MultipleLocator(2))
-        plt.show()
+        FTIR_Output.showOrSave(figure, outputFile)
+
+    @staticmethod
+    def showOrSave(figure, outputFile):
+        # Show the figure interactively, or write it to a file (PNG, SVG, ...) and release it when a file is given
+        from matplotlib import pyplot as plt
+        if outputFile is None:
+            plt.show()
+        else:
+            figure.savefig(outputFile)
+            plt.close(figure)
 
     @classmethod
-    def plotAll(cls, figureTitle = "FTIR Spectra of Cooking Oils in KBr, Liquid", linewidth = 0.8, spacing = 0.15):
+    def plotAll(cls, figureTitle = "FTIR Spectra of Cooking Oils in KBr, Liquid", linewidth = 0.8, spacing = 0.15,
+                decimation = None, numberOfPoints = 2000, outputFile = None):
+        from matplotlib import pyplot as plt
+        from matplotlib.ticker import MultipleLocator
         figure, axis = plt.subplots(FTIR_Output.numberOfSamples, 1, figsize=(10, 8.0))
         sampleIndex = 0
         for FTIRObj in cls.listFTIR_Outputs:
             wavenumberCol = FTIRObj.DFSample["Wavenumber"]
             transmittanceCol = FTIRObj.DFSample["Percent Transmittance"]
-            axis[sampleIndex].plot(wavenumberCol, transmittanceCol,
+            axis[sampleIndex].plot(*decimate(wavenumberCol, transmittanceCol, decimation, numberOfPoints),
                                    color=FTIRObj.plotColor,
                                    linewidth=linewidth)
             if sampleIndex == cls.numberOfSamples - 1:
@@ -98,43 +219,54 @@ class FTIR_Output:
             sampleIndex += 1
         plt.subplots_adjust(bottom=0.15, right=0.90, hspace=0.45)
         figure.suptitle(figureTitle)
-        plt.show()
+        FTIR_Output.showOrSave(figure, outputFile)
 
     def generatePeaks(self): # Get the relative heights of each peak in the FTIR spectrum of each sample which correspond to a significant vibration.
-        transmittanceCol = self.DFSample["Percent Transmittance"]
-        initialTrans = transmittanceCol[0]
-        peaks_wavenumbers = []
-        peaks_transmittance = []
-        peaks_heights = []
-
-        for peakIndex in range(FTIR_Output.numberOfPeaks):
-            # Narrow down the range where the peak will be found
-            upperRange = FTIR_Output.peakScanRange_High[peakIndex]
-            lowerRange = FTIR_Output.peakScanRange_Low[peakIndex]
-            SelectedDFRange = self.DFSample.loc[self.DFSample["Wavenumber"] >= lowerRange]
-            SelectedDFRange = SelectedDFRange.loc[SelectedDFRange["Wavenumber"] <= upperRange]
-
-            # Compute peak-related quantities.
-            peakTrans = SelectedDFRange.min().iloc[1]
-            peakIndex = SelectedDFRange.idxmin().iloc[1]
-            peakWavenumber = SelectedDFRange.loc[peakIndex]["Wavenumber"]
-            peakHeight = initialTrans - peakTrans
-            peaks_wavenumbers.append(peakWavenumber)
-            peaks_transmittance.append(peakTrans)
-            peaks_heights.append(peakHeight)
-
-        # Compute relative height of peaks (where the peak from 3050 to 2900 cm(-1) has a relative height of 1)
-        baseHeight = peaks_heights[-1]
-        peaks_relativeHeights = [height / baseHeight for height in peaks_heights]
-
-        # Generate FTIR peak objects
-        for peakIndex in range(FTIR_Output.numberOfPeaks):
-            self.listFTIRPeaks.append(FTIR_Peak(peaks_wavenumbers[peakIndex],
-                                                peaks_transmittance[peakIndex],
-                                                peaks_relativeHeights[peakIndex],
-                                                FTIR_Output.peakVibrations[peakIndex]))
+        gridResampler = self.session.gridResampler
+        peakBatch = FTIR_PeakBatch.fromFTIROutputs([self], self.session.peakScanRange_High,
+                                                   self.session.peakScanRange_Low, self.session.peakVibrations,
+                                                   gridResampler, self.session.referenceWavenumber)
+        peakBatch.generatePeaks(FTIR_Output.resultsCache, [self.spectrumDigest()] if gridResampler is None else None)
+        self.setPeakTableRow(peakBatch.peakTable, 0)
 
     @classmethod
     def generatePeaksAll(cls):
-        for FTIRObj in cls.listFTIR_Outputs:
-            FTIRObj.generatePeaks()
\ No newline at end of file
+        cls.generatePeaksBatch(cls.listFTIR_Outputs, cls.peakScanRange_High, cls.peakScanRange_Low, cls.peakVibrations,
+                               cls.gridResampler, cls.referenceWavenumber)
+
+    @classmethod
+    def discoverPeaksAll(cls, peakDiscovery=None):
+        # Replace the fixed peak windows with those of the bands discovered in all samples, then extract the peaks;
+        # ... the reference band for relative heights is the one named by the peak discovery
+        peakDiscovery = (peakDiscovery if peakDiscovery is not None
+                         else FTIR_PeakDiscovery(referenceWavenumber=cls.referenceWavenumber))
+        peakDiscovery.discoverFTIROutputs(cls.listFTIR_Outputs)
+        cls.setPeakPosition_and_Vibration(peakDiscovery.peakScanRange_High, peakDiscovery.peakScanRange_Low,
+                                          peakDiscovery.peakVibrations, peakDiscovery.referenceWavenumber)
+        cls.generatePeaksAll()
+        return peakDiscovery
+
+    @staticmethod
+    def generatePeaksBatch(listFTIR_Outputs, peakScanRange_High, peakScanRange_Low, peakVibrations,
+                           gridResampler=None, referenceWavenumber=2920.0):
+        # Spectra sharing a wavenumber grid are stacked and their peaks extracted in a single batch. With a grid
+        # ... resampler all spectra form one batch on its common grid; the peaks are then cached under the digests of
+        # ... the resampled spectra, which the batch computes itself.
+        if gridResampler is not None:
+            peakBatch = FTIR_PeakBatch.fromFTIROutputs(listFTIR_Outputs, peakScanRange_High, peakScanRange_Low,
+                                                       peakVibrations, gridResampler, referenceWavenumber)
+            peakBatch.generatePeaks(FTIR_Output.resultsCache)
+            for sampleIndex, FTIRObj in enumerate(listFTIR_Outputs):
+                FTIRObj.setPeakTableRow(peakBatch.peakTable, sampleIndex)
+            return
+        gridGroups = {}
+        for FTIRObj in listFTIR_Outputs:
+            gridKey = FTIRObj.DFSample["Wavenumber"].to_numpy(dtype=float).tobytes()
+            gridGroups.setdefault(gridKey, []).append(FTIRObj)
+        for groupFTIR_Outputs in gridGroups.values():
+            peakBatch = FTIR_PeakBatch.fromFTIROutputs(groupFTIR_Outputs, peakScanRange_High, peakScanRange_Low,
+                                                       peakVibrations, None, referenceWavenumber)
+            peakBatch.generatePeaks(FTIR_Output.resultsCache,
+                                    [FTIRObj.spectrumDigest() for FTIRObj in groupFTIR_Outputs])
+            for sampleIndex, FTIRObj in enumerate(groupFTIR_Outputs):
+                FTIRObj.setPeakTableRow(peakBatch.peakTable, sampleIndex)
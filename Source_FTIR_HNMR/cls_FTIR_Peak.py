@@ -1,5 +1,7 @@
 
 class FTIR_Peak:
+    __slots__ = ("wavenumber", "percentTransmittance", "relativeHeight", "molecularVibration")
+
     def __init__(self, wavenumber=500.0, percentTransmittance=1.0, relativeHeight=0.01, molecularVibration=""):
         self.wavenumber = wavenumber
         self.percentTransmittance = percentTransmittance
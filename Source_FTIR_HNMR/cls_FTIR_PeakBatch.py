@@ -0,0 +1,117 @@
+import numpy as np
+from Source_FTIR_HNMR.cls_FTIR_PeakTable import FTIR_PeakTable
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.cls_SpectrumCache import SpectrumCache
+
+class FTIR_PeakBatch:
+    # Extracts the peaks of many FTIR spectra at once. All spectra must share the same wavenumber grid so that
+    # ... they can be stacked into a single (samples x points) array of transmittance values. Relative heights are
+    # ... measured against the peak of the window containing referenceWavenumber (by default the saturated C-H stretch
+    # ... near 2920 cm⁻¹, whose intensity does not depend on the canola fraction).
+    def __init__(self, wavenumbers, transmittances, peakScanRange_High, peakScanRange_Low, peakVibrations,
+                 referenceWavenumber=2920.0):
+        self.wavenumbers = np.asarray(wavenumbers, dtype=float)
+        self.transmittances = np.atleast_2d(np.asarray(transmittances, dtype=float))
+        if self.transmittances.shape[1] != self.wavenumbers.shape[0]:
+            raise ValueError("Each spectrum must have one transmittance value per wavenumber of the shared grid.")
+        self.numberOfSamples, self.numberOfPoints = self.transmittances.shape
+        self.peakScanRange_High = list(peakScanRange_High)
+        self.peakScanRange_Low = list(peakScanRange_Low)
+        self.peakVibrations = list(peakVibrations)
+        self.numberOfPeaks = len(self.peakVibrations)
+        self.referenceWavenumber = referenceWavenumber
+        self.referencePeak = self.findReferencePeak()
+
+        # Orient the grid in increasing wavenumber so that the scan windows can be located by binary search
+        self.gridOrder = np.argsort(self.wavenumbers, kind="stable")
+        self.sortedWavenumbers = self.wavenumbers[self.gridOrder]
+        self.windowStart, self.windowEnd = self.findWindows()
+
+    @classmethod
+    @pipelineProfiler.profiled("FTIR spectrum stacking", items=lambda cls, listFTIR_Outputs, *args,
+                               **kwargs: len(listFTIR_Outputs))
+    def fromFTIROutputs(cls, listFTIR_Outputs, peakScanRange_High, peakScanRange_Low, peakVibrations,
+                        gridResampler=None, referenceWavenumber=2920.0):
+        # With an FTIR_GridResampler, spectra of any grid are stacked on its common grid
+        if gridResampler is not None:
+            return cls(gridResampler.commonGrid, gridResampler.stackFTIROutputs(listFTIR_Outputs), peakScanRange_High,
+                       peakScanRange_Low, peakVibrations, referenceWavenumber)
+        wavenumbers = listFTIR_Outputs[0].DFSample["Wavenumber"].to_numpy(dtype=float)
+        transmittances = np.empty((len(listFTIR_Outputs), wavenumbers.shape[0]))
+        for sampleIndex, FTIRObj in enumerate(listFTIR_Outputs):
+            sampleWavenumbers = FTIRObj.DFSample["Wavenumber"].to_numpy(dtype=float)
+            if not np.array_equal(sampleWavenumbers, wavenumbers):
+                raise ValueError(f"{FTIRObj.CSV_FTIRFile} does not share the wavenumber grid of the other spectra.")
+            transmittances[sampleIndex] = FTIRObj.DFSample["Percent Transmittance"].to_numpy(dtype=float)
+        return cls(wavenumbers, transmittances, peakScanRange_High, peakScanRange_Low, peakVibrations,
+                   referenceWavenumber)
+
+    def findReferencePeak(self):
+        for peakIndex, (high, low) in enumerate(zip(self.peakScanRange_High, self.peakScanRange_Low)):
+            if low <= self.referenceWavenumber <= high:
+                return peakIndex
+        raise ValueError(f"No scan window contains the reference band at {self.referenceWavenumber} cm⁻¹ for the "
+                         f"relative heights; add a window around it or choose another referenceWavenumber.")
+
+    def findWindows(self):
+        # Indices [start, end) of the points with low <= wavenumber <= high for every scan window
+        windowStart = np.searchsorted(self.sortedWavenumbers, self.peakScanRange_Low, side="left")
+        windowEnd = np.searchsorted(self.sortedWavenumbers, self.peakScanRange_High, side="right")
+        for peakIndex in range(self.numberOfPeaks):
+            if windowEnd[peakIndex] <= windowStart[peakIndex]:
+                raise ValueError(f"No data points lie within the scan range "
+                                 f"{self.peakScanRange_Low[peakIndex]}-{self.peakScanRange_High[peakIndex]} cm⁻¹.")
+        return windowStart, windowEnd
+
+    @pipelineProfiler.profiled("FTIR peak extraction", items=lambda self, *args, **kwargs: self.numberOfSamples)
+    def generatePeaks(self, resultsCache=None, spectrumDigests=None):
+        # With a ResultsCache, only the spectra never reduced with these windows before are reduced
+        if resultsCache is None:
+            self.setPeakPositions(self.findPeakPositions(np.arange(self.numberOfSamples), range(self.numberOfPeaks)))
+            return
+        if spectrumDigests is None:
+            spectrumDigests = [SpectrumCache.contentDigest([self.wavenumbers, transmittanceRow])
+                               for transmittanceRow in self.transmittances]
+        peakPositions = resultsCache.getPeakPositions(spectrumDigests, self.peakScanRange_High, self.peakScanRange_Low)
+        missingSamples = np.flatnonzero((peakPositions < 0).any(axis=1))
+        if missingSamples.shape[0] > 0:
+            peakPositions[missingSamples] = self.findPeakPositions(missingSamples, range(self.numberOfPeaks))
+            resultsCache.putPeakPositions(np.asarray(spectrumDigests, dtype="S40")[missingSamples],
+                                          self.peakScanRange_High, self.peakScanRange_Low,
+                                          peakPositions[missingSamples])
+        self.setPeakPositions(peakPositions)
+
+    def findPeakPositions(self, sampleIndices, peakIndices):
+        # Each scan window is reduced for all the given samples at once; ties resolve to the first point in file
+        # ... order and missing values (NaN) are skipped, the same as DataFrame.idxmin. A window without any value gets
+        # ... the position numberOfPoints, which setPeakPositions turns into a NaN peak.
+        sortedTransmittances = self.transmittances[np.ix_(np.asarray(sampleIndices), self.gridOrder)]
+        peakPositions = np.empty((sortedTransmittances.shape[0], len(peakIndices)), dtype=np.intp)
+        for columnIndex, peakIndex in enumerate(peakIndices):
+            start, end = self.windowStart[peakIndex], self.windowEnd[peakIndex]
+            windowTrans = sortedTransmittances[:, start:end]
+            windowOrder = self.gridOrder[start:end]
+            windowMinimum = np.where(np.isnan(windowTrans), np.inf, windowTrans).min(axis=1, keepdims=True)
+            isMinimum = windowTrans == windowMinimum
+            firstInFile = np.where(isMinimum, windowOrder, self.numberOfPoints).min(axis=1)
+            peakPositions[:, columnIndex] = firstInFile
+        return peakPositions
+
+    def setPeakPositions(self, peakPositions):
+        sampleRows = np.arange(self.numberOfSamples)[:, None]
+        initialTrans = self.transmittances[:, :1]
+        self.peakPositions = peakPositions
+        isMissing = peakPositions >= self.numberOfPoints
+        gatherPositions = np.where(isMissing, 0, peakPositions)
+        self.peakWavenumbers = np.where(isMissing, np.nan, self.wavenumbers[gatherPositions])
+        self.peakTransmittances = np.where(isMissing, np.nan, self.transmittances[sampleRows, gatherPositions])
+        self.peakHeights = initialTrans - self.peakTransmittances
+
+        # Compute relative height of peaks (where the reference peak, from 3050 to 2900 cm(-1) with the fixed windows,
+        # ... has a relative height of 1)
+        self.peakRelativeHeights = self.peakHeights / self.peakHeights[:, self.referencePeak:self.referencePeak + 1]
+        self.peakTable = FTIR_PeakTable(self.peakWavenumbers, self.peakTransmittances, self.peakRelativeHeights,
+                                        self.peakVibrations)
+
+    def getFTIRPeaks(self, sampleIndex):
+        return self.peakTable.getFTIRPeaks(sampleIndex)
@@ -0,0 +1,196 @@
+import math
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+
+class FTIR_PeakDiscovery:
+    # Finds the absorption bands of a set of FTIR spectra instead of relying on fixed scan windows. Every spectrum is
+    # ... searched in one pass for transmittance minima that stand out by at least minProminence (%T) and are at least
+    # ... minWidth (cm⁻¹) wide at half prominence. The minima of all samples are then sorted by wavenumber and split
+    # ... wherever two neighbours lie more than matchTolerance apart, so that each run of close minima is one band;
+    # ... bands found in fewer than minPresence of the samples are dropped, and so are bands with a minimum that does
+    # ... not reach below the baseline of its spectrum (its first transmittance point, from which peak heights are
+    # ... measured), since they would get negative heights. Minima in the atmospheric regions (CO₂ near 2350 and
+    # ... 667 cm⁻¹) are ignored. Each band becomes a scan window around the minima matched to it, named after the
+    # ... nearest reference band, ready for the usual peak extraction stage; windows are in order of wavenumber.
+    # ... Relative heights are measured against the band at referenceWavenumber, by default the saturated C-H stretch
+    # ... near 2920 cm⁻¹ that the fixed windows also use: its intensity does not follow the canola fraction, unlike
+    # ... the alkene bands. The window of the nearest band is widened to reach it, or, when no band was found there
+    # ... (the band is often saturated, with its minimum wandering across the trough), a window of
+    # ... ±assignTolerance around it is added.
+    referenceBands = [(722, "C-H Rocking"),
+                      (966, "Trans Alkene C-H Bend"),
+                      (1098, "Ester C-O Stretch"),
+                      (1118, "Ester C-O Stretch"),
+                      (1163, "Ester C-O Stretch"),
+                      (1238, "Ester C-O Stretch"),
+                      (1377, "Alkane C-H Bend"),
+                      (1465, "Alkane C-H Bend"),
+                      (1654, "Alkene C=C Stretch"),
+                      (1745, "Carbonyl C=O Stretch"),
+                      (2853, "Alkane C-H Stretch"),
+                      (2922, "Alkane C-H Stretch"),
+                      (2953, "Alkane C-H Stretch"),
+                      (3006, "Alkene C-H Stretch")]
+
+    atmosphericRegions = [(660, 675, "CO₂ Bend"),
+                          (2280, 2400, "CO₂ Stretch")]
+
+    def __init__(self, minProminence=3.0, minWidth=4.0, matchTolerance=8.0, minPresence=0.75,
+                 scanRange=(650, 3100), assignTolerance=20.0, referenceWavenumber=2920.0, excludedRanges=None):
+        self.minProminence = minProminence
+        self.minWidth = minWidth
+        self.matchTolerance = matchTolerance
+        self.minPresence = minPresence
+        self.scanRange = scanRange
+        self.assignTolerance = assignTolerance
+        self.referenceWavenumber = referenceWavenumber
+        self.excludedRanges = ([(low, high) for low, high, _ in FTIR_PeakDiscovery.atmosphericRegions]
+                               if excludedRanges is None else list(excludedRanges))
+
+    def findPeaks(self, wavenumbers, transmittances):
+        # Wavenumbers, transmittances, prominences and heights (below the first point) of the minima of one spectrum
+        # ... within the scan range and outside the excluded ranges
+        from scipy.signal import find_peaks  # deferred, like the other scipy imports of the package
+        wavenumbers = np.asarray(wavenumbers, dtype=float)
+        transmittances = np.asarray(transmittances, dtype=float)
+        pointSpacing = np.median(np.abs(np.diff(wavenumbers)))
+        peakPositions, peakProperties = find_peaks(-transmittances, prominence=self.minProminence,
+                                                   width=self.minWidth / pointSpacing)
+        peakWavenumbers = wavenumbers[peakPositions]
+        isInRange = (peakWavenumbers >= self.scanRange[0]) & (peakWavenumbers <= self.scanRange[1])
+        for low, high in self.excludedRanges:
+            isInRange &= (peakWavenumbers < low) | (peakWavenumbers > high)
+        peakTransmittances = transmittances[peakPositions[isInRange]]
+        return (peakWavenumbers[isInRange], peakTransmittances, peakProperties["prominences"][isInRange],
+                transmittances[0] - peakTransmittances)
+
+    def matchPeaks(self, sampleIndices, peakWavenumbers, peakProminences, peakHeights, numberOfSamples):
+        # Split the minima, sorted by wavenumber, into bands at every gap wider than matchTolerance
+        if peakWavenumbers.shape[0] == 0:
+            return (np.empty(0), np.empty(0), np.empty(0), np.empty(0), np.empty(0, dtype=np.intp))
+        sortOrder = np.argsort(peakWavenumbers, kind="stable")
+        sortedWavenumbers = peakWavenumbers[sortOrder]
+        bandNumbers = np.concatenate([[0], np.cumsum(np.diff(sortedWavenumbers) > self.matchTolerance)])
+        numberOfBands = bandNumbers[-1] + 1
+
+        bandLow = np.full(numberOfBands, np.inf)
+        bandHigh = np.full(numberOfBands, -np.inf)
+        np.minimum.at(bandLow, bandNumbers, sortedWavenumbers)
+        np.maximum.at(bandHigh, bandNumbers, sortedWavenumbers)
+        bandMeans = np.bincount(bandNumbers, sortedWavenumbers, numberOfBands) / np.bincount(bandNumbers,
+                                                                                             minlength=numberOfBands)
+        bandProminences = np.bincount(bandNumbers, peakProminences[sortOrder], numberOfBands) \
+            / np.bincount(bandNumbers, minlength=numberOfBands)
+        bandHeights = np.full(numberOfBands, np.inf)
+        np.minimum.at(bandHeights, bandNumbers, peakHeights[sortOrder])
+        # A sample with two minima in one band still counts once
+        bandSamples = np.unique(np.column_stack([bandNumbers, sampleIndices[sortOrder]]), axis=0)[:, 0]
+        samplesFound = np.bincount(bandSamples, minlength=numberOfBands)
+
+        isKept = (samplesFound >= self.minPresence * numberOfSamples) & (bandHeights > 0)
+        return bandLow[isKept], bandHigh[isKept], bandMeans[isKept], bandProminences[isKept], samplesFound[isKept]
+
+    def bandWindows(self, bandLow, bandHigh):
+        # Whole-wavenumber windows reaching half the tolerance past the matched minima, without overlapping
+        windowLow = np.floor(bandLow - self.matchTolerance / 2).astype(int)
+        windowHigh = np.ceil(bandHigh + self.matchTolerance / 2).astype(int)
+        for bandIndex in range(1, windowLow.shape[0]):
+            if windowLow[bandIndex] <= windowHigh[bandIndex - 1]:
+                boundary = int((bandHigh[bandIndex - 1] + bandLow[bandIndex]) // 2)
+                windowHigh[bandIndex - 1], windowLow[bandIndex] = boundary, boundary + 1
+        return windowLow, windowHigh
+
+    def referenceWindow(self, windowLow, windowHigh, bandMeans):
+        # Index of the window holding referenceWavenumber and whether it was added. Windows are disjoint and sorted,
+        # ... so a reference outside all of them lies in the gap before window insertAt, which bounds any change.
+        containsReference = (windowLow <= self.referenceWavenumber) & (self.referenceWavenumber <= windowHigh)
+        if containsReference.any():
+            return windowLow, windowHigh, int(containsReference.argmax()), False
+        insertAt = int(np.searchsorted(windowLow, self.referenceWavenumber))
+        gapLow = windowHigh[insertAt - 1] + 1 if insertAt > 0 else -math.inf
+        gapHigh = windowLow[insertAt] - 1 if insertAt < windowLow.shape[0] else math.inf
+        neighbours = [bandIndex for bandIndex in (insertAt - 1, insertAt) if 0 <= bandIndex < windowLow.shape[0]
+                      and abs(bandMeans[bandIndex] - self.referenceWavenumber) <= self.assignTolerance]
+        if neighbours:
+            nearest = min(neighbours, key=lambda bandIndex: abs(bandMeans[bandIndex] - self.referenceWavenumber))
+            if nearest < insertAt:
+                windowHigh[nearest] = min(math.ceil(self.referenceWavenumber), gapHigh)
+            else:
+                windowLow[nearest] = max(math.floor(self.referenceWavenumber), gapLow)
+            return windowLow, windowHigh, nearest, False
+        low = max(math.floor(self.referenceWavenumber - self.assignTolerance), gapLow)
+        high = min(math.ceil(self.referenceWavenumber + self.assignTolerance), gapHigh)
+        return np.insert(windowLow, insertAt, low), np.insert(windowHigh, insertAt, high), insertAt, True
+
+    def assignVibrations(self, bandWavenumbers):
+        # Name each band after the nearest reference band within assignTolerance, found by binary search
+        referenceWavenumbers = np.array([wavenumber for wavenumber, _ in FTIR_PeakDiscovery.referenceBands],
+                                        dtype=float)
+        referenceOrder = np.argsort(referenceWavenumbers)
+        referenceWavenumbers = referenceWavenumbers[referenceOrder]
+        insertAt = np.searchsorted(referenceWavenumbers, bandWavenumbers)
+        candidates = np.stack([np.clip(insertAt - 1, 0, len(referenceWavenumbers) - 1),
+                               np.clip(insertAt, 0, len(referenceWavenumbers) - 1)])
+        distances = np.abs(referenceWavenumbers[candidates] - bandWavenumbers)
+        nearest = candidates[distances.argmin(axis=0), np.arange(bandWavenumbers.shape[0])]
+        return [FTIR_PeakDiscovery.referenceBands[referenceOrder[referenceIndex]][1]
+                if abs(referenceWavenumbers[referenceIndex] - wavenumber) <= self.assignTolerance
+                else f"Unassigned ({wavenumber:.0f} cm⁻¹)"
+                for referenceIndex, wavenumber in zip(nearest, bandWavenumbers)]
+
+    def discover(self, spectra):
+        # spectra yields one (wavenumbers, transmittances) pair per sample; the grids need not be shared
+        listSampleIndices, listWavenumbers, listProminences, listHeights = [], [], [], []
+        numberOfSamples = 0
+        for sampleIndex, (wavenumbers, transmittances) in enumerate(spectra):
+            peakWavenumbers, peakTransmittances, peakProminences, peakHeights = self.findPeaks(wavenumbers,
+                                                                                                transmittances)
+            listSampleIndices.append(np.full(peakWavenumbers.shape[0], sampleIndex))
+            listWavenumbers.append(peakWavenumbers)
+            listProminences.append(peakProminences)
+            listHeights.append(peakHeights)
+            numberOfSamples += 1
+        if numberOfSamples == 0:
+            raise ValueError("Peak discovery needs at least one FTIR spectrum.")
+
+        with pipelineProfiler.stage("FTIR peak matching", items=numberOfSamples):
+            bandLow, bandHigh, bandMeans, bandProminences, samplesFound = self.matchPeaks(
+                np.concatenate(listSampleIndices), np.concatenate(listWavenumbers), np.concatenate(listProminences),
+                np.concatenate(listHeights), numberOfSamples)
+            if bandMeans.shape[0] == 0:
+                raise ValueError("No absorption band was found in enough of the spectra; lower minProminence or "
+                                 "minPresence.")
+            windowLow, windowHigh = self.bandWindows(bandLow, bandHigh)
+            peakVibrations = self.assignVibrations(bandMeans)
+            windowLow, windowHigh, self.referencePeak, isAdded = self.referenceWindow(windowLow, windowHigh,
+                                                                                      bandMeans)
+            if isAdded:
+                # The added reference band was not found in the spectra, so it has no matched minima
+                peakVibrations.insert(self.referencePeak,
+                                      self.assignVibrations(np.array([self.referenceWavenumber]))[0])
+                bandMeans = np.insert(bandMeans, self.referencePeak, np.nan)
+                bandProminences = np.insert(bandProminences, self.referencePeak, np.nan)
+                samplesFound = np.insert(samplesFound, self.referencePeak, 0)
+            self.peakScanRange_High = [int(high) for high in windowHigh]
+            self.peakScanRange_Low = [int(low) for low in windowLow]
+            self.peakVibrations = peakVibrations
+            self.numberOfPeaks = len(self.peakVibrations)
+            self.DFDiscoveredPeaks = pd.DataFrame({
+                "Peak Number": np.arange(1, self.numberOfPeaks + 1),
+                "Peak Range (cm⁻¹)": [f'{low}-{high}' for low, high in zip(windowLow, windowHigh)],
+                "Type of Vibration": self.peakVibrations,
+                "Mean Minimum Wavenumber (cm⁻¹)": bandMeans,
+                "Mean Prominence (%T)": bandProminences,
+                "Samples Found": samplesFound,
+                "Relative Height Reference": np.arange(self.numberOfPeaks) == self.referencePeak})
+        return self.DFDiscoveredPeaks
+
+    @pipelineProfiler.profiled("FTIR peak discovery", items=lambda self, listFTIR_Outputs: len(listFTIR_Outputs))
+    def discoverFTIROutputs(self, listFTIR_Outputs):
+        def spectra():
+            for FTIRObj in listFTIR_Outputs:
+                DFSample = FTIRObj.DFSample
+                yield (DFSample["Wavenumber"].to_numpy(dtype=float),
+                       DFSample["Percent Transmittance"].to_numpy(dtype=float))
+        return self.discover(spectra())
@@ -0,0 +1,55 @@
+import sys
+import numpy as np
+from Source_FTIR_HNMR.cls_FTIR_Peak import FTIR_Peak
+
+class FTIR_PeakTable:
+    # Columnar storage of the peaks of many samples: wavenumber, transmittance and relative height are contiguous
+    # ... (samples x peaks) arrays, and the vibration label of each peak is stored once for all samples.
+    def __init__(self, peakWavenumbers, peakTransmittances, peakRelativeHeights, peakVibrations):
+        self.peakWavenumbers = np.ascontiguousarray(peakWavenumbers, dtype=float)
+        self.peakTransmittances = np.ascontiguousarray(peakTransmittances, dtype=float)
+        self.peakRelativeHeights = np.ascontiguousarray(peakRelativeHeights, dtype=float)
+        self.peakVibrations = tuple(sys.intern(str(vibration)) for vibration in peakVibrations)
+        self.numberOfSamples, self.numberOfPeaks = self.peakWavenumbers.shape
+        if len(self.peakVibrations) != self.numberOfPeaks:
+            raise ValueError("Each peak of the table must have exactly one vibration label.")
+
+    @classmethod
+    def fromFTIRPeaks(cls, listFTIRPeaks_PerSample):
+        # Build a table from per-sample lists of FTIR_Peak objects with the same peaks in the same order
+        peakVibrations = [FTIRPeak.molecularVibration for FTIRPeak in listFTIRPeaks_PerSample[0]]
+        peakColumns = [[[getattr(FTIRPeak, attribute) for FTIRPeak in listFTIRPeaks]
+                        for listFTIRPeaks in listFTIRPeaks_PerSample]
+                       for attribute in ("wavenumber", "percentTransmittance", "relativeHeight")]
+        return cls(*peakColumns, peakVibrations)
+
+    def getPeak(self, sampleIndex, peakIndex):
+        return FTIR_PeakView(self, sampleIndex, peakIndex)
+
+    def getFTIRPeaks(self, sampleIndex):
+        return [FTIR_PeakView(self, sampleIndex, peakIndex) for peakIndex in range(self.numberOfPeaks)]
+
+class FTIR_PeakView(FTIR_Peak):
+    # A read-only FTIR_Peak that refers to one cell of an FTIR_PeakTable instead of holding its own values
+    __slots__ = ("peakTable", "sampleIndex", "peakIndex")
+
+    def __init__(self, peakTable, sampleIndex, peakIndex):
+        self.peakTable = peakTable
+        self.sampleIndex = sampleIndex
+        self.peakIndex = peakIndex
+
+    @property
+    def wavenumber(self):
+        return self.peakTable.peakWavenumbers[self.sampleIndex, self.peakIndex]
+
+    @property
+    def percentTransmittance(self):
+        return self.peakTable.peakTransmittances[self.sampleIndex, self.peakIndex]
+
+    @property
+    def relativeHeight(self):
+        return self.peakTable.peakRelativeHeights[self.sampleIndex, self.peakIndex]
+
+    @property
+    def molecularVibration(self):
+        return self.peakTable.peakVibrations[self.peakIndex]
@@ -1,9 +1,125 @@
+import numpy as np
 import pandas as pd
-import os
-from matplotlib import pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-from scipy.stats.mstats import pearsonr
+from Source_FTIR_HNMR.cls_CorrelationResampling import CorrelationResampling
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.pearsonKernel import pearsonMatrix, trendLabels
+from Source_FTIR_HNMR.rootDir import path_OutNMR_CorrelAllOOP, path_OutNMR_CorrelSigOOP
 
 class HNMR_CorrelationAnalysis:
-    def __init__(self):
-        pass
\ No newline at end of file
+    def __init__(self, listHNMR_Outputs = [], lambdaKey = lambda HNMRObj: HNMRObj.fraction_CanolaOil,
+                 minimumOverlap = 0.5):
+        self.listHNMR_Outputs = listHNMR_Outputs.copy()
+        self.listHNMR_Outputs.sort(key = lambdaKey)
+        self.numberOfSamples = len(self.listHNMR_Outputs)
+        self.lambdaKey = lambdaKey
+        self.minimumOverlap = minimumOverlap
+
+    @pipelineProfiler.profiled("1H-NMR peak grouping", items=lambda self: self.numberOfSamples)
+    def groupPeaks(self):
+        # Group the integrated regions of all samples that are analogous to each other. Regions are visited in order
+        # ... of decreasing midpoint, and a region joins the current group when it overlaps the group's average region
+        # ... by at least minimumOverlap of the narrower width and its sample is not in the group yet.
+        sampleIndices = np.concatenate([np.full(HNMRObj.numberOfPeaks, sampleIndex)
+                                        for sampleIndex, HNMRObj in enumerate(self.listHNMR_Outputs)])
+        highShifts = np.concatenate([HNMRObj.rangeHigh for HNMRObj in self.listHNMR_Outputs])
+        lowShifts = np.concatenate([HNMRObj.rangeLow for HNMRObj in self.listHNMR_Outputs])
+        peakAreas = np.concatenate([HNMRObj.peakAreas for HNMRObj in self.listHNMR_Outputs])
+        sweepOrder = np.argsort(-(highShifts + lowShifts), kind="stable")
+
+        groupNumbers = np.empty(sweepOrder.shape[0], dtype=np.intp)
+        groupHigh, groupLow, groupSizes = [], [], []
+        groupSamples = set()
+        for regionIndex in sweepOrder:
+            high, low, sampleIndex = highShifts[regionIndex], lowShifts[regionIndex], sampleIndices[regionIndex]
+            if groupSizes and sampleIndex not in groupSamples:
+                overlap = min(high, groupHigh[-1]) - max(low, groupLow[-1])
+                narrowerWidth = min(high - low, groupHigh[-1] - groupLow[-1])
+                joinsGroup = narrowerWidth > 0 and overlap >= self.minimumOverlap * narrowerWidth
+            else:
+                joinsGroup = False
+            if joinsGroup:
+                # Keep a running average of the boundaries of the regions in the group
+                groupSizes[-1] += 1
+                groupHigh[-1] += (high - groupHigh[-1]) / groupSizes[-1]
+                groupLow[-1] += (low - groupLow[-1]) / groupSizes[-1]
+            else:
+                groupHigh.append(high)
+                groupLow.append(low)
+                groupSizes.append(1)
+                groupSamples = set()
+            groupSamples.add(sampleIndex)
+            groupNumbers[regionIndex] = len(groupSizes) - 1
+
+        # Peak areas of each group of analogous peaks per sample; samples without an analogous region are left empty
+        self.numberOfPeaks = len(groupSizes)
+        self.highShifts_Grouped = np.round(groupHigh, 2)
+        self.lowShifts_Grouped = np.round(groupLow, 2)
+        self.peakAreas_Grouped = np.full((self.numberOfPeaks, self.numberOfSamples), np.nan)
+        self.peakAreas_Grouped[groupNumbers, sampleIndices] = peakAreas
+
+    @pipelineProfiler.profiled("1H-NMR correlations", items=lambda self: self.numberOfSamples)
+    def generateCorrelations(self):
+        # For each group of analogous peaks, compute the Pearson correlation coefficient between mass %canola oil
+        # ... and peak areas, with every group correlated in a single pass
+        if not hasattr(self, "peakAreas_Grouped"):
+            self.groupPeaks()
+        names_HNMRSamples = [HNMRObj.sampleName_Short for HNMRObj in self.listHNMR_Outputs]
+        percentCanola_HNMRSamples = [HNMRObj.fraction_CanolaOil for HNMRObj in self.listHNMR_Outputs]
+        pearsonCoeffs, pValues = pearsonMatrix(percentCanola_HNMRSamples, self.peakAreas_Grouped.T)
+        boolSignificance, signTrend = trendLabels(pearsonCoeffs, pValues)
+
+        DFPeakCorrelation_Dict = {
+            "Peak Number": np.arange(1, self.numberOfPeaks + 1),
+            "Range of Chemical Shift (δ)": [f'{low:.2f}-{high:.2f}' for low, high in zip(self.lowShifts_Grouped,
+                                                                                         self.highShifts_Grouped)]}
+        for sampleIndex, (x, y) in enumerate(zip(names_HNMRSamples, percentCanola_HNMRSamples)):
+            DFPeakCorrelation_Dict[f'{x} ({y:.1%} CO)'] = self.peakAreas_Grouped[:, sampleIndex]
+        DFPeakCorrelation_Dict.update({"Pearson Coefficient": pearsonCoeffs,
+                                       "p-value": pValues,
+                                       "Significant? (p < 5%)": boolSignificance,
+                                       "Trend": signTrend})
+        self.DFPeakCorrelation = pd.DataFrame(DFPeakCorrelation_Dict)
+
+    def generateResampledSignificance(self, numberOfResamples=10000, seed=0, jobs=1, confidenceLevel=0.95):
+        # Add permutation p-values and bootstrap confidence intervals of the coefficients to the correlation table;
+        # ... each group of peaks is resampled over the samples that have it
+        if not hasattr(self, "DFPeakCorrelation"):
+            self.generateCorrelations()
+        with pipelineProfiler.stage("1H-NMR resampled significance", items=numberOfResamples):
+            correlationResampling = CorrelationResampling(numberOfResamples, seed, jobs, confidenceLevel=confidenceLevel)
+            correlationResampling.addColumns(self.DFPeakCorrelation,
+                                             [HNMRObj.fraction_CanolaOil for HNMRObj in self.listHNMR_Outputs],
+                                             self.peakAreas_Grouped.T)
+
+    def longTables(self):
+        # The correlation table in long format, for the ResultsStore; peaks missing from a sample have no row
+        peakIndices, sampleIndices = np.nonzero(~np.isnan(self.peakAreas_Grouped))
+        DFObservations = pd.DataFrame({
+            "Sample Name (Short)": np.asarray([HNMRObj.sampleName_Short for HNMRObj in self.listHNMR_Outputs],
+                                              dtype=str)[sampleIndices],
+            "Canola Mass Fraction": np.asarray([HNMRObj.fraction_CanolaOil for HNMRObj in self.listHNMR_Outputs],
+                                               dtype=float)[sampleIndices],
+            "Peak Number": peakIndices + 1,
+            "Range Low": self.lowShifts_Grouped[peakIndices],
+            "Range High": self.highShifts_Grouped[peakIndices],
+            "Value": self.peakAreas_Grouped[peakIndices, sampleIndices]})
+        DFPeakStatistics = pd.DataFrame({"Peak Number": np.arange(1, self.numberOfPeaks + 1),
+                                         "Range Low": self.lowShifts_Grouped,
+                                         "Range High": self.highShifts_Grouped})
+        # The statistics are the columns from the Pearson coefficient on, including any resampling columns
+        statisticsStart = self.DFPeakCorrelation.columns.get_loc("Pearson Coefficient")
+        for columnName in self.DFPeakCorrelation.columns[statisticsStart:]:
+            DFPeakStatistics[columnName] = self.DFPeakCorrelation[columnName].to_numpy()
+        return DFObservations, DFPeakStatistics
+
+    @pipelineProfiler.profiled("1H-NMR results store append")
+    def appendResults(self, resultsStore, label=""):
+        return resultsStore.append("1H-NMR", *self.longTables(), label=label)
+
+    @pipelineProfiler.profiled("1H-NMR correlation CSV")
+    def saveCorrelations(self, HNMR_OutputDir, CSVFileName=path_OutNMR_CorrelAllOOP,
+                         SigCSVFileName=path_OutNMR_CorrelSigOOP):
+        self.DFPeakCorrelation.to_csv(HNMR_OutputDir / CSVFileName, index=False)
+        # Another file containing only the significant correlations is saved.
+        DFSignificantCorr = self.DFPeakCorrelation.loc[self.DFPeakCorrelation["Significant? (p < 5%)"]]
+        DFSignificantCorr.to_csv(HNMR_OutputDir / SigCSVFileName, index=False)
@@ -0,0 +1,98 @@
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.rootDir import path_OutNMR_FattyAcidsOOP
+
+class HNMR_FattyAcidEstimator:
+    # Estimates the fatty-acid composition of oils from five 1H-NMR integrals, for all samples at once (the method
+    # ... of "FTIR_H-NMR of Cooking Oils, Calculations for FA Estimates.xlsx"). Each signal is looked up in a sample's
+    # ... integral table as the region containing the centre of its δ range. Every integral is divided by the number of
+    # ... acyl chains, N = (I1 + I2) / 3, from the three protons of each terminal methyl group, so the integrals need no
+    # ... particular normalization. Per chain:
+    # ...   linolenic           LNA = I2 / (I1 + I2)
+    # ...   linoleic            LA  = I7 / 2N - 2 LNA          (bis-allylic CH2: 2 H in linoleic, 4 H in linolenic)
+    # ...   unsaturated         UFA = I5 / 4N                  (allylic CH2: 4 H in every unsaturated chain)
+    # ...   monounsaturated     MUFA = UFA - LA - LNA, saturated SFA = 1 - UFA
+    # ...   double bonds        DB  = (I9 / N - 1/3) / 2       (olefinic CH, less the glycerol CH of 1/3 per chain)
+    # ... The iodine value (g I2 / 100 g oil) follows from DB and the mean triacylglycerol molar mass, taking the chains
+    # ... to be palmitic, oleic, linoleic and linolenic acids in the estimated proportions.
+    signals = [("I1", "All fatty acids except linolenic acid (CH3)", 0.837, 0.927),
+               ("I2", "Linolenic acid (CH3)", 0.927, 1.002),
+               ("I5", "Mono- and polyunsaturated acids (allylic CH2)", 1.938, 2.092),
+               ("I7", "Linoleic and linolenic acid (bis-allylic CH2)", 2.715, 2.837),
+               ("I9", "Olefinic CH and glycerol CH", 5.224, 5.428)]
+    molarMass_I2 = 253.81
+    molarMass_Glycerol = 92.094
+    molarMass_Water = 18.015
+    molarMass_Acids = {"SFA": 256.42, "MUFA": 282.46, "LA": 280.45, "LNA": 278.43}
+
+    def __init__(self):
+        self.signalNames = [name for name, _, _, _ in HNMR_FattyAcidEstimator.signals]
+        self.signalLow = np.array([low for _, _, low, _ in HNMR_FattyAcidEstimator.signals])
+        self.signalHigh = np.array([high for _, _, _, high in HNMR_FattyAcidEstimator.signals])
+
+    def signalIntegrals(self, rangeHigh, rangeLow, peakAreas):
+        # (samples x signals) integrals from (samples x regions) tables, padded with NaN where a table is shorter;
+        # ... a signal without a region in a sample's table is NaN for that sample
+        rangeHigh, rangeLow = np.atleast_2d(rangeHigh), np.atleast_2d(rangeLow)
+        peakAreas = np.atleast_2d(peakAreas)
+        signalCentres = (self.signalLow + self.signalHigh) / 2
+        containsSignal = ((rangeLow[:, :, None] <= signalCentres) & (signalCentres <= rangeHigh[:, :, None]))
+        regionIndices = containsSignal.argmax(axis=1)
+        integrals = np.take_along_axis(peakAreas, regionIndices, axis=1)
+        return np.where(containsSignal.any(axis=1), integrals, np.nan)
+
+    def estimate(self, signalIntegrals):
+        # Composition of every sample in one pass over the (samples x signals) integrals, as a dictionary of arrays
+        I1, I2, I5, I7, I9 = np.asarray(signalIntegrals, dtype=float).T
+        with np.errstate(divide="ignore", invalid="ignore"):
+            chains = (I1 + I2) / 3
+            LNA = I2 / (I1 + I2)
+            LA = I7 / (2 * chains) - 2 * LNA
+            UFA = I5 / (4 * chains)
+            MUFA = UFA - LA - LNA
+            SFA = 1 - UFA
+            doubleBonds = (I9 / chains - 1 / 3) / 2
+
+            molarMass_Acids = HNMR_FattyAcidEstimator.molarMass_Acids
+            molarMass_Chain = (SFA * molarMass_Acids["SFA"] + MUFA * molarMass_Acids["MUFA"]
+                               + LA * molarMass_Acids["LA"] + LNA * molarMass_Acids["LNA"])
+            molarMass_TAG = (HNMR_FattyAcidEstimator.molarMass_Glycerol
+                             + 3 * (molarMass_Chain - HNMR_FattyAcidEstimator.molarMass_Water))
+            iodineValue = 100 * HNMR_FattyAcidEstimator.molarMass_I2 * 3 * doubleBonds / molarMass_TAG
+        return {"Saturated FA (%SFA)": 100 * SFA,
+                "Monounsaturated FA (%MUFA)": 100 * MUFA,
+                "Polyunsaturated FA (%PUFA)": 100 * (LA + LNA),
+                "Linoleic Acid (%LA)": 100 * LA,
+                "Linolenic Acid (%LNA)": 100 * LNA,
+                "Double Bonds per Chain": doubleBonds,
+                "Iodine Value (est.)": iodineValue}
+
+    @staticmethod
+    def stackIntegralTables(listHNMR_Outputs):
+        # (samples x regions) arrays of the integral tables, padded with NaN up to the longest table
+        numberOfRegions = max(HNMRObj.numberOfPeaks for HNMRObj in listHNMR_Outputs)
+        rangeHigh, rangeLow, peakAreas = (np.full((len(listHNMR_Outputs), numberOfRegions), np.nan) for _ in range(3))
+        for sampleIndex, HNMRObj in enumerate(listHNMR_Outputs):
+            rangeHigh[sampleIndex, :HNMRObj.numberOfPeaks] = HNMRObj.rangeHigh
+            rangeLow[sampleIndex, :HNMRObj.numberOfPeaks] = HNMRObj.rangeLow
+            peakAreas[sampleIndex, :HNMRObj.numberOfPeaks] = HNMRObj.peakAreas
+        return rangeHigh, rangeLow, peakAreas
+
+    @pipelineProfiler.profiled("1H-NMR fatty-acid estimates", items=lambda self, listHNMR_Outputs: len(listHNMR_Outputs))
+    def estimateHNMROutputs(self, listHNMR_Outputs):
+        integrals = self.signalIntegrals(*HNMR_FattyAcidEstimator.stackIntegralTables(listHNMR_Outputs))
+        DFFattyAcids_Dict = {"Sample Name (Short)": [HNMRObj.sampleName_Short for HNMRObj in listHNMR_Outputs],
+                             "Canola Mass Fraction": [HNMRObj.fraction_CanolaOil for HNMRObj in listHNMR_Outputs]}
+        for signalIndex, signalName in enumerate(self.signalNames):
+            DFFattyAcids_Dict[signalName] = integrals[:, signalIndex]
+        DFFattyAcids_Dict.update(self.estimate(integrals))
+        self.DFFattyAcids = pd.DataFrame(DFFattyAcids_Dict)
+        return self.DFFattyAcids
+
+    def estimateSpectrumIndex(self, spectrumIndex):
+        # Estimates straight from full spectra (an HNMR_SpectrumIndex), integrating the δ range of each signal
+        return self.estimate(spectrumIndex.integrate(self.signalHigh, self.signalLow, normalizeTo=None))
+
+    def saveEstimates(self, HNMR_OutputDir, CSVFileName=path_OutNMR_FattyAcidsOOP):
+        self.DFFattyAcids.to_csv(HNMR_OutputDir / CSVFileName, index=False)
@@ -1,9 +1,148 @@
+import numpy as np
 import pandas as pd
-import os
-from matplotlib import pyplot as plt
-from matplotlib.colors import LinearSegmentedColormap
-from scipy.stats.mstats import pearsonr
+from Source_FTIR_HNMR.cls_HNMR_SpectrumIndex import HNMR_SpectrumIndex
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
 
 class HNMR_Output:
-    def __init__(self):
-        pass
+    listHNMR_Outputs = []
+    numberOfSamples = len(listHNMR_Outputs)
+    DF_HNMRColumns = ["Peak Number", "Range High δ", "Range Low δ", "%Peak Area"]
+
+    # Integration regions used for full spectra when no others are given (those of the instrument's integral tables)
+    integrationRange_High = [6.600, 5.428, 5.224, 4.341, 4.262, 4.175, 4.100, 2.837, 2.715, 2.344,
+                             2.253, 2.088, 1.938, 1.685, 1.543, 1.409, 1.184, 1.002, 0.927, 0.837]
+    integrationRange_Low = [5.428, 5.224, 4.341, 4.262, 4.175, 4.100, 2.837, 2.715, 2.344, 2.253,
+                            2.088, 1.938, 1.685, 1.543, 1.409, 1.184, 1.002, 0.927, 0.837, 0.400]
+
+    def __init__(self, TXT_HNMRFile, sampleName_Full="", sampleName_Short="", sampleMedium="", plotColor="#5284bd",
+                 fraction_CanolaOil=1.00, registerSample=True, integralTable=None, chemicalShifts=None,
+                 intensities=None):
+        self.TXT_HNMRFile = TXT_HNMRFile
+        self.sampleName_Full = sampleName_Full
+        self.sampleName_Short = sampleName_Short
+        self.sampleMedium = sampleMedium
+        self.plotColor = plotColor
+        self.fraction_CanolaOil = fraction_CanolaOil
+
+        # The integral table is read lazily, on first access of any of its columns, unless it is given directly as
+        # ... a dictionary of the arrays returned by readIntegralTable
+        self._integralTable = integralTable
+
+        # A full spectrum (intensity against δ) may be given instead; its integral table is then integrated over the
+        # ... integration ranges of the class, or over other regions with integrateRegions
+        self.chemicalShifts = chemicalShifts
+        self.intensities = intensities
+        self._spectrumIndex = None
+
+        # Add new 1H-NMR output to the list of all 1H-NMR outputs
+        if registerSample:
+            HNMR_Output.addSample(self)
+
+    @staticmethod
+    @pipelineProfiler.profiled("1H-NMR raw text parse", items=lambda TXT_HNMRFile: 1)
+    def readIntegralTable(TXT_HNMRFile):
+        # Stream the instrument's raw text export (a header line, then whitespace-separated columns of peak number,
+        # ... integrated region from high to low δ, and integral) straight into typed arrays
+        with open(TXT_HNMRFile, 'r', encoding='UTF-8') as file:
+            rawTable = np.loadtxt(file, skiprows=1, ndmin=2)
+        if rawTable.shape[1] != 4:
+            raise ValueError(f"{TXT_HNMRFile} is not a 1H-NMR integral table with 4 columns.")
+        return {"peakNumbers": rawTable[:, 0].astype(np.int32),
+                "rangeHigh": np.ascontiguousarray(rawTable[:, 1]),
+                "rangeLow": np.ascontiguousarray(rawTable[:, 2]),
+                "peakAreas": np.ascontiguousarray(rawTable[:, 3])}
+
+    @staticmethod
+    def iterIntegralTables(listTXT_HNMRFiles):
+        # Read many integral tables one file at a time, so memory use does not grow with the number of files
+        for TXT_HNMRFile in listTXT_HNMRFiles:
+            yield TXT_HNMRFile, HNMR_Output.readIntegralTable(TXT_HNMRFile)
+
+    @property
+    def integralTable(self):
+        if self._integralTable is None:
+            if self.intensities is not None:
+                self.integrateRegions()
+            else:
+                self._integralTable = HNMR_Output.readIntegralTable(self.TXT_HNMRFile)
+        return self._integralTable
+
+    @property
+    def spectrumIndex(self):
+        if self._spectrumIndex is None:
+            if self.intensities is None:
+                raise ValueError(f"{self.sampleName_Short or self.TXT_HNMRFile} has no full 1H-NMR spectrum.")
+            self._spectrumIndex = HNMR_SpectrumIndex(self.chemicalShifts, self.intensities)
+        return self._spectrumIndex
+
+    def integrateRegions(self, rangeHigh=None, rangeLow=None, normalizeTo=100.0):
+        # Replace the integral table with the integrals of the full spectrum over new regions
+        rangeHigh = HNMR_Output.integrationRange_High if rangeHigh is None else rangeHigh
+        rangeLow = HNMR_Output.integrationRange_Low if rangeLow is None else rangeLow
+        self._integralTable = self.spectrumIndex.integralTables(rangeHigh, rangeLow, normalizeTo)[0]
+        return self._integralTable
+
+    @staticmethod
+    def spectrumIndexAll(listHNMR_Outputs):
+        # One prefix-sum index over the full spectra of many samples, which must share a δ grid. It can be kept and
+        # ... passed to integrateRegionsAll to integrate the same samples over several sets of regions.
+        chemicalShifts = np.asarray(listHNMR_Outputs[0].chemicalShifts, dtype=float)
+        intensities = np.empty((len(listHNMR_Outputs), chemicalShifts.shape[0]))
+        for sampleIndex, HNMRObj in enumerate(listHNMR_Outputs):
+            if HNMRObj.intensities is None:
+                raise ValueError(f"{HNMRObj.sampleName_Short or HNMRObj.TXT_HNMRFile} has no full 1H-NMR spectrum.")
+            if not np.array_equal(np.asarray(HNMRObj.chemicalShifts, dtype=float), chemicalShifts):
+                raise ValueError(f"{HNMRObj.sampleName_Short or HNMRObj.TXT_HNMRFile} does not share the δ grid of "
+                                 f"the other spectra.")
+            intensities[sampleIndex] = HNMRObj.intensities
+        return HNMR_SpectrumIndex(chemicalShifts, intensities)
+
+    @staticmethod
+    def integrateRegionsAll(listHNMR_Outputs, rangeHigh=None, rangeLow=None, normalizeTo=100.0, spectrumIndex=None):
+        rangeHigh = HNMR_Output.integrationRange_High if rangeHigh is None else rangeHigh
+        rangeLow = HNMR_Output.integrationRange_Low if rangeLow is None else rangeLow
+        if spectrumIndex is None:
+            spectrumIndex = HNMR_Output.spectrumIndexAll(listHNMR_Outputs)
+        for HNMRObj, integralTable in zip(listHNMR_Outputs,
+                                          spectrumIndex.integralTables(rangeHigh, rangeLow, normalizeTo)):
+            HNMRObj._integralTable = integralTable
+        return spectrumIndex
+
+    @property
+    def peakNumbers(self):
+        return self.integralTable["peakNumbers"]
+
+    @property
+    def rangeHigh(self):
+        return self.integralTable["rangeHigh"]
+
+    @property
+    def rangeLow(self):
+        return self.integralTable["rangeLow"]
+
+    @property
+    def peakAreas(self):
+        return self.integralTable["peakAreas"]
+
+    @property
+    def numberOfPeaks(self):
+        return self.peakNumbers.shape[0]
+
+    @property
+    def DFSample(self):
+        # Same layout as the CSV files formerly written by Procedural_NMRCleanUp.py
+        return pd.DataFrame(dict(zip(HNMR_Output.DF_HNMRColumns,
+                                     [self.peakNumbers, self.rangeHigh, self.rangeLow, self.peakAreas])))
+
+    def preload(self):
+        self.integralTable
+        return self
+
+    @classmethod
+    def addSample(cls, HNMRObj):
+        cls.listHNMR_Outputs.append(HNMRObj)
+        cls.numberOfSamples = len(cls.listHNMR_Outputs)
+
+    @classmethod
+    def sortHNMRs(cls):
+        cls.listHNMR_Outputs.sort(key = lambda HNMRObj: HNMRObj.fraction_CanolaOil)
@@ -0,0 +1,71 @@
+import numpy as np
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+
+class HNMR_SpectrumIndex:
+    # Cumulative-integral (prefix-sum) index of full 1H-NMR spectra (intensity against chemical shift δ) that share
+    # ... one δ grid. The trapezoidal integral from the low end of the grid up to every grid point is computed once per
+    # ... spectrum; the integral of any region [low δ, high δ] is then the difference of the cumulative integral at its
+    # ... two bounds, with the partial trapezoids at the bounds interpolated linearly. Evaluating a region therefore
+    # ... costs the same however wide it is or however finely the spectrum is sampled, for every spectrum at once.
+    # ... Regions reaching past either end of the grid are integrated over the part that lies on the grid.
+    def __init__(self, chemicalShifts, intensities):
+        chemicalShifts = np.asarray(chemicalShifts, dtype=float)
+        intensities = np.atleast_2d(np.asarray(intensities, dtype=float))
+        if chemicalShifts.ndim != 1 or chemicalShifts.shape[0] < 2:
+            raise ValueError("The δ grid must be one-dimensional with at least two points.")
+        if intensities.shape[1] != chemicalShifts.shape[0]:
+            raise ValueError("Every spectrum must have one intensity per point of the δ grid.")
+
+        # Spectra are usually stored from high to low δ; the index works on ascending δ (reversed views, no copies)
+        if chemicalShifts[0] > chemicalShifts[-1]:
+            chemicalShifts, intensities = chemicalShifts[::-1], intensities[:, ::-1]
+        if not (np.diff(chemicalShifts) > 0).all():
+            raise ValueError("The δ grid must be strictly monotonic.")
+        self.chemicalShifts = chemicalShifts
+        self.intensities = intensities
+        self.numberOfSpectra = intensities.shape[0]
+
+        with pipelineProfiler.stage("1H-NMR prefix-sum index", items=self.numberOfSpectra):
+            self.pointSpacings = np.diff(chemicalShifts)
+            self.cumulativeIntegrals = np.empty(intensities.shape)
+            self.cumulativeIntegrals[:, 0] = 0.0
+            np.add(intensities[:, 1:], intensities[:, :-1], out=self.cumulativeIntegrals[:, 1:])
+            self.cumulativeIntegrals[:, 1:] *= self.pointSpacings / 2
+            np.cumsum(self.cumulativeIntegrals[:, 1:], axis=1, out=self.cumulativeIntegrals[:, 1:])
+
+    def cumulativeIntegral(self, shifts):
+        # (spectra x shifts) integral from the low end of the grid up to each chemical shift
+        shifts = np.clip(np.asarray(shifts, dtype=float), self.chemicalShifts[0], self.chemicalShifts[-1])
+        pointIndices = np.clip(np.searchsorted(self.chemicalShifts, shifts, side="right") - 1, 0,
+                               self.chemicalShifts.shape[0] - 2)
+        spacings = self.pointSpacings[pointIndices]
+        fractions = (shifts - self.chemicalShifts[pointIndices]) / spacings
+        lowIntensities = self.intensities[:, pointIndices]
+        highIntensities = self.intensities[:, pointIndices + 1]
+        # Trapezoid from the grid point to the shift, with the intensity at the shift interpolated linearly
+        partialIntegrals = spacings * fractions * (lowIntensities + fractions * (highIntensities - lowIntensities) / 2)
+        return self.cumulativeIntegrals[:, pointIndices] + partialIntegrals
+
+    def integrate(self, rangeHigh, rangeLow, normalizeTo=100.0):
+        # (spectra x regions) integrals of the regions between rangeHigh and rangeLow. With normalizeTo, the regions
+        # ... of each spectrum are scaled to sum to it, as the instrument does for its %Peak Area integral tables.
+        rangeHigh, rangeLow = np.asarray(rangeHigh, dtype=float), np.asarray(rangeLow, dtype=float)
+        if rangeHigh.shape != rangeLow.shape or rangeHigh.ndim != 1:
+            raise ValueError("rangeHigh and rangeLow must be one-dimensional and of the same length.")
+        with pipelineProfiler.stage("1H-NMR region integration", items=self.numberOfSpectra):
+            regionIntegrals = (self.cumulativeIntegral(np.maximum(rangeHigh, rangeLow))
+                               - self.cumulativeIntegral(np.minimum(rangeHigh, rangeLow)))
+            if normalizeTo is not None:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    regionIntegrals *= normalizeTo / regionIntegrals.sum(axis=1, keepdims=True)
+            return regionIntegrals
+
+    def integralTables(self, rangeHigh, rangeLow, normalizeTo=100.0):
+        # One integral table per spectrum, in the format returned by HNMR_Output.readIntegralTable; every table owns
+        # ... its arrays, so that editing the table of one sample leaves the others unchanged
+        regionIntegrals = self.integrate(rangeHigh, rangeLow, normalizeTo)
+        rangeHigh, rangeLow = np.array(rangeHigh, dtype=float), np.array(rangeLow, dtype=float)
+        peakNumbers = np.arange(1, rangeHigh.shape[0] + 1, dtype=np.int32)
+        return [{"peakNumbers": peakNumbers.copy(), "rangeHigh": rangeHigh.copy(), "rangeLow": rangeLow.copy(),
+                 "peakAreas": peakAreas.copy()}
+                for peakAreas in regionIntegrals]
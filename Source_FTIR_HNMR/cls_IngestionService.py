@@ -0,0 +1,168 @@
+import asyncio
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from Source_FTIR_HNMR.cls_FTIR_AnalysisSession import FTIR_AnalysisSession
+from Source_FTIR_HNMR.cls_FTIR_IncrementalCorrelationAnalysis import FTIR_IncrementalCorrelationAnalysis
+from Source_FTIR_HNMR.cls_HNMR_CorrelationAnalysis import HNMR_CorrelationAnalysis
+from Source_FTIR_HNMR.cls_SampleManifest import SampleManifest, loadSample
+from Source_FTIR_HNMR.rootDir import (path_InstrumentOutputs, path_SampleManifest, path_ProgOutput_FTIR,
+                                      path_ProgOutput_HNMR, path_OutFTIR_CorrelSummaryOOP, path_OutNMR_CorrelAllOOP,
+                                      path_OutNMR_CorrelSigOOP)
+
+logger = logging.getLogger(__name__)
+
+class IngestionService:
+    # Watches the instrument output folder and analyses each FTIR or 1H-NMR file as soon as the instrument has finished
+    # ... writing it. The folder is polled every pollInterval seconds, and a file counts as finished once its size and
+    # ... modification time have not changed for settleTime seconds. Files are parsed in a pool of `jobs` worker
+    # ... processes; back in the event loop, an FTIR sample gets its peaks extracted and is added to the running
+    # ... (incremental) correlations, while a 1H-NMR sample triggers a regrouping of the parsed integral tables, since
+    # ... the peak groups depend on every sample. A file that changes after being processed replaces its old sample;
+    # ... a file that is deleted, or rewritten with contents that cannot be analysed, takes its old sample out of the
+    # ... analysis until it is next written correctly.
+    def __init__(self, instrumentDir=path_InstrumentOutputs, manifestFile=path_SampleManifest, outputDir=None,
+                 pollInterval=1.0, settleTime=2.0, jobs=2):
+        self.manifest = SampleManifest(Path(instrumentDir), manifestFile)
+        self.pollInterval = pollInterval
+        self.settleTime = settleTime
+        self.jobs = jobs or os.cpu_count() or 1
+        self.FTIR_OutputDir = Path(outputDir) if outputDir is not None else path_ProgOutput_FTIR
+        self.HNMR_OutputDir = Path(outputDir) if outputDir is not None else path_ProgOutput_HNMR
+
+        self.FTIR_Session = FTIR_AnalysisSession()
+        self.FTIR_Correlations = FTIR_IncrementalCorrelationAnalysis([], session=self.FTIR_Session)
+        self.listHNMR_Outputs = []
+        self.pendingFiles = {}    # path -> (signature, time the signature was first seen)
+        self.processedFiles = {}  # path -> (signature, modality, sample object or None)
+        self.activeFiles = set()
+        self.numberProcessed = 0
+
+    def fileSignature(self, path):
+        fileStat = os.stat(path)
+        return fileStat.st_size, fileStat.st_mtime_ns
+
+    def scan(self):
+        # Paths of the files whose writing has settled and that still need to be (re)processed, then those of the
+        # ... processed files that have been deleted since, with a signature of None
+        readyFiles = []
+        currentTime = time.monotonic()
+        foundFiles = set()
+        for modality, filePattern in SampleManifest.filePatterns.items():
+            for path in self.manifest.instrumentDir.rglob(filePattern):
+                if path in self.activeFiles:
+                    foundFiles.add(path)
+                    continue
+                try:
+                    signature = self.fileSignature(path)
+                except OSError:
+                    continue
+                foundFiles.add(path)
+                if path in self.processedFiles and self.processedFiles[path][0] == signature:
+                    continue
+                pendingSignature, firstSeen = self.pendingFiles.get(path, (None, None))
+                if pendingSignature != signature:
+                    self.pendingFiles[path] = (signature, currentTime)
+                elif signature[0] > 0 and currentTime - firstSeen >= self.settleTime:
+                    del self.pendingFiles[path]
+                    readyFiles.append((path, modality, signature))
+        for path in set(self.pendingFiles) - foundFiles:
+            del self.pendingFiles[path]
+        for path, (_, modality, _) in self.processedFiles.items():
+            if path not in foundFiles and path not in self.activeFiles:
+                readyFiles.append((path, modality, None))
+        return readyFiles
+
+    async def processFile(self, executor, semaphore, path, modality, signature):
+        async with semaphore:
+            try:
+                sampleObj = None
+                if signature is not None:
+                    try:
+                        sampleKwargs = self.manifest.fileKwargs(path, modality)
+                        sampleObj = await asyncio.get_running_loop().run_in_executor(
+                            executor, loadSample, SampleManifest.loaderClasses[modality], sampleKwargs)
+                        if modality == "FTIR":
+                            self.prepareFTIR(sampleObj)
+                    except Exception:
+                        # A bad file must not stop the service; it is retried when it changes again
+                        sampleObj = None
+                        logger.exception("Could not process %s", path)
+                self.replaceSample(path, modality, signature, sampleObj)
+                if sampleObj is not None:
+                    self.numberProcessed += 1
+                    logger.info("Processed %s", path.name)
+                elif signature is None:
+                    logger.info("Removed %s", path.name)
+                if modality == "FTIR":
+                    self.writeFTIROutputs()
+                else:
+                    self.writeHNMROutputs()
+            except Exception:
+                logger.exception("Could not update the outputs for %s", path)
+            finally:
+                self.activeFiles.discard(path)
+
+    def prepareFTIR(self, FTIRObj):
+        # Peak extraction, the only step of an FTIR update that can fail, is done before the running state is touched
+        FTIRObj.session = self.FTIR_Session
+        FTIRObj.generatePeaks()
+        self.FTIR_Correlations.peakVectors(FTIRObj)
+
+    def replaceSample(self, path, modality, signature, sampleObj):
+        # Swap the file's previous sample (if any) for the new one (if any) in the running analysis. The new sample
+        # ... has already been read and prepared, so the swap only updates lists and running sums and cannot stop
+        # ... halfway. A signature of None means the file was deleted and is forgotten.
+        previousObj = self.processedFiles.get(path, (None, None, None))[2]
+        if modality == "FTIR":
+            if previousObj is not None:
+                self.FTIR_Correlations.removeSample(previousObj)
+                self.FTIR_Session.removeSample(previousObj)
+            if sampleObj is not None:
+                self.FTIR_Session.addSample(sampleObj)
+                self.FTIR_Correlations.addSample(sampleObj)
+        else:
+            if previousObj is not None:
+                self.listHNMR_Outputs.remove(previousObj)
+            if sampleObj is not None:
+                self.listHNMR_Outputs.append(sampleObj)
+        if signature is None:
+            self.processedFiles.pop(path, None)
+        else:
+            self.processedFiles[path] = (signature, modality, sampleObj)
+
+    def writeFTIROutputs(self):
+        # Only the new sample was peak-extracted; the correlations were updated from its peaks alone
+        self.FTIR_OutputDir.mkdir(parents=True, exist_ok=True)
+        self.FTIR_Correlations.generateSummary().to_csv(self.FTIR_OutputDir / path_OutFTIR_CorrelSummaryOOP.name,
+                                                        index=False)
+
+    def writeHNMROutputs(self):
+        if len(self.listHNMR_Outputs) < 3:
+            return  # p-values need at least three samples
+        HNMR_CorrelationObj = HNMR_CorrelationAnalysis(self.listHNMR_Outputs)
+        HNMR_CorrelationObj.generateCorrelations()
+        self.HNMR_OutputDir.mkdir(parents=True, exist_ok=True)
+        HNMR_CorrelationObj.saveCorrelations(self.HNMR_OutputDir, path_OutNMR_CorrelAllOOP.name,
+                                             path_OutNMR_CorrelSigOOP.name)
+
+    async def run(self, stopEvent=None):
+        # Poll until stopEvent is set (or forever), then let the files being processed finish
+        stopEvent = stopEvent or asyncio.Event()
+        semaphore = asyncio.Semaphore(self.jobs)
+        tasks = set()
+        with ProcessPoolExecutor(max_workers=self.jobs) as executor:
+            while not stopEvent.is_set():
+                for path, modality, signature in self.scan():
+                    self.activeFiles.add(path)
+                    task = asyncio.create_task(self.processFile(executor, semaphore, path, modality, signature))
+                    tasks.add(task)
+                    task.add_done_callback(tasks.discard)
+                try:
+                    await asyncio.wait_for(stopEvent.wait(), self.pollInterval)
+                except asyncio.TimeoutError:
+                    pass
+            if tasks:
+                await asyncio.gather(*tasks)
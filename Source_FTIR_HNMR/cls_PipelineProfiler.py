@@ -0,0 +1,187 @@
+import functools
+import json
+import os
+import threading
+import time
+import tracemalloc
+
+class StageRecord:
+    # Timing of one run of a pipeline stage; items is set by the stage itself (samples, peaks, rows, ...)
+    __slots__ = ("name", "startWall", "wallSeconds", "cpuSeconds", "peakBytes", "items", "threadId",
+                 "startCPU", "startTraced", "maxTraced", "overlapped")
+
+    def __init__(self, name, items=None):
+        self.name = name
+        self.items = items
+        self.threadId = threading.get_ident()
+        self.wallSeconds = self.cpuSeconds = self.peakBytes = None
+        self.maxTraced = 0
+        self.overlapped = False
+
+    def asDict(self):
+        return {"stage": self.name, "start": self.startWall, "wallSeconds": self.wallSeconds,
+                "cpuSeconds": self.cpuSeconds, "peakBytes": self.peakBytes, "items": self.items,
+                "thread": self.threadId}
+
+class NullStage:
+    # Returned by PipelineProfiler.stage while profiling is disabled, so that a disabled hook costs one method call
+    __slots__ = ()
+    items = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, excType, excValue, traceback):
+        return False
+
+    def __setattr__(self, name, value):
+        pass
+
+NULL_STAGE = NullStage()
+
+class PipelineProfiler:
+    # Opt-in timing of the pipeline stages. Code wraps each stage in "with pipelineProfiler.stage(name) as record:"
+    # ... (or decorates it with @pipelineProfiler.profiled(name)); while enabled, the wall time, CPU time, peak
+    # ... traced allocation and item count of every run are recorded and can be exported as JSON or a Chrome trace.
+    # ... The CPU time is that of the thread running the stage, so that concurrent stages do not count each other's
+    # ... work; work the stage hands to worker processes or to NumPy's own threads is not included.
+    # ... tracemalloc only keeps one peak for the whole process, so a stage's peak allocation is only measured while no
+    # ... other thread is inside a stage; stages that overlap a stage of another thread (the FTIR and 1H-NMR branches
+    # ... of AnalysisPipeline) record their peak as unavailable (None). Run one branch at a time for memory figures.
+    def __init__(self):
+        self.enabled = False
+        self.traceMemory = False
+        self.records = []
+        self.openRecords = []  # the stages being run, in all threads
+        self.lock = threading.Lock()
+        self.threadState = threading.local()
+        self.originWall = time.perf_counter()
+
+    def enable(self, traceMemory=True):
+        self.traceMemory = traceMemory
+        if traceMemory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+        if self.traceMemory and tracemalloc.is_tracing():
+            tracemalloc.stop()
+        self.traceMemory = False
+
+    def reset(self):
+        with self.lock:
+            self.records = []
+        self.originWall = time.perf_counter()
+
+    def stage(self, name, items=None):
+        if not self.enabled:
+            return NULL_STAGE
+        return ProfiledStage(self, StageRecord(name, items))
+
+    def profiled(self, name=None, items=None):
+        # items, if given, is called with the arguments of the decorated function to count the items it processes
+        def decorator(function):
+            stageName = name or function.__qualname__
+
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return function(*args, **kwargs)
+                with self.stage(stageName, PipelineProfiler.countItems(items, args, kwargs)):
+                    return function(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @staticmethod
+    def countItems(items, args, kwargs):
+        # An item counter that does not accept the arguments of a call (or fails on them) leaves the count unknown,
+        # ... so that profiling never changes whether the stage itself runs
+        if items is None:
+            return None
+        try:
+            return items(*args, **kwargs)
+        except Exception:
+            return None
+
+    def stageStack(self):
+        if not hasattr(self.threadState, "stack"):
+            self.threadState.stack = []
+        return self.threadState.stack
+
+    def summary(self):
+        # Total wall time, CPU time, calls, items and largest peak allocation per stage name
+        stageTotals = {}
+        for record in self.records:
+            totals = stageTotals.setdefault(record.name, {"calls": 0, "wallSeconds": 0.0, "cpuSeconds": 0.0,
+                                                          "items": 0, "peakBytes": None})
+            totals["calls"] += 1
+            totals["wallSeconds"] += record.wallSeconds
+            totals["cpuSeconds"] += record.cpuSeconds
+            totals["items"] += record.items or 0
+            if record.peakBytes is not None:
+                totals["peakBytes"] = max(totals["peakBytes"] or 0, record.peakBytes)
+        return stageTotals
+
+    def exportJSON(self, outputFile):
+        with open(outputFile, 'w', encoding='UTF-8') as file:
+            json.dump({"records": [record.asDict() for record in self.records], "summary": self.summary()}, file,
+                      indent=2)
+
+    def exportChromeTrace(self, outputFile):
+        # Complete ("X") events in microseconds, viewable in chrome://tracing or Perfetto
+        traceEvents = [{"name": record.name, "cat": "pipeline", "ph": "X", "pid": os.getpid(),
+                        "tid": record.threadId, "ts": record.startWall * 1e6, "dur": record.wallSeconds * 1e6,
+                        "args": {"cpuSeconds": record.cpuSeconds, "peakBytes": record.peakBytes,
+                                 "items": record.items}}
+                       for record in self.records]
+        with open(outputFile, 'w', encoding='UTF-8') as file:
+            json.dump({"traceEvents": traceEvents, "displayTimeUnit": "ms"}, file)
+
+class ProfiledStage:
+    def __init__(self, profiler, record):
+        self.profiler = profiler
+        self.record = record
+
+    def __enter__(self):
+        record = self.record
+        self.profiler.stageStack().append(record)
+        with self.profiler.lock:
+            openRecords = self.profiler.openRecords
+            if any(openRecord.threadId != record.threadId for openRecord in openRecords):
+                # Another thread is inside a stage: the traced peak now mixes both threads' allocations
+                record.overlapped = True
+                for openRecord in openRecords:
+                    openRecord.overlapped = True
+            openRecords.append(record)
+            if self.profiler.traceMemory and tracemalloc.is_tracing():
+                record.startTraced = tracemalloc.get_traced_memory()[0]
+                if not record.overlapped:
+                    tracemalloc.reset_peak()
+            else:
+                record.startTraced = None
+        record.startWall = time.perf_counter() - self.profiler.originWall
+        record.startCPU = time.thread_time()
+        return record
+
+    def __exit__(self, excType, excValue, traceback):
+        record = self.record
+        record.wallSeconds = time.perf_counter() - self.profiler.originWall - record.startWall
+        record.cpuSeconds = time.thread_time() - record.startCPU
+        stageStack = self.profiler.stageStack()
+        stageStack.pop()
+        with self.profiler.lock:
+            self.profiler.openRecords.remove(record)
+            if record.startTraced is not None and not record.overlapped and tracemalloc.is_tracing():
+                # Nested stages reset the traced peak, so each stage passes the highest peak it saw up to its parent
+                tracedPeak = max(record.maxTraced, tracemalloc.get_traced_memory()[1])
+                record.peakBytes = max(tracedPeak - record.startTraced, 0)
+                if stageStack:
+                    stageStack[-1].maxTraced = max(stageStack[-1].maxTraced, tracedPeak)
+            self.profiler.records.append(record)
+        return False
+
+# Shared profiler used by the pipeline classes; set FTIR_HNMR_PROFILE=1 to enable it when the package is imported
+pipelineProfiler = PipelineProfiler()
+if os.environ.get("FTIR_HNMR_PROFILE", "") not in ("", "0"):
+    pipelineProfiler.enable(traceMemory=os.environ.get("FTIR_HNMR_PROFILE") != "time")
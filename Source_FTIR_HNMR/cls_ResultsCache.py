@@ -0,0 +1,187 @@
+import hashlib
+import json
+import os
+import threading
+import zipfile
+from collections import OrderedDict
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.rootDir import path_ResultsCache
+
+class ResultsCache:
+    # Stores derived results under keys that hash the data they were computed from, the parameters of the computation
+    # ... and the source of the modules that computed them, so unchanged work is never repeated while any change of
+    # ... data, parameters or code misses the cache. Entries are .npz files (no pickles); the directory is kept under
+    # ... maxBytes by deleting the least recently used entries. Entries read or written by this process are also kept
+    # ... in memory (up to maxMemoBytes), so repeated lookups do not touch the disk.
+    # ... FTIR peak positions are kept in one small entry per (spectrum content digest, set of scan windows), written
+    # ... once and never merged, so a lookup or a store costs the same however many spectra were seen before, and
+    # ... concurrent writers cannot lose each other's entries. The disk is only used for batches of several spectra
+    # ... unless diskForSingleSpectra is set: one spectrum is cheaper to reduce again than to look up on disk.
+    resultsVersion = 2
+    codeModules = ("cls_FTIR_PeakBatch.py", "cls_FTIR_CorrelationAnalysis.py", "pearsonKernel.py")
+
+    def __init__(self, cacheDir=path_ResultsCache, maxBytes=64 * 1024 ** 2, maxMemoBytes=16 * 1024 ** 2,
+                 diskForSingleSpectra=False):
+        self.cacheDir = cacheDir
+        self.maxBytes = maxBytes
+        self.maxMemoBytes = maxMemoBytes
+        self.diskForSingleSpectra = diskForSingleSpectra
+        self.codeVersion = ResultsCache.hashCode()
+        self.cachedBytes = None
+        self.memo = OrderedDict()  # entry path -> entry arrays, least recently used first
+        self.memoBytes = 0
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def hashCode():
+        codeHash = hashlib.sha1(str(ResultsCache.resultsVersion).encode("UTF-8"))
+        for moduleName in ResultsCache.codeModules:
+            codeHash.update((Path(__file__).parent / moduleName).read_bytes())
+        return codeHash.hexdigest()
+
+    def entryKey(self, kind, *keyParts):
+        # Arrays are hashed by dtype, shape and raw bytes; everything else by its JSON form
+        keyHash = hashlib.sha1(f"{kind}:{self.codeVersion}".encode("UTF-8"))
+        for keyPart in keyParts:
+            if isinstance(keyPart, np.ndarray):
+                keyPart = np.ascontiguousarray(keyPart)
+                keyHash.update(json.dumps([keyPart.dtype.str, keyPart.shape]).encode("UTF-8"))
+                keyHash.update(keyPart.data)
+            else:
+                keyHash.update(json.dumps(keyPart, default=str).encode("UTF-8"))
+        return keyHash.hexdigest()
+
+    def entryPath(self, kind, entryKey):
+        return self.cacheDir / f"{kind}-{entryKey}.npz"
+
+    def remember(self, entryPath, entryArrays):
+        entryBytes = sum(entryArray.nbytes for entryArray in entryArrays.values())
+        with self.lock:
+            previousArrays = self.memo.pop(entryPath, None)
+            if previousArrays is not None:
+                self.memoBytes -= sum(entryArray.nbytes for entryArray in previousArrays.values())
+            if entryBytes > self.maxMemoBytes:
+                return
+            self.memo[entryPath] = entryArrays
+            self.memoBytes += entryBytes
+            while self.memoBytes > self.maxMemoBytes:
+                _, evictedArrays = self.memo.popitem(last=False)
+                self.memoBytes -= sum(entryArray.nbytes for entryArray in evictedArrays.values())
+
+    def read(self, entryPath, useDisk=True):
+        # A copy of the dictionary is returned, so callers may take arrays out of it
+        with self.lock:
+            entryArrays = self.memo.get(entryPath)
+            if entryArrays is not None:
+                self.memo.move_to_end(entryPath)
+                return dict(entryArrays)
+        if not useDisk:
+            return None
+        try:
+            with np.load(entryPath, allow_pickle=False) as entry:
+                entryArrays = {name: entry[name] for name in entry.files}
+            os.utime(entryPath)  # mark the entry as recently used
+        except (OSError, ValueError, zipfile.BadZipFile):
+            return None
+        self.remember(entryPath, entryArrays)
+        return dict(entryArrays)
+
+    def write(self, entryPath, entryArrays, useDisk=True):
+        # The cache only saves time, so a directory that cannot be written simply leaves the result uncached
+        self.remember(entryPath, entryArrays)
+        if not useDisk:
+            return
+        try:
+            self.cacheDir.mkdir(parents=True, exist_ok=True)
+            temporaryPath = entryPath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporaryPath, 'wb') as file:
+                np.savez(file, **entryArrays)
+            newBytes = temporaryPath.stat().st_size
+            replacedBytes = entryPath.stat().st_size if entryPath.exists() else 0
+            os.replace(temporaryPath, entryPath)
+        except OSError:
+            return
+        with self.lock:
+            if self.cachedBytes is None:
+                self.cachedBytes = sum(cachePath.stat().st_size for cachePath in self.cacheDir.glob("*.npz"))
+            else:
+                self.cachedBytes += newBytes - replacedBytes
+            if self.cachedBytes > self.maxBytes:
+                self.evict(keepPath=entryPath)
+
+    def evict(self, keepPath=None):
+        # Delete the least recently used entries until the cache fits in maxBytes again
+        entryFiles = []
+        for cachePath in self.cacheDir.glob("*.npz"):
+            try:
+                cacheStat = cachePath.stat()
+            except OSError:
+                continue
+            entryFiles.append((cacheStat.st_mtime_ns, cacheStat.st_size, cachePath))
+        entryFiles.sort()
+        self.cachedBytes = sum(entrySize for _, entrySize, _ in entryFiles)
+        for _, entrySize, cachePath in entryFiles:
+            if self.cachedBytes <= self.maxBytes:
+                break
+            if cachePath == keepPath:
+                continue
+            try:
+                cachePath.unlink()
+            except OSError:
+                continue
+            self.cachedBytes -= entrySize
+
+    def peakEntryPaths(self, spectrumDigests, peakScanRange_High, peakScanRange_Low):
+        windowsKey = self.entryKey("peaks", [[float(low), float(high)]
+                                             for high, low in zip(peakScanRange_High, peakScanRange_Low)])
+        return [self.entryPath("peaks", hashlib.sha1(windowsKey.encode("UTF-8") + bytes(spectrumDigest)).hexdigest())
+                for spectrumDigest in spectrumDigests]
+
+    def getPeakPositions(self, spectrumDigests, peakScanRange_High, peakScanRange_Low):
+        # Cached peak positions as a (samples x peaks) array, with -1 for the spectra never seen with these windows
+        spectrumDigests = np.asarray(spectrumDigests, dtype="S40")
+        useDisk = self.diskForSingleSpectra or spectrumDigests.shape[0] > 1
+        peakPositions = np.full((spectrumDigests.shape[0], len(peakScanRange_High)), -1, dtype=np.intp)
+        for sampleIndex, entryPath in enumerate(self.peakEntryPaths(spectrumDigests, peakScanRange_High,
+                                                                    peakScanRange_Low)):
+            peakEntry = self.read(entryPath, useDisk)
+            if peakEntry is not None and peakEntry["peakPositions"].shape[0] == peakPositions.shape[1]:
+                peakPositions[sampleIndex] = peakEntry["peakPositions"]
+        return peakPositions
+
+    def putPeakPositions(self, spectrumDigests, peakScanRange_High, peakScanRange_Low, peakPositions):
+        # One new entry per spectrum, for all the windows together
+        spectrumDigests = np.asarray(spectrumDigests, dtype="S40")
+        useDisk = self.diskForSingleSpectra or spectrumDigests.shape[0] > 1
+        peakPositions = np.asarray(peakPositions, dtype=np.int64)
+        for sampleIndex, entryPath in enumerate(self.peakEntryPaths(spectrumDigests, peakScanRange_High,
+                                                                    peakScanRange_Low)):
+            self.write(entryPath, {"peakPositions": peakPositions[sampleIndex].copy()}, useDisk)
+
+    def getDataFrame(self, kind, entryKey):
+        entryArrays = self.read(self.entryPath(kind, entryKey))
+        if entryArrays is None:
+            return None
+        columnNames = entryArrays.pop("columnNames")
+        return pd.DataFrame({columnName: entryArrays[f"column{columnIndex}"]
+                             for columnIndex, columnName in enumerate(columnNames)})
+
+    def putDataFrame(self, kind, entryKey, DFResult):
+        # Columns are stored positionally, so that any column name can be kept; text columns are saved as unicode
+        entryArrays = {"columnNames": np.array(DFResult.columns, dtype=str)}
+        for columnIndex, columnName in enumerate(DFResult.columns):
+            columnArray = DFResult[columnName].to_numpy()
+            entryArrays[f"column{columnIndex}"] = columnArray.astype(str) if columnArray.dtype == object else columnArray
+        self.write(self.entryPath(kind, entryKey), entryArrays)
+
+    def clear(self):
+        with self.lock:
+            self.memo.clear()
+            self.memoBytes = 0
+            if self.cacheDir.exists():
+                for cachePath in self.cacheDir.iterdir():
+                    if cachePath.suffix in (".npz", ".tmp"):
+                        cachePath.unlink()
+            self.cachedBytes = None
@@ -0,0 +1,154 @@
+import os
+import threading
+from datetime import datetime, timezone
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.rootDir import path_ResultsStore
+
+class ResultsStore:
+    # Append-only history of correlation results in long format: one row per (sample, peak) observation and one row
+    # ... per peak of correlation statistics, so that new samples add rows instead of columns. Every run appended to
+    # ... the store is written once as a segment of two .npz files (observations, peakStatistics) and never rewritten;
+    # ... each column is stored as its own array, and text columns as integer codes into a table of their distinct
+    # ... values. A catalog CSV, appended one line per run, lists the runs by modality, so that queries only open the
+    # ... segments (and columns) they need. Loaded tables are indexed by run, sample and peak.
+    tableNames = ("observations", "peakStatistics")
+    tableIndices = {"observations": ["Run", "Sample Name (Short)", "Peak Number"],
+                    "peakStatistics": ["Run", "Peak Number"]}
+    DFCatalog_Columns = ["Run", "Modality", "Created (UTC)", "Samples", "Peaks", "Label"]
+
+    def __init__(self, storeDir=path_ResultsStore):
+        self.storeDir = storeDir
+        self.catalogFile = storeDir / "catalog.csv"
+        self.lock = threading.Lock()
+
+    def segmentPath(self, runNumber, tableName):
+        return self.storeDir / f"run_{runNumber:06d}_{tableName}.npz"
+
+    def claimRunNumber(self):
+        # The marker file is created exclusively, so concurrent writers (threads or processes) get different runs
+        self.storeDir.mkdir(parents=True, exist_ok=True)
+        runNumbers = [int(markerPath.stem.split("_")[1]) for markerPath in self.storeDir.glob("run_*.claim")]
+        runNumber = max(runNumbers, default=0) + 1
+        while True:
+            try:
+                os.close(os.open(self.storeDir / f"run_{runNumber:06d}.claim", os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                return runNumber
+            except FileExistsError:
+                runNumber += 1
+
+    @staticmethod
+    def encodeTable(DFTable):
+        # Numeric and boolean columns are stored as they are, other columns as codes into their distinct values
+        tableArrays = {"columnNames": np.array(DFTable.columns, dtype=str)}
+        for columnIndex, columnName in enumerate(DFTable.columns):
+            column = DFTable[columnName]
+            if pd.api.types.is_numeric_dtype(column) or pd.api.types.is_bool_dtype(column):
+                tableArrays[f"column_{columnIndex}"] = column.to_numpy()
+            else:
+                codes, values = pd.factorize(column.astype(str), sort=True)
+                tableArrays[f"codes_{columnIndex}"] = codes.astype(np.int32)
+                tableArrays[f"values_{columnIndex}"] = np.asarray(values, dtype=str)
+        return tableArrays
+
+    @staticmethod
+    def decodeTable(segment, columns=None, rowFilters=None):
+        # Only the requested columns are read from the segment; rowFilters maps column names to the accepted values
+        columnNames = list(segment["columnNames"])
+        columnIndices = {columnName: columnIndex for columnIndex, columnName in enumerate(columnNames)}
+
+        def readColumn(columnName, rows=None):
+            columnIndex = columnIndices[columnName]
+            if f"column_{columnIndex}" in segment.files:
+                column = segment[f"column_{columnIndex}"]
+                return column if rows is None else column[rows]
+            codes = segment[f"codes_{columnIndex}"]
+            values = segment[f"values_{columnIndex}"]
+            return values[codes if rows is None else codes[rows]]
+
+        def matchColumn(columnName, acceptedValues):
+            # Text columns are matched on their codes, without decoding the column
+            columnIndex = columnIndices[columnName]
+            if f"column_{columnIndex}" in segment.files:
+                return np.isin(segment[f"column_{columnIndex}"], acceptedValues)
+            acceptedCodes = np.flatnonzero(np.isin(segment[f"values_{columnIndex}"], acceptedValues))
+            return np.isin(segment[f"codes_{columnIndex}"], acceptedCodes)
+
+        rows = None
+        for columnName, acceptedValues in (rowFilters or {}).items():
+            if columnName not in columnIndices:
+                return None
+            isAccepted = matchColumn(columnName, list(acceptedValues))
+            rows = isAccepted if rows is None else rows & isAccepted
+        return pd.DataFrame({columnName: readColumn(columnName, rows)
+                             for columnName in (columns or columnNames) if columnName in columnIndices})
+
+    def append(self, modality, DFObservations, DFPeakStatistics, label=""):
+        # Write a new run and return its number; the catalog line is added last, once the segment is complete
+        runNumber = self.claimRunNumber()
+        for tableName, DFTable in zip(ResultsStore.tableNames, (DFObservations, DFPeakStatistics)):
+            DFTable = DFTable.copy()
+            DFTable.insert(0, "Run", np.int32(runNumber))
+            DFTable.insert(1, "Modality", modality)
+            segmentPath = self.segmentPath(runNumber, tableName)
+            temporaryPath = segmentPath.with_suffix(".tmp")
+            with open(temporaryPath, 'wb') as file:
+                np.savez_compressed(file, **ResultsStore.encodeTable(DFTable))
+            os.replace(temporaryPath, segmentPath)
+
+        catalogRow = pd.DataFrame([[runNumber, modality, datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                                    DFObservations["Sample Name (Short)"].nunique(), DFPeakStatistics.shape[0], label]],
+                                  columns=ResultsStore.DFCatalog_Columns)
+        with self.lock:
+            writeHeader = not self.catalogFile.exists()
+            with open(self.catalogFile, 'a', encoding='UTF-8', newline="") as file:
+                catalogRow.to_csv(file, header=writeHeader, index=False)
+        return runNumber
+
+    def readCatalog(self):
+        if not self.catalogFile.exists():
+            return pd.DataFrame(columns=ResultsStore.DFCatalog_Columns)
+        return pd.read_csv(self.catalogFile, dtype={"Label": str}, keep_default_na=False)
+
+    def runs(self, modality=None):
+        DFCatalog = self.readCatalog()
+        if modality is not None:
+            DFCatalog = DFCatalog.loc[DFCatalog["Modality"] == modality]
+        return DFCatalog["Run"].tolist()
+
+    def latestRun(self, modality=None):
+        runNumbers = self.runs(modality)
+        return runNumbers[-1] if runNumbers else None
+
+    def load(self, tableName="observations", modality=None, runs=None, samples=None, peaks=None, columns=None,
+             indexed=True):
+        # Rows of one table across the selected runs (all runs of the modality by default), optionally only of some
+        # ... samples and peak numbers and with only some columns
+        if tableName not in ResultsStore.tableNames:
+            raise ValueError(f"Unknown table: {tableName}")
+        selectedRuns = self.runs(modality)
+        if runs is not None:
+            runs = set(runs)
+            selectedRuns = [runNumber for runNumber in selectedRuns if runNumber in runs]
+        rowFilters = {}
+        if samples is not None and tableName == "observations":
+            rowFilters["Sample Name (Short)"] = samples
+        if peaks is not None:
+            rowFilters["Peak Number"] = peaks
+        if columns is not None:
+            columns = list(dict.fromkeys(ResultsStore.tableIndices[tableName] + list(columns)))
+
+        listDFTables = []
+        for runNumber in selectedRuns:
+            with np.load(self.segmentPath(runNumber, tableName), allow_pickle=False) as segment:
+                DFTable = ResultsStore.decodeTable(segment, columns, rowFilters)
+            if DFTable is not None and DFTable.shape[0] > 0:
+                listDFTables.append(DFTable)
+        if not listDFTables:
+            return pd.DataFrame(columns=columns or ResultsStore.tableIndices[tableName])
+        DFResults = pd.concat(listDFTables, ignore_index=True)
+        if indexed:
+            tableIndex = [columnName for columnName in ResultsStore.tableIndices[tableName]
+                          if columnName in DFResults.columns]
+            DFResults = DFResults.set_index(tableIndex).sort_index()
+        return DFResults
@@ -0,0 +1,94 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_HNMR_Output import HNMR_Output
+from Source_FTIR_HNMR.rootDir import path_InstrumentOutputs, path_SampleManifest
+
+def loadSample(loaderClass, sampleKwargs):
+    # Runs in a worker process: construct the sample object without registering it, and read its data once so that
+    # ... the parent process can reopen it cheaply
+    return loaderClass(registerSample=False, **sampleKwargs).preload()
+
+class SampleManifest:
+    # Discovers every instrument output file under the instrument directory and attaches per-sample metadata from
+    # ... the sidecar manifest CSV. Files missing from the manifest are still listed, named after the file itself.
+    filePatterns = {"FTIR": "FTIR_*.csv", "1H-NMR": "RawText_1H-NMR_*.txt"}
+    loaderClasses = {"FTIR": FTIR_Output, "1H-NMR": HNMR_Output}
+    loaderFileArguments = {"FTIR": "CSV_FTIRFile", "1H-NMR": "TXT_HNMRFile"}
+    DFManifest_Columns = ["File", "Modality", "Sample Name (Full)", "Sample Name (Short)", "Sample Medium",
+                          "Plot Color", "Canola Mass Fraction"]
+
+    def __init__(self, instrumentDir=path_InstrumentOutputs, manifestFile=path_SampleManifest):
+        self.instrumentDir = instrumentDir
+        self.manifestFile = manifestFile
+        self.DFManifest = self.discover()
+
+    def readManifest(self):
+        if self.manifestFile is None or not self.manifestFile.exists():
+            return pd.DataFrame(columns=SampleManifest.DFManifest_Columns)
+        DFSidecar = pd.read_csv(self.manifestFile, dtype={"Plot Color": str})
+        DFSidecar["File"] = [str(file).replace("\\", "/") for file in DFSidecar["File"]]
+        return DFSidecar.drop_duplicates("File", keep="last")
+
+    def sidecarRows(self):
+        # Sidecar rows by file, without their empty cells, so that those fall back to the defaults of manifestRow
+        return {row["File"]: {columnName: value for columnName, value in row.items() if not pd.isna(value)}
+                for row in self.readManifest().to_dict("records")}
+
+    def discover(self):
+        sidecarRows = self.sidecarRows()
+        DFManifest_List = []
+        for modality, filePattern in SampleManifest.filePatterns.items():
+            for path in sorted(self.instrumentDir.rglob(filePattern)):
+                DFManifest_List.append(self.manifestRow(path, modality, sidecarRows))
+        return pd.DataFrame(DFManifest_List, columns=SampleManifest.DFManifest_Columns)
+
+    def manifestRow(self, path, modality, sidecarRows):
+        relativeFile = path.relative_to(self.instrumentDir).as_posix()
+        sidecarRow = sidecarRows.get(relativeFile, {})
+        return [relativeFile,
+                sidecarRow.get("Modality", modality),
+                sidecarRow.get("Sample Name (Full)", path.stem),
+                sidecarRow.get("Sample Name (Short)", path.stem),
+                sidecarRow.get("Sample Medium", ""),
+                sidecarRow.get("Plot Color", "#5284bd"),
+                sidecarRow.get("Canola Mass Fraction", math.nan)]
+
+    def samples(self, modality):
+        return self.DFManifest.loc[self.DFManifest["Modality"] == modality]
+
+    def sampleKwargs(self, modality):
+        # Keyword arguments for the loader class of the modality, one dictionary per sample
+        return [self.rowKwargs(row, modality) for row in self.samples(modality).to_dict("records")]
+
+    def fileKwargs(self, path, modality):
+        # Keyword arguments for a single file, with the sidecar manifest read again in case it was just updated
+        sidecarRows = self.sidecarRows()
+        return self.rowKwargs(dict(zip(SampleManifest.DFManifest_Columns,
+                                       self.manifestRow(path, modality, sidecarRows))), modality)
+
+    def rowKwargs(self, row, modality):
+        return {SampleManifest.loaderFileArguments[modality]: self.instrumentDir / row["File"],
+                "sampleName_Full": row["Sample Name (Full)"],
+                "sampleName_Short": row["Sample Name (Short)"],
+                "sampleMedium": row["Sample Medium"],
+                "plotColor": row["Plot Color"],
+                "fraction_CanolaOil": float(row["Canola Mass Fraction"])}
+
+    def ingest(self, modality, jobs=None, session=None):
+        # Construct the sample objects of one modality in a process pool, then register them in this process, with
+        # ... the given analysis session if any (otherwise with the class of the modality)
+        loaderClass = SampleManifest.loaderClasses[modality]
+        listSampleKwargs = self.sampleKwargs(modality)
+        jobs = jobs or os.cpu_count() or 1
+        if jobs == 1 or len(listSampleKwargs) <= 1:
+            sampleObjs = [loadSample(loaderClass, sampleKwargs) for sampleKwargs in listSampleKwargs]
+        else:
+            with ProcessPoolExecutor(max_workers=jobs) as executor:
+                sampleObjs = list(executor.map(loadSample, [loaderClass] * len(listSampleKwargs), listSampleKwargs,
+                                               chunksize=max(1, len(listSampleKwargs) // (4 * jobs))))
+        for sampleObj in sampleObjs:
+            (session if session is not None else loaderClass).addSample(sampleObj)
+        return sampleObjs
@@ -0,0 +1,90 @@
+import threading
+from collections import OrderedDict
+
+class SampleRegistry:
+    # A list of sample objects whose metadata is kept for the life of the registry, while their spectral data is
+    # ... loaded on demand and released least-recently-used first once the loaded data exceeds memoryBudget (bytes).
+    # ... Sample objects report loads and accesses through touch() and are told to drop their data via unloadData().
+    # ... Only the data of samples in the registry is tracked; touches from other samples are ignored, so that objects
+    # ... built without registering (references, worker copies) neither use the budget nor are kept alive by it.
+    def __init__(self, samples=(), memoryBudget=256 * 1024 ** 2):
+        self.samples = list(samples)
+        self.memberCounts = {}  # sample -> number of times it is in the list, for constant-time membership
+        for sampleObj in self.samples:
+            self.memberCounts[sampleObj] = self.memberCounts.get(sampleObj, 0) + 1
+        self.memoryBudget = memoryBudget
+        self.loadedSamples = OrderedDict()
+        self.loadedBytes = 0
+        self.lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __iter__(self):
+        return iter(self.samples)
+
+    def __getitem__(self, index):
+        return self.samples[index]
+
+    def __contains__(self, sampleObj):
+        return sampleObj in self.memberCounts
+
+    def append(self, sampleObj):
+        with self.lock:
+            self.samples.append(sampleObj)
+            self.memberCounts[sampleObj] = self.memberCounts.get(sampleObj, 0) + 1
+
+    def remove(self, sampleObj):
+        with self.lock:
+            self.samples.remove(sampleObj)
+            self.memberCounts[sampleObj] -= 1
+            if self.memberCounts[sampleObj] == 0:
+                del self.memberCounts[sampleObj]
+                self.release(sampleObj)
+
+    def index(self, sampleObj):
+        return self.samples.index(sampleObj)
+
+    def sort(self, key=None, reverse=False):
+        self.samples.sort(key=key, reverse=reverse)
+
+    def copy(self):
+        return list(self.samples)
+
+    def clear(self):
+        with self.lock:
+            for sampleObj in list(self.loadedSamples):
+                self.release(sampleObj)
+            self.samples.clear()
+            self.memberCounts.clear()
+
+    def touch(self, sampleObj, dataBytes):
+        # Record that the data of a sample was just loaded or used, then evict the least recently used data
+        with self.lock:
+            if sampleObj not in self.memberCounts:
+                return
+            if sampleObj in self.loadedSamples:
+                self.loadedSamples.move_to_end(sampleObj)
+                return
+            self.loadedSamples[sampleObj] = dataBytes
+            self.loadedBytes += dataBytes
+            self.evict(keepSample=sampleObj)
+
+    def release(self, sampleObj):
+        with self.lock:
+            dataBytes = self.loadedSamples.pop(sampleObj, None)
+            if dataBytes is not None:
+                self.loadedBytes -= dataBytes
+                sampleObj.unloadData()
+
+    def evict(self, keepSample=None):
+        with self.lock:
+            while self.loadedBytes > self.memoryBudget and len(self.loadedSamples) > 1:
+                oldestSample = next(iter(self.loadedSamples))
+                if oldestSample is keepSample:
+                    break
+                self.release(oldestSample)
+
+    def setMemoryBudget(self, memoryBudget):
+        self.memoryBudget = memoryBudget
+        self.evict()
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.rootDir import path_SpectrumCache
+
+class SpectrumCache:
+    # Converts instrument CSV files once into one binary .npy file per column, which are then opened as read-only
+    # ... memory maps on later loads. Entries are keyed by the source path and the requested columns, and are
+    # ... rebuilt automatically when the size or modification time of the source file changes. The metadata of an
+    # ... entry also records a content digest of its columns, which keys derived results in the ResultsCache.
+    cacheVersion = 2
+
+    def __init__(self, cacheDir=path_SpectrumCache, dtype=np.float64):
+        self.cacheDir = cacheDir
+        self.dtype = np.dtype(dtype)
+
+    def entryKey(self, sourcePath, columns):
+        keySource = json.dumps([str(os.path.abspath(sourcePath)), list(columns), self.dtype.str])
+        return hashlib.sha1(keySource.encode("UTF-8")).hexdigest()
+
+    def entryPaths(self, sourcePath, columns):
+        entryKey = self.entryKey(sourcePath, columns)
+        metaPath = self.cacheDir / f"{entryKey}.json"
+        columnPaths = [self.cacheDir / f"{entryKey}.{columnIndex}.npy" for columnIndex in range(len(columns))]
+        return metaPath, columnPaths
+
+    def sourceSignature(self, sourcePath):
+        sourceStat = os.stat(sourcePath)
+        return {"version": SpectrumCache.cacheVersion, "size": sourceStat.st_size, "mtime_ns": sourceStat.st_mtime_ns}
+
+    def isFresh(self, sourcePath, columns):
+        metaPath, columnPaths = self.entryPaths(sourcePath, columns)
+        if not metaPath.exists() or not all(columnPath.exists() for columnPath in columnPaths):
+            return False
+        try:
+            with open(metaPath, 'r', encoding='UTF-8') as file:
+                entryMeta = json.load(file)
+        except ValueError:
+            return False
+        signature = self.sourceSignature(sourcePath)
+        return {name: entryMeta.get(name) for name in signature} == signature and "digest" in entryMeta
+
+    @staticmethod
+    def contentDigest(columnArrays):
+        contentHash = hashlib.sha1()
+        for columnArray in columnArrays:
+            contentHash.update(np.ascontiguousarray(columnArray, dtype=np.float64).data)
+        return contentHash.hexdigest()
+
+    @pipelineProfiler.profiled("Spectrum cache build")
+    def build(self, sourcePath, columns):
+        # Parse the CSV file once, then write every column to its own .npy file; the metadata file is written last
+        # ... so that an interrupted build is never mistaken for a fresh entry
+        metaPath, columnPaths = self.entryPaths(sourcePath, columns)
+        signature = self.sourceSignature(sourcePath)
+        DFSource = pd.read_csv(sourcePath, usecols=list(columns))
+        columnArrays = [DFSource[column].to_numpy(dtype=self.dtype) for column in columns]
+        signature["digest"] = SpectrumCache.contentDigest(columnArrays)
+        self.cacheDir.mkdir(parents=True, exist_ok=True)
+        if metaPath.exists():
+            metaPath.unlink()
+        for columnArray, columnPath in zip(columnArrays, columnPaths):
+            temporaryPath = columnPath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temporaryPath, 'wb') as file:
+                np.save(file, columnArray)
+            os.replace(temporaryPath, columnPath)
+        temporaryPath = metaPath.with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(temporaryPath, 'w', encoding='UTF-8') as file:
+            json.dump(signature, file)
+        os.replace(temporaryPath, metaPath)
+
+    def load(self, sourcePath, columns):
+        # Returns a dictionary of read-only memory-mapped arrays, one per requested column
+        if not self.isFresh(sourcePath, columns):
+            self.build(sourcePath, columns)
+        metaPath, columnPaths = self.entryPaths(sourcePath, columns)
+        return {column: np.load(columnPath, mmap_mode='r') for column, columnPath in zip(columns, columnPaths)}
+
+    def digest(self, sourcePath, columns):
+        # Content digest of the cached columns, without reading the columns themselves
+        if not self.isFresh(sourcePath, columns):
+            self.build(sourcePath, columns)
+        metaPath, columnPaths = self.entryPaths(sourcePath, columns)
+        with open(metaPath, 'r', encoding='UTF-8') as file:
+            return json.load(file)["digest"]
+
+    def loadDataFrame(self, sourcePath, columns):
+        # Falls back to parsing the CSV file directly if the cache directory cannot be written
+        try:
+            columnArrays = self.load(sourcePath, columns)
+        except OSError:
+            return pd.read_csv(sourcePath, usecols=list(columns))[list(columns)]
+        return pd.DataFrame(columnArrays, copy=False)
+
+    def clear(self):
+        if self.cacheDir.exists():
+            for cachePath in self.cacheDir.iterdir():
+                if cachePath.suffix in (".npy", ".json", ".tmp"):
+                    cachePath.unlink()
@@ -0,0 +1,56 @@
+import numpy as np
+
+# Vectorized Pearson correlation of one variable (e.g. the mass fraction of canola oil) against many others at once.
+# ... Rows of the response matrix are samples and columns are peaks, so every peak is correlated in one pass.
+
+def pearsonMatrix(xValues, responseMatrix):
+    xValues = np.asarray(xValues, dtype=float)
+    responseMatrix = np.asarray(responseMatrix, dtype=float)
+    if responseMatrix.ndim == 1:
+        responseMatrix = responseMatrix[:, None]
+    numberOfSamples = xValues.shape[0]
+    if responseMatrix.shape[0] != numberOfSamples:
+        raise ValueError("The response matrix must have one row per sample.")
+
+    if np.isnan(responseMatrix).any():
+        return pearsonMatrixMasked(xValues, responseMatrix)
+
+    xCentered = xValues - xValues.mean()
+    responseCentered = responseMatrix - responseMatrix.mean(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        crossProducts = xCentered @ responseCentered
+        normProducts = np.sqrt(xCentered @ xCentered) * np.sqrt(np.einsum("ij,ij->j", responseCentered,
+                                                                          responseCentered))
+        pearsonCoeffs = np.clip(crossProducts / normProducts, -1.0, 1.0)
+    return pearsonCoeffs, pearsonPValues(pearsonCoeffs, numberOfSamples)
+
+def pearsonMatrixMasked(xValues, responseMatrix):
+    # Missing responses (NaN) are left out column by column, so each column is correlated over its own samples
+    isPresent = ~np.isnan(responseMatrix)
+    sampleCounts = isPresent.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        xMasked = np.where(isPresent, xValues[:, None], 0.0)
+        responseMasked = np.where(isPresent, responseMatrix, 0.0)
+        xCentered = np.where(isPresent, xMasked - xMasked.sum(axis=0) / sampleCounts, 0.0)
+        responseCentered = np.where(isPresent, responseMasked - responseMasked.sum(axis=0) / sampleCounts, 0.0)
+        crossProducts = np.einsum("ij,ij->j", xCentered, responseCentered)
+        normProducts = np.sqrt(np.einsum("ij,ij->j", xCentered, xCentered)
+                               * np.einsum("ij,ij->j", responseCentered, responseCentered))
+        pearsonCoeffs = np.clip(crossProducts / normProducts, -1.0, 1.0)
+    return pearsonCoeffs, pearsonPValues(pearsonCoeffs, sampleCounts)
+
+def pearsonPValues(pearsonCoeffs, numberOfSamples):
+    # Two-sided p-values from the t-distribution with (n - 2) degrees of freedom; n may differ per coefficient
+    pearsonCoeffs = np.asarray(pearsonCoeffs, dtype=float)
+    from scipy.special import stdtr  # deferred: scipy.special roughly doubles the package import time
+    degreesFreedom = np.broadcast_to(np.asarray(numberOfSamples, dtype=float) - 2, pearsonCoeffs.shape)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        tStatistic = pearsonCoeffs * np.sqrt(degreesFreedom / ((1.0 - pearsonCoeffs) * (1.0 + pearsonCoeffs)))
+        pValues = 2 * stdtr(degreesFreedom, -np.abs(tStatistic))
+    return np.where(degreesFreedom >= 1, pValues, np.nan)
+
+def trendLabels(pearsonCoeffs, pValues, significanceLevel=0.05):
+    boolSignificance = np.asarray(pValues) < significanceLevel
+    signTrend = np.where(~boolSignificance, "Trend not significant",
+                         np.where(np.asarray(pearsonCoeffs) > 0, "Positive trend (+)", "Negative trend (-)"))
+    return boolSignificance, signTrend.astype(object)
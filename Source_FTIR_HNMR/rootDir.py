@@ -1,5 +1,7 @@
 from pathlib import Path
 ROOT_DIR = Path(__file__).resolve().parent.parent
+path_InstrumentOutputs = ROOT_DIR / "Instrument Output Files"
+path_SampleManifest = path_InstrumentOutputs / "Sample Manifest.csv"
 path_FTIRCanolaOil = ROOT_DIR / "Instrument Output Files" / "FTIR Instrument Outputs" / "FTIR_CanolaOil.csv"
 path_FTIRPalmOil = ROOT_DIR / "Instrument Output Files" / "FTIR Instrument Outputs" / "FTIR_PalmOil.csv"
 path_FTIR2C1PMix = ROOT_DIR / "Instrument Output Files" / "FTIR Instrument Outputs" / "FTIR_2Canola_1Palm_Mixture.csv"
@@ -7,6 +9,11 @@ path_FTIR1C2PMix = ROOT_DIR / "Instrument Output Files" / "FTIR Instrument Outpu
 path_ProgOutput_FTIR = ROOT_DIR / "Program Output Files" / "FTIR Program Outputs"
 path_OutFTIR_CorrelProc = path_ProgOutput_FTIR / "FTIR_AllPeakCorrelations (procedural).csv"
 path_OutFTIR_CorrelOOP = path_ProgOutput_FTIR / "FTIR_AllPeakCorrelations (OOP).csv"
+path_OutFTIR_CorrelSummaryOOP = path_ProgOutput_FTIR / "FTIR_PeakCorrelationSummary (OOP).csv"
+path_OutFTIR_Figures = path_ProgOutput_FTIR / "FTIR Figures"
+path_OutFTIR_CorrelMapOOP = path_ProgOutput_FTIR / "FTIR_CorrelationMap (OOP).npz"
+path_SpectrumCache = ROOT_DIR / ".spectrum_cache"
+path_ResultsCache = ROOT_DIR / ".results_cache"
 
 path_RawText_NMRCanolaOil = ROOT_DIR / "Instrument Output Files" / "1H-NMR Instrument Outputs" / "RawText_1H-NMR_CanolaOil.txt"
 path_RawText_NMRPalmOil = ROOT_DIR / "Instrument Output Files" / "1H-NMR Instrument Outputs" / "RawText_1H-NMR_PalmOil.txt"
@@ -17,5 +24,11 @@ path_NMR2C1PMix = ROOT_DIR / "Instrument Output Files" / "1H-NMR Instrument Outp
 path_ProgOutput_HNMR = ROOT_DIR / "Program Output Files" / "1H-NMR Program Outputs"
 path_OutNMR_CorrelAllProc = path_ProgOutput_HNMR / "1H-NMR_AllPeakCorrelations (procedural).csv"
 path_OutNMR_CorrelSigProc = path_ProgOutput_HNMR / "1H-NMR_SigPeakCorrelations (procedural).csv"
+path_OutNMR_CorrelAllOOP = path_ProgOutput_HNMR / "1H-NMR_AllPeakCorrelations (OOP).csv"
+path_OutNMR_CorrelSigOOP = path_ProgOutput_HNMR / "1H-NMR_SigPeakCorrelations (OOP).csv"
+path_OutNMR_FattyAcidsOOP = path_ProgOutput_HNMR / "1H-NMR_FattyAcidEstimates (OOP).csv"
+
+path_ProgOutput_Benchmarks = ROOT_DIR / "Program Output Files" / "Benchmark Outputs"
+path_ResultsStore = ROOT_DIR / "Program Output Files" / "Results Store"
 
 
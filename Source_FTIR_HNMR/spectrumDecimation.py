@@ -0,0 +1,58 @@
+import numpy as np
+
+# Reduce the number of points of a spectrum before drawing it, while keeping its visible shape. Min/max decimation keeps
+# ... the lowest and highest point of every bucket (so no peak is lost at any bucket width), while largest-triangle-
+# ... three-buckets (LTTB) keeps the point of each bucket that best preserves the area of the trace.
+
+def decimateMinMax(xValues, yValues, numberOfPoints=2000):
+    xValues = np.asarray(xValues)
+    yValues = np.asarray(yValues, dtype=float)
+    totalPoints = yValues.shape[0]
+    if totalPoints <= numberOfPoints:
+        return xValues, yValues
+
+    # Split the trace into equal buckets (the last one padded) and keep each bucket's minimum and maximum in order
+    bucketSize = -(-totalPoints // max(numberOfPoints // 2, 1))
+    numberOfBuckets = -(-totalPoints // bucketSize)
+    paddedY = np.full(numberOfBuckets * bucketSize, np.nan)
+    paddedY[:totalPoints] = yValues
+    bucketY = paddedY.reshape(numberOfBuckets, bucketSize)
+    bucketStarts = np.arange(numberOfBuckets) * bucketSize
+    minIndices = bucketStarts + np.nanargmin(bucketY, axis=1)
+    maxIndices = bucketStarts + np.nanargmax(bucketY, axis=1)
+    keptIndices = np.sort(np.stack([minIndices, maxIndices], axis=1), axis=1).ravel()
+    keptIndices = np.unique(np.concatenate(([0], keptIndices, [totalPoints - 1])))
+    return xValues[keptIndices], yValues[keptIndices]
+
+def decimateLTTB(xValues, yValues, numberOfPoints=2000):
+    xValues = np.asarray(xValues, dtype=float)
+    yValues = np.asarray(yValues, dtype=float)
+    totalPoints = yValues.shape[0]
+    if totalPoints <= numberOfPoints or numberOfPoints < 3:
+        return xValues, yValues
+
+    # The first and last points are always kept; the rest are split into (numberOfPoints - 2) buckets
+    bucketEdges = np.linspace(1, totalPoints - 1, numberOfPoints - 1).astype(np.intp)
+    keptIndices = np.empty(numberOfPoints, dtype=np.intp)
+    keptIndices[0], keptIndices[-1] = 0, totalPoints - 1
+    previousIndex = 0
+    for bucketIndex in range(numberOfPoints - 2):
+        start, end = bucketEdges[bucketIndex], bucketEdges[bucketIndex + 1]
+        nextStart = end
+        nextEnd = bucketEdges[bucketIndex + 2] if bucketIndex + 2 < numberOfPoints - 1 else totalPoints
+        averageX = xValues[nextStart:nextEnd].mean()
+        averageY = yValues[nextStart:nextEnd].mean()
+        triangleAreas = np.abs((xValues[previousIndex] - averageX) * (yValues[start:end] - yValues[previousIndex])
+                               - (xValues[previousIndex] - xValues[start:end]) * (averageY - yValues[previousIndex]))
+        previousIndex = start + int(np.argmax(triangleAreas))
+        keptIndices[bucketIndex + 1] = previousIndex
+    return xValues[keptIndices], yValues[keptIndices]
+
+def decimate(xValues, yValues, method="minmax", numberOfPoints=2000):
+    if method is None:
+        return np.asarray(xValues), np.asarray(yValues)
+    if method == "minmax":
+        return decimateMinMax(xValues, yValues, numberOfPoints)
+    if method == "lttb":
+        return decimateLTTB(xValues, yValues, numberOfPoints)
+    raise ValueError(f"Unknown decimation method: {method}")
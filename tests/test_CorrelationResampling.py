@@ -0,0 +1,68 @@
+import math
+import unittest
+import warnings
+import numpy as np
+import pandas as pd
+from scipy import stats
+from Source_FTIR_HNMR.cls_CorrelationResampling import CorrelationResampling
+
+class TestCorrelationResampling(unittest.TestCase):
+    # Permutation p-values and bootstrap intervals on seeded random data: the same seed gives the same results
+    # ... whatever the number of workers, and a constant peak gets NaN without any warning
+    def setUp(self):
+        randomGenerator = np.random.default_rng(7)
+        self.xValues = randomGenerator.random(30)
+        self.responseMatrix = np.column_stack([self.xValues + 0.3 * randomGenerator.random(30),
+                                               randomGenerator.random(30),
+                                               np.ones(30)])
+
+    def test_determinism(self):
+        firstRun = CorrelationResampling(2000, seed=3).resample(self.xValues, self.responseMatrix)
+        secondRun = CorrelationResampling(2000, seed=3).resample(self.xValues, self.responseMatrix)
+        for first, second in zip(firstRun, secondRun):
+            np.testing.assert_array_equal(first, second)
+        otherSeed = CorrelationResampling(2000, seed=4).resample(self.xValues, self.responseMatrix)
+        self.assertFalse(np.array_equal(firstRun[1][:2], otherSeed[1][:2]))
+
+    def test_workers(self):
+        # A small memory budget splits the resamples into many blocks, spread over two worker processes
+        serialRun = CorrelationResampling(2000, seed=3, jobs=1, memoryBudget=50000).resample(self.xValues,
+                                                                                           self.responseMatrix)
+        parallelRun = CorrelationResampling(2000, seed=3, jobs=2, memoryBudget=50000).resample(self.xValues,
+                                                                                             self.responseMatrix)
+        for serial, parallel in zip(serialRun, parallelRun):
+            np.testing.assert_array_equal(serial, parallel)
+
+    def test_resampledValues(self):
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            pValues, intervalLow, intervalHigh = CorrelationResampling(2000, seed=3).resample(self.xValues,
+                                                                                            self.responseMatrix)
+        # The correlated peak is significant, with its coefficient inside the interval; the constant peak has none
+        observedCoeff = stats.pearsonr(self.xValues, self.responseMatrix[:, 0])[0]
+        self.assertAlmostEqual(pValues[0], 1 / 2001)
+        self.assertTrue(intervalLow[0] <= observedCoeff <= intervalHigh[0])
+        self.assertGreater(pValues[1], 0.01)
+        self.assertTrue(np.isnan([pValues[2], intervalLow[2], intervalHigh[2]]).all())
+
+    def test_exactPermutations(self):
+        # With 5 samples all 120 orderings are enumerated, so the p-value is a multiple of 1 / 5!
+        xValues = np.array([0.0, 0.25, 0.5, 0.75, 1.0])
+        pValues = CorrelationResampling(1000).permutationPValues(xValues, (xValues ** 2)[:, None])
+        self.assertAlmostEqual(pValues[0] * math.factorial(5), round(pValues[0] * math.factorial(5)))
+        self.assertLess(pValues[0], 0.05)
+
+    def test_addColumnsTwice(self):
+        DFPeakCorrelation = pd.DataFrame({"Pearson Coefficient": np.zeros(3), "p-value": np.zeros(3),
+                                          "Trend": ["", "", ""]})
+        correlationResampling = CorrelationResampling(500, seed=3)
+        correlationResampling.addColumns(DFPeakCorrelation, self.xValues, self.responseMatrix)
+        firstTable = DFPeakCorrelation.copy()
+        correlationResampling.addColumns(DFPeakCorrelation, self.xValues, self.responseMatrix)
+        self.assertEqual(list(DFPeakCorrelation.columns),
+                         ["Pearson Coefficient", "p-value", "Permutation p-value", "Bootstrap 95% CI Low",
+                          "Bootstrap 95% CI High", "Trend"])
+        pd.testing.assert_frame_equal(DFPeakCorrelation, firstTable)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+import numpy as np
+from Source_FTIR_HNMR.cls_FTIR_IncrementalCorrelationAnalysis import FTIR_IncrementalCorrelationAnalysis
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_FTIR_PeakTable import FTIR_PeakTable
+
+class TestFTIR_IncrementalCorrelationAnalysis(unittest.TestCase):
+    # Running correlations on seeded random peak tables, checked against np.corrcoef over the samples present
+    def setUp(self):
+        self.randomGenerator = np.random.default_rng(11)
+        self.listFTIR_Outputs = [self.makeSample(sampleIndex) for sampleIndex in range(40)]
+
+    def makePeakTable(self):
+        numberOfPeaks = FTIR_Output.numberOfPeaks
+        return FTIR_PeakTable(self.randomGenerator.uniform(800, 3050, (1, numberOfPeaks)),
+                              self.randomGenerator.uniform(0, 100, (1, numberOfPeaks)),
+                              self.randomGenerator.random((1, numberOfPeaks)), FTIR_Output.peakVibrations)
+
+    def makeSample(self, sampleIndex):
+        FTIRObj = FTIR_Output(None, sampleName_Short=f"S{sampleIndex}", fraction_CanolaOil=self.randomGenerator.random(),
+                              registerSample=False)
+        FTIRObj.setPeakTableRow(self.makePeakTable(), 0)
+        return FTIRObj
+
+    def assertMatchesSamples(self, correlationAnalysis, listFTIR_Outputs):
+        fractions = np.array([FTIRObj.fraction_CanolaOil for FTIRObj in listFTIR_Outputs])
+        relativeHeights = np.array([FTIRObj.peakArrays()[0] for FTIRObj in listFTIR_Outputs])
+        peakWavenumbers = np.array([FTIRObj.peakArrays()[1] for FTIRObj in listFTIR_Outputs])
+        expectedCoeffs = [np.corrcoef(fractions, relativeHeights[:, peakIndex])[0, 1]
+                          for peakIndex in range(relativeHeights.shape[1])]
+        pearsonCoeffs, pValues = correlationAnalysis.currentCorrelations()
+        self.assertEqual(correlationAnalysis.countSamples, len(listFTIR_Outputs))
+        np.testing.assert_allclose(pearsonCoeffs, expectedCoeffs, rtol=1e-9, atol=1e-12)
+        np.testing.assert_allclose(correlationAnalysis.sumWavenumbers, peakWavenumbers.sum(axis=0), rtol=1e-12)
+        self.assertEqual(correlationAnalysis.listFTIR_Outputs,
+                         sorted(listFTIR_Outputs, key=lambda FTIRObj: FTIRObj.fraction_CanolaOil))
+
+    def test_addAndRemove(self):
+        correlationAnalysis = FTIR_IncrementalCorrelationAnalysis(self.listFTIR_Outputs[:25])
+        self.assertMatchesSamples(correlationAnalysis, self.listFTIR_Outputs[:25])
+        for FTIRObj in self.listFTIR_Outputs[25:]:
+            correlationAnalysis.addSample(FTIRObj)
+        self.assertMatchesSamples(correlationAnalysis, self.listFTIR_Outputs)
+        removedSamples = [self.listFTIR_Outputs[sampleIndex]
+                          for sampleIndex in self.randomGenerator.permutation(40)[:30]]
+        for FTIRObj in removedSamples:
+            correlationAnalysis.removeSample(FTIRObj)
+        self.assertMatchesSamples(correlationAnalysis, [FTIRObj for FTIRObj in self.listFTIR_Outputs
+                                                        if FTIRObj not in removedSamples])
+
+    def test_removeAfterPeaksChange(self):
+        # A sample whose peaks were regenerated after it was added is removed with the peaks it was added with
+        correlationAnalysis = FTIR_IncrementalCorrelationAnalysis(self.listFTIR_Outputs[:20])
+        changedSample = self.listFTIR_Outputs[7]
+        changedSample.setPeakTableRow(self.makePeakTable(), 0)
+        correlationAnalysis.removeSample(changedSample)
+        remainingSamples = self.listFTIR_Outputs[:7] + self.listFTIR_Outputs[8:20]
+        self.assertMatchesSamples(correlationAnalysis, remainingSamples)
+
+    def test_removeAll(self):
+        correlationAnalysis = FTIR_IncrementalCorrelationAnalysis(self.listFTIR_Outputs[:3])
+        for FTIRObj in self.listFTIR_Outputs[:3]:
+            correlationAnalysis.removeSample(FTIRObj)
+        self.assertEqual(correlationAnalysis.countSamples, 0)
+        self.assertEqual(correlationAnalysis.listFTIR_Outputs, [])
+        correlationAnalysis.addSample(self.listFTIR_Outputs[5])
+        correlationAnalysis.addSample(self.listFTIR_Outputs[6])
+        correlationAnalysis.addSample(self.listFTIR_Outputs[9])
+        self.assertMatchesSamples(correlationAnalysis, [self.listFTIR_Outputs[sampleIndex] for sampleIndex in (5, 6, 9)])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import unittest
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_FTIR_PeakBatch import FTIR_PeakBatch
+from Source_FTIR_HNMR.cls_PipelineProfiler import pipelineProfiler
+from Source_FTIR_HNMR.rootDir import path_FTIRCanolaOil, path_FTIRPalmOil, path_FTIR2C1PMix, path_FTIR1C2PMix
+
+def perSamplePeaks(DFSample, peakScanRange_High, peakScanRange_Low):
+    # The per-sample DataFrame extraction the batch replaced: the minimum transmittance of every window, skipping
+    # ... missing values, with heights relative to the last window; a window without any value gives a NaN peak
+    initialTrans = DFSample["Percent Transmittance"][0]
+    peaks_wavenumbers, peaks_transmittance, peaks_heights = [], [], []
+    for upperRange, lowerRange in zip(peakScanRange_High, peakScanRange_Low):
+        SelectedDFRange = DFSample.loc[DFSample["Wavenumber"] >= lowerRange]
+        SelectedDFRange = SelectedDFRange.loc[SelectedDFRange["Wavenumber"] <= upperRange]
+        if SelectedDFRange["Percent Transmittance"].isna().all():
+            peakTrans, peakWavenumber = np.nan, np.nan
+        else:
+            peakTrans = SelectedDFRange.min().iloc[1]
+            peakWavenumber = SelectedDFRange.loc[SelectedDFRange.idxmin().iloc[1]]["Wavenumber"]
+        peaks_wavenumbers.append(peakWavenumber)
+        peaks_transmittance.append(peakTrans)
+        peaks_heights.append(initialTrans - peakTrans)
+    return (np.array(peaks_wavenumbers), np.array(peaks_transmittance),
+            np.array(peaks_heights) / peaks_heights[-1])
+
+class TestFTIR_PeakBatch(unittest.TestCase):
+    # Batched peak extraction on the instrument spectra: parity with the per-sample DataFrame extraction, also for
+    # ... spectra with missing values, and the same peaks with the pipeline profiler enabled
+    def setUp(self):
+        self.resultsCache = FTIR_Output.resultsCache
+        FTIR_Output.resultsCache = None
+        self.listFTIR_Outputs = [FTIR_Output(path, sampleName_Short=name, registerSample=False)
+                                 for path, name in ((path_FTIRCanolaOil, "CO"), (path_FTIRPalmOil, "PO"),
+                                                    (path_FTIR2C1PMix, "2C:1P"), (path_FTIR1C2PMix, "1C:2P"))]
+
+    def tearDown(self):
+        FTIR_Output.resultsCache = self.resultsCache
+
+    def peakMatrices(self):
+        return (np.array([FTIRObj.peakTable.peakWavenumbers[FTIRObj.peakTableRow] for FTIRObj in self.listFTIR_Outputs]),
+                np.array([FTIRObj.peakTable.peakRelativeHeights[FTIRObj.peakTableRow]
+                          for FTIRObj in self.listFTIR_Outputs]))
+
+    def generatePeaksBatch(self):
+        FTIR_Output.generatePeaksBatch(self.listFTIR_Outputs, FTIR_Output.peakScanRange_High,
+                                       FTIR_Output.peakScanRange_Low, FTIR_Output.peakVibrations,
+                                       referenceWavenumber=FTIR_Output.referenceWavenumber)
+        return self.peakMatrices()
+
+    def assertMatchesPerSample(self, peakBatch):
+        for sampleIndex in range(peakBatch.numberOfSamples):
+            DFSample = pd.DataFrame({"Wavenumber": peakBatch.wavenumbers,
+                                     "Percent Transmittance": peakBatch.transmittances[sampleIndex]})
+            peakWavenumbers, peakTransmittances, relativeHeights = perSamplePeaks(
+                DFSample, FTIR_Output.peakScanRange_High, FTIR_Output.peakScanRange_Low)
+            np.testing.assert_array_equal(peakBatch.peakWavenumbers[sampleIndex], peakWavenumbers)
+            np.testing.assert_array_equal(peakBatch.peakTransmittances[sampleIndex], peakTransmittances)
+            np.testing.assert_allclose(peakBatch.peakRelativeHeights[sampleIndex], relativeHeights, rtol=1e-12)
+
+    def makePeakBatch(self, transmittances=None):
+        wavenumbers = self.listFTIR_Outputs[0].DFSample["Wavenumber"].to_numpy(dtype=float)
+        if transmittances is None:
+            transmittances = [FTIRObj.DFSample["Percent Transmittance"].to_numpy(dtype=float)
+                              for FTIRObj in self.listFTIR_Outputs]
+        peakBatch = FTIR_PeakBatch(wavenumbers, transmittances, FTIR_Output.peakScanRange_High,
+                                   FTIR_Output.peakScanRange_Low, FTIR_Output.peakVibrations)
+        peakBatch.generatePeaks()
+        return peakBatch
+
+    def test_perSampleParity(self):
+        self.assertMatchesPerSample(self.makePeakBatch())
+
+    def test_missingValues(self):
+        # The minimum of the first window is missing in one spectrum, and a whole window is missing in another
+        peakBatch = self.makePeakBatch()
+        transmittances = peakBatch.transmittances.copy()
+        firstWindow = peakBatch.peakPositions[0, 0]
+        transmittances[0, firstWindow - 2:firstWindow + 3] = np.nan
+        inThirdWindow = ((FTIR_Output.peakScanRange_Low[2] <= peakBatch.wavenumbers)
+                         & (peakBatch.wavenumbers <= FTIR_Output.peakScanRange_High[2]))
+        transmittances[1, inThirdWindow] = np.nan
+        missingBatch = self.makePeakBatch(transmittances)
+        self.assertMatchesPerSample(missingBatch)
+        self.assertNotEqual(missingBatch.peakWavenumbers[0, 0], peakBatch.peakWavenumbers[0, 0])
+        self.assertTrue(np.isnan([missingBatch.peakWavenumbers[1, 2], missingBatch.peakTransmittances[1, 2],
+                                  missingBatch.peakRelativeHeights[1, 2]]).all())
+        self.assertFalse(np.isnan(missingBatch.peakRelativeHeights[1, [0, 1, 3, 4, 5]]).any())
+
+    def test_batchWithProfiler(self):
+        # Profiling records the batch stages and does not change the peaks
+        peakWavenumbers, relativeHeights = self.generatePeaksBatch()
+        wasEnabled, traceMemory = pipelineProfiler.enabled, pipelineProfiler.traceMemory
+        pipelineProfiler.reset()
+        pipelineProfiler.enable(traceMemory=True)
+        try:
+            profiledWavenumbers, profiledHeights = self.generatePeaksBatch()
+            stageTotals = pipelineProfiler.summary()
+        finally:
+            pipelineProfiler.disable()
+            if wasEnabled:
+                pipelineProfiler.enable(traceMemory)
+        np.testing.assert_array_equal(profiledWavenumbers, peakWavenumbers)
+        np.testing.assert_array_equal(profiledHeights, relativeHeights)
+        self.assertEqual(stageTotals["FTIR spectrum stacking"]["items"], 4)
+        self.assertEqual(stageTotals["FTIR peak extraction"]["items"], 4)
+
+if __name__ == "__main__":
+    unittest.main()
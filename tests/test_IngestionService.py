@@ -0,0 +1,98 @@
+import asyncio
+import shutil
+import tempfile
+import time
+import unittest
+from pathlib import Path
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_IngestionService import IngestionService
+from Source_FTIR_HNMR.cls_ResultsCache import ResultsCache
+from Source_FTIR_HNMR.rootDir import path_InstrumentOutputs, path_OutFTIR_CorrelSummaryOOP, path_OutNMR_CorrelAllOOP
+
+class TestIngestionService(unittest.TestCase):
+    # Drives the watch-folder service end to end on a temporary copy of the instrument folder: new files are picked
+    # ... up, a file rewritten with garbage leaves the analysis and comes back once restored, and deleted files leave
+    # ... the running correlations, without any sample being counted twice.
+    def setUp(self):
+        self.tempDir = Path(tempfile.mkdtemp())
+        self.instrumentDir = self.tempDir / "Instrument Output Files"
+        for subDir, filePattern in (("FTIR Instrument Outputs", "FTIR_*.csv"),
+                                    ("1H-NMR Instrument Outputs", "RawText_1H-NMR_*.txt")):
+            (self.instrumentDir / subDir).mkdir(parents=True)
+            for path in (path_InstrumentOutputs / subDir).glob(filePattern):
+                shutil.copy2(path, self.instrumentDir / subDir / path.name)
+        shutil.copy2(path_InstrumentOutputs / "Sample Manifest.csv", self.instrumentDir / "Sample Manifest.csv")
+        self.outputDir = self.tempDir / "Program Output Files"
+        self.resultsCache = FTIR_Output.resultsCache
+        FTIR_Output.resultsCache = ResultsCache(self.tempDir / ".results_cache")
+
+    def tearDown(self):
+        FTIR_Output.resultsCache = self.resultsCache
+        shutil.rmtree(self.tempDir, ignore_errors=True)
+
+    def FTIRNames(self, ingestionService):
+        return [FTIRObj.sampleName_Short for FTIRObj in ingestionService.FTIR_Correlations.listFTIR_Outputs]
+
+    async def waitUntil(self, condition, timeout=60.0):
+        endTime = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > endTime:
+                self.fail("The ingestion service did not reach the expected state in time.")
+            await asyncio.sleep(0.05)
+
+    async def driveService(self):
+        ingestionService = IngestionService(self.instrumentDir, self.instrumentDir / "Sample Manifest.csv",
+                                            self.outputDir, pollInterval=0.05, settleTime=0.1, jobs=1)
+        stopEvent = asyncio.Event()
+        serviceTask = asyncio.create_task(ingestionService.run(stopEvent))
+        FTIRDir = self.instrumentDir / "FTIR Instrument Outputs"
+        HNMRDir = self.instrumentDir / "1H-NMR Instrument Outputs"
+        try:
+            # New files
+            await self.waitUntil(lambda: ingestionService.numberProcessed == 7)
+            self.assertEqual(self.FTIRNames(ingestionService), ["PO", "1C:2P", "2C:1P", "CO"])
+            self.assertEqual(ingestionService.FTIR_Correlations.countSamples, 4)
+            self.assertEqual(ingestionService.FTIR_Session.numberOfSamples, 4)
+            self.assertEqual(len(ingestionService.listHNMR_Outputs), 3)
+            self.assertTrue((self.outputDir / path_OutFTIR_CorrelSummaryOOP.name).exists())
+            self.assertTrue((self.outputDir / path_OutNMR_CorrelAllOOP.name).exists())
+
+            # A processed file rewritten with contents that cannot be parsed leaves the analysis
+            canolaFile = FTIRDir / "FTIR_CanolaOil.csv"
+            canolaContents = canolaFile.read_bytes()
+            canolaFile.write_text("not an FTIR spectrum\n", encoding="UTF-8")
+            await self.waitUntil(lambda: ingestionService.FTIR_Correlations.countSamples == 3)
+            self.assertEqual(self.FTIRNames(ingestionService), ["PO", "1C:2P", "2C:1P"])
+            self.assertEqual(ingestionService.FTIR_Session.numberOfSamples, 3)
+
+            # ... and comes back, once, when it is written correctly again
+            canolaFile.write_bytes(canolaContents)
+            await self.waitUntil(lambda: ingestionService.FTIR_Correlations.countSamples == 4)
+            self.assertEqual(self.FTIRNames(ingestionService), ["PO", "1C:2P", "2C:1P", "CO"])
+            self.assertEqual(ingestionService.FTIR_Session.numberOfSamples, 4)
+
+            # A valid rewrite replaces the previous sample object
+            canolaHNMRFile = HNMRDir / "RawText_1H-NMR_CanolaOil.txt"
+            previousHNMRObj = ingestionService.processedFiles[canolaHNMRFile][2]
+            canolaHNMRFile.write_bytes(canolaHNMRFile.read_bytes() + b"\n")
+            await self.waitUntil(lambda: ingestionService.processedFiles[canolaHNMRFile][2] is not previousHNMRObj)
+            self.assertEqual(len(ingestionService.listHNMR_Outputs), 3)
+            self.assertNotIn(previousHNMRObj, ingestionService.listHNMR_Outputs)
+
+            # Deleted files leave the running correlations
+            (FTIRDir / "FTIR_PalmOil.csv").unlink()
+            (HNMRDir / "RawText_1H-NMR_PalmOil.txt").unlink()
+            await self.waitUntil(lambda: ingestionService.FTIR_Correlations.countSamples == 3
+                                 and len(ingestionService.listHNMR_Outputs) == 2)
+            self.assertEqual(self.FTIRNames(ingestionService), ["1C:2P", "2C:1P", "CO"])
+            self.assertEqual(ingestionService.FTIR_Session.numberOfSamples, 3)
+            self.assertNotIn(FTIRDir / "FTIR_PalmOil.csv", ingestionService.processedFiles)
+        finally:
+            stopEvent.set()
+            await serviceTask
+
+    def test_run(self):
+        asyncio.run(self.driveService())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,45 @@
+import threading
+import time
+import unittest
+from Source_FTIR_HNMR.cls_PipelineProfiler import PipelineProfiler
+
+class TestPipelineProfiler(unittest.TestCase):
+    # A profiler of its own per test, with memory tracing off so that the shared pipelineProfiler is untouched
+    def setUp(self):
+        self.profiler = PipelineProfiler()
+        self.profiler.enable(traceMemory=False)
+
+    def test_itemCounterRejectingArguments(self):
+        # A call the item counter cannot take still runs the stage, and is recorded without a count
+        @self.profiler.profiled("scale", items=lambda values: len(values))
+        def scale(values, factor=1):
+            return [value * factor for value in values]
+
+        self.assertEqual(scale([1, 2], factor=3), [3, 6])
+        self.assertEqual(scale([1, 2, 3]), [1, 2, 3])
+        self.assertEqual([record.items for record in self.profiler.records], [None, 3])
+
+    def test_threadCPUTime(self):
+        # A stage that waits while another thread keeps the CPU busy is not charged for that thread's work
+        busyStarted, busyDone = threading.Event(), threading.Event()
+
+        def busyThread():
+            with self.profiler.stage("busy"):
+                busyStarted.set()
+                endTime = time.perf_counter() + 0.3
+                while time.perf_counter() < endTime:
+                    pass
+            busyDone.set()
+
+        thread = threading.Thread(target=busyThread)
+        thread.start()
+        busyStarted.wait()
+        with self.profiler.stage("waiting"):
+            busyDone.wait()
+        thread.join()
+        stageTotals = self.profiler.summary()
+        self.assertGreater(stageTotals["busy"]["cpuSeconds"], 0.1)
+        self.assertLess(stageTotals["waiting"]["cpuSeconds"], 0.05)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+import numpy as np
+import pandas as pd
+from Source_FTIR_HNMR.cls_FTIR_Output import FTIR_Output
+from Source_FTIR_HNMR.cls_FTIR_PeakBatch import FTIR_PeakBatch
+from Source_FTIR_HNMR.cls_ResultsCache import ResultsCache
+from Source_FTIR_HNMR.rootDir import path_FTIRCanolaOil, path_FTIRPalmOil, path_FTIR2C1PMix, path_FTIR1C2PMix
+
+class TestResultsCache(unittest.TestCase):
+    # Hits, misses and invalidation of the derived-results cache in a temporary directory; a new ResultsCache on the
+    # ... same directory stands for a later run, with nothing in memory
+    def setUp(self):
+        self.cacheDir = Path(tempfile.mkdtemp()) / ".results_cache"
+        self.DFResult = pd.DataFrame({"Peak Number": np.arange(1, 4), "Pearson Coefficient": [0.5, -0.25, np.nan],
+                                      "Trend": ["Positive trend (+)", "Negative trend (-)", "Trend not significant"]})
+
+    def tearDown(self):
+        shutil.rmtree(self.cacheDir.parent, ignore_errors=True)
+
+    def test_dataFrames(self):
+        resultsCache = ResultsCache(self.cacheDir)
+        entryKey = resultsCache.entryKey("correlations", np.arange(3.0), ["CO", "PO"], [1.0, 0.0])
+        self.assertIsNone(resultsCache.getDataFrame("correlations", entryKey))
+        resultsCache.putDataFrame("correlations", entryKey, self.DFResult)
+        pd.testing.assert_frame_equal(resultsCache.getDataFrame("correlations", entryKey), self.DFResult)
+
+        laterCache = ResultsCache(self.cacheDir)
+        self.assertEqual(laterCache.entryKey("correlations", np.arange(3.0), ["CO", "PO"], [1.0, 0.0]), entryKey)
+        pd.testing.assert_frame_equal(laterCache.getDataFrame("correlations", entryKey), self.DFResult)
+        # Any change of the data or the parameters is another key
+        for keyParts in ((np.arange(3.0) + 1e-9, ["CO", "PO"], [1.0, 0.0]),
+                         (np.arange(3, dtype=np.float32), ["CO", "PO"], [1.0, 0.0]),
+                         (np.arange(3.0), ["CO", "PO"], [1.0, 0.5])):
+            self.assertIsNone(laterCache.getDataFrame("correlations", laterCache.entryKey("correlations", *keyParts)))
+
+    def test_codeInvalidation(self):
+        # A change to the source of the modules that compute the results, or to resultsVersion, misses every entry
+        resultsCache = ResultsCache(self.cacheDir)
+        entryKey = resultsCache.entryKey("correlations", np.arange(3.0))
+        resultsCache.putDataFrame("correlations", entryKey, self.DFResult)
+        with mock.patch.object(ResultsCache, "codeModules", ResultsCache.codeModules[:-1]):
+            changedCode = ResultsCache(self.cacheDir)
+        with mock.patch.object(ResultsCache, "resultsVersion", ResultsCache.resultsVersion + 1):
+            changedVersion = ResultsCache(self.cacheDir)
+        for laterCache in (changedCode, changedVersion):
+            self.assertNotEqual(laterCache.codeVersion, resultsCache.codeVersion)
+            self.assertIsNone(laterCache.getDataFrame("correlations", laterCache.entryKey("correlations",
+                                                                                          np.arange(3.0))))
+
+    def test_peakPositions(self):
+        highs, lows = [1250, 3050], [800, 2900]
+        digests = [bytes([digestIndex]) * 40 for digestIndex in range(3)]
+        resultsCache = ResultsCache(self.cacheDir)
+        np.testing.assert_array_equal(resultsCache.getPeakPositions(digests, highs, lows), -np.ones((3, 2)))
+        resultsCache.putPeakPositions(digests[:2], highs, lows, [[5, 7], [6, 8]])
+        np.testing.assert_array_equal(ResultsCache(self.cacheDir).getPeakPositions(digests, highs, lows),
+                                      [[5, 7], [6, 8], [-1, -1]])
+        # Other windows miss, and a single spectrum is only kept in memory unless the disk is asked for
+        self.assertTrue((resultsCache.getPeakPositions(digests[:2], highs, [801, 2900]) < 0).all())
+        resultsCache.putPeakPositions(digests[2:], highs, lows, [[9, 10]])
+        np.testing.assert_array_equal(resultsCache.getPeakPositions(digests[2:], highs, lows), [[9, 10]])
+        self.assertTrue((ResultsCache(self.cacheDir).getPeakPositions(digests[2:], highs, lows) < 0).all())
+        diskCache = ResultsCache(self.cacheDir, diskForSingleSpectra=True)
+        diskCache.putPeakPositions(digests[2:], highs, lows, [[9, 10]])
+        np.testing.assert_array_equal(ResultsCache(self.cacheDir, diskForSingleSpectra=True).getPeakPositions(
+            digests[2:], highs, lows), [[9, 10]])
+
+    def test_peakBatch(self):
+        # A later run reduces only the spectra it has not seen, and finds the same peaks
+        wavenumbers = None
+        transmittances = []
+        for path in (path_FTIRCanolaOil, path_FTIRPalmOil, path_FTIR2C1PMix, path_FTIR1C2PMix):
+            DFSample = FTIR_Output(path, registerSample=False).DFSample
+            wavenumbers = DFSample["Wavenumber"].to_numpy(dtype=float)
+            transmittances.append(DFSample["Percent Transmittance"].to_numpy(dtype=float))
+        transmittances = np.array(transmittances)
+
+        def runBatch(transmittances):
+            peakBatch = FTIR_PeakBatch(wavenumbers, transmittances, FTIR_Output.peakScanRange_High,
+                                       FTIR_Output.peakScanRange_Low, FTIR_Output.peakVibrations)
+            with mock.patch.object(FTIR_PeakBatch, "findPeakPositions", autospec=True,
+                                   side_effect=FTIR_PeakBatch.findPeakPositions) as findPeakPositions:
+                peakBatch.generatePeaks(ResultsCache(self.cacheDir))
+            reducedSamples = [list(call.args[1]) for call in findPeakPositions.call_args_list]
+            return peakBatch, reducedSamples
+
+        firstBatch, reducedSamples = runBatch(transmittances)
+        self.assertEqual(reducedSamples, [[0, 1, 2, 3]])
+        cachedBatch, reducedSamples = runBatch(transmittances)
+        self.assertEqual(reducedSamples, [])
+        np.testing.assert_array_equal(cachedBatch.peakRelativeHeights, firstBatch.peakRelativeHeights)
+        changedTransmittances = transmittances.copy()
+        changedTransmittances[2] *= 0.99
+        changedBatch, reducedSamples = runBatch(changedTransmittances)
+        self.assertEqual(reducedSamples, [[2]])
+        uncachedBatch = FTIR_PeakBatch(wavenumbers, changedTransmittances, FTIR_Output.peakScanRange_High,
+                                       FTIR_Output.peakScanRange_Low, FTIR_Output.peakVibrations)
+        uncachedBatch.generatePeaks()
+        np.testing.assert_array_equal(changedBatch.peakPositions, uncachedBatch.peakPositions)
+
+    def test_sizeLimit(self):
+        resultsCache = ResultsCache(self.cacheDir, maxBytes=20000)
+        for entryIndex in range(20):
+            entryKey = resultsCache.entryKey("correlations", entryIndex)
+            resultsCache.putDataFrame("correlations", entryKey, pd.DataFrame({"Value": np.arange(200.0) + entryIndex}))
+        cachedBytes = sum(cachePath.stat().st_size for cachePath in self.cacheDir.glob("*.npz"))
+        self.assertLessEqual(cachedBytes, 20000)
+        # The newest entry is kept
+        lastKey = resultsCache.entryKey("correlations", 19)
+        self.assertEqual(ResultsCache(self.cacheDir).getDataFrame("correlations", lastKey)["Value"].iloc[0], 19.0)
+
+if __name__ == "__main__":
+    unittest.main()
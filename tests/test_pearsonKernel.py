@@ -0,0 +1,54 @@
+import unittest
+import warnings
+import numpy as np
+from scipy import stats
+from Source_FTIR_HNMR.pearsonKernel import pearsonMatrix, trendLabels
+
+class TestPearsonKernel(unittest.TestCase):
+    # The vectorized coefficients and t-distribution p-values, column by column against scipy.stats.pearsonr
+    def setUp(self):
+        self.randomGenerator = np.random.default_rng(5)
+
+    def assertMatchesScipy(self, xValues, responseMatrix):
+        pearsonCoeffs, pValues = pearsonMatrix(xValues, responseMatrix)
+        for peakIndex in range(responseMatrix.shape[1]):
+            isPresent = ~np.isnan(responseMatrix[:, peakIndex])
+            expectedCoeff, expectedPValue = stats.pearsonr(np.asarray(xValues)[isPresent],
+                                                           responseMatrix[isPresent, peakIndex])
+            self.assertAlmostEqual(pearsonCoeffs[peakIndex], expectedCoeff, places=12)
+            self.assertAlmostEqual(pValues[peakIndex], expectedPValue, places=10)
+
+    def test_sampleCounts(self):
+        for numberOfSamples in (3, 4, 10, 200):
+            xValues = self.randomGenerator.random(numberOfSamples)
+            responseMatrix = np.column_stack([xValues + self.randomGenerator.normal(0, noise, numberOfSamples)
+                                              for noise in (0.01, 0.2, 1.0, 10.0)])
+            self.assertMatchesScipy(xValues, responseMatrix)
+
+    def test_missingValues(self):
+        # Columns with missing values are correlated over their own samples, in the same pass as the full ones
+        xValues = self.randomGenerator.random(12)
+        responseMatrix = xValues[:, None] * [1.0, -2.0, 0.5] + self.randomGenerator.normal(0, 0.3, (12, 3))
+        responseMatrix[[0, 5], 1] = np.nan
+        responseMatrix[[2, 3, 4, 9], 2] = np.nan
+        self.assertMatchesScipy(xValues, responseMatrix)
+
+    def test_degenerateColumns(self):
+        # Exact and constant responses give r = ±1 with p = 0, and NaN without warnings
+        xValues = np.array([0.0, 1 / 3, 2 / 3, 1.0])
+        responseMatrix = np.column_stack([2 * xValues + 1, -xValues, np.ones(4)])
+        with warnings.catch_warnings():
+            warnings.simplefilter("error")
+            pearsonCoeffs, pValues = pearsonMatrix(xValues, responseMatrix)
+        np.testing.assert_allclose(pearsonCoeffs[:2], [1.0, -1.0])
+        np.testing.assert_allclose(pValues[:2], [0.0, 0.0], atol=1e-12)
+        self.assertTrue(np.isnan([pearsonCoeffs[2], pValues[2]]).all())
+        boolSignificance, signTrend = trendLabels(pearsonCoeffs, pValues)
+        self.assertEqual(list(signTrend), ["Positive trend (+)", "Negative trend (-)", "Trend not significant"])
+
+    def test_responseRows(self):
+        with self.assertRaises(ValueError):
+            pearsonMatrix([0.0, 0.5, 1.0], np.ones((4, 2)))
+
+if __name__ == "__main__":
+    unittest.main()